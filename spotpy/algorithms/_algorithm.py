@@ -12,22 +12,47 @@ from __future__ import print_function
 from __future__ import unicode_literals
 from spotpy import database, objectivefunctions
 from spotpy import parameter
+import copy
+import inspect
+import itertools
+import sys
 import numpy as np
 import time
 import threading
+import traceback
 
 try:
-    from queue import Queue
+    from queue import Queue, Empty
 except ImportError:
     # If the running python version is 2.* we have only Queue available as a multiprocessing class
     # we need to stop the whole main process which this sleep for one microsecond otherwise the subprocess is not
     # finished and the main process can not access it and put it as garbage away (Garbage collectors cause)
     # However this slows down the whole simulation process and is a boring bug. Python3.x does not need this
     # workaround
-    from Queue import Queue
+    from Queue import Queue, Empty
 
 
 
+def _takes_params(function):
+    """
+    :return: True, if the function takes a params argument, False if not
+             and None, if the signature of the function is unknown
+    """
+    if not hasattr(inspect, 'signature'):
+        # Python 2
+        try:
+            spec = inspect.getargspec(function)
+        except TypeError:
+            return None
+        return 'params' in spec.args or spec.keywords is not None
+    try:
+        signature = inspect.signature(function)
+    except (TypeError, ValueError):
+        # A function without a signature
+        return None
+    return any(p.name == 'params' or p.kind == p.VAR_KEYWORD for p in signature.parameters.values())
+
+
 class _RunStatistic(object):
     """
     this class checks for each run if the objectivefunction got better and holds the 
@@ -87,6 +112,59 @@ class _RunStatistic(object):
         return 'Best objectivefunction: %g' % self.objectivefunction
 
 
+class _TimeoutRunner(object):
+    """
+    Runs functions in a reusable watchdog thread and waits at most timeout seconds
+    for the result. The thread is only replaced, if a run did not finish in time.
+    Usage:
+    runner = _TimeoutRunner(timeout)
+    result = runner(function, *args)  # None, if function did not finish in time
+
+    """
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+        self.thread = None
+        self.jobs = None
+        self.results = None
+
+    def __getstate__(self):
+        # Threads and queues can not be copied to other processes, copies start their own thread
+        return {'timeout': self.timeout}
+
+    def __setstate__(self, state):
+        self.__init__(state['timeout'])
+
+    @staticmethod
+    def _loop(jobs, results):
+        while True:
+            job = jobs.get()
+            if job is None:
+                break
+            function, args = job
+            try:
+                results.put(function(*args))
+            except Exception:
+                traceback.print_exc()
+                results.put(None)
+
+    def __call__(self, function, *args):
+        if self.thread is None:
+            self.jobs, self.results = Queue(), Queue()
+            self.thread = threading.Thread(target=self._loop, args=(self.jobs, self.results))
+            self.thread.daemon = True
+            self.thread.start()
+        self.jobs.put((function, args))
+        try:
+            return self.results.get(timeout=self.timeout)
+        except Empty:
+            # The thread is still busy with the timed out run. It is told to stop
+            # afterwards and the next run gets a new thread
+            self.jobs.put(None)
+            self.thread = None
+            return None
+
+
 class _algorithm(object):
     """
     Implements an algorithm.
@@ -105,6 +183,12 @@ class _algorithm(object):
             observation.
         evaluation: function
             Should return the true values as return by the model.
+        simulation_batch: function, optional
+            Should be callable with a 2D array holding one parameter set per row (columns in
+            the order of the parameters) and return one simulation per row. If the setup has
+            this method, population based samplers (mc, lhs, fast, rope, dream) simulate
+            batches of batch_size runs with one call, when running sequential without sim_timeout.
+            If the call raises an error, the simulations of the batch are None, like failing runs.
 
     dbname: str
         Name of the database where parameter, objectivefunction value and simulation 
@@ -112,16 +196,27 @@ class _algorithm(object):
     dbformat: str
          ram: fast suited for short sampling time. no file will be created and results are saved in an array.
         csv: A csv file will be created, which you can import afterwards.        
+        npy: A binary .npy file (and a .json file with the column names) will be created. Fast to write and
+             to load with spotpy.analyser.load_npy_results, which maps the file into memory.
+        parquet: An Apache Parquet file will be created, pyarrow needs to be installed. The simulation is stored
+             in a single column. Load selected columns with spotpy.analyser.load_parquet_results.
     parallel: str
         seq: Sequentiel sampling (default): Normal iterations on one core of your cpu.
         mpc: Multi processing: Iterations on all available cores on your (single) pc
         mpi: Message Passing Interface: Parallel computing on high performance computing clusters, py4mpi needs to be installed
+        thread: Iterations in threads of the running process, for models that release the GIL (numba, C extensions, external programs)
+        uthread: Like thread, but the results are given back as soon as they are finished
+        async: Many runs at once in an asyncio event loop, for setups with an async simulation method (I/O bound models)
+        A spotpy.parallel.pool.Pool object: Multi processing with persistent workers, that can be shared by several samplers
     save_threshold: float or list
         Compares the given value/list of values with return value/list of values from spot_setup.objectivefunction.
         If the objectivefunction value is higher, the results are saved in the database. If not they are ignored (saves storage).
     db_precision:np.float type
         set np.float16, np.float32 or np.float64 for rounding of floats in the output database
         Default is np.float16
+    db_thread: bool, default: False
+        if True, the runs are saved by a background thread of the datawriter (see spotpy.database.base.background),
+        so slow writes (csv, sql, hdf5) do not delay sending new jobs to parallel workers.
     alt_objfun: str or None, default: 'rmse'
         alternative objectivefunction to be used for algorithm
         * None: the objfun defined in spot_setup.objectivefunction is used
@@ -131,9 +226,14 @@ class _algorithm(object):
     sim_timeout: float, int or None, default: None
         the defined model given in the spot_setup class can be controlled to break after 'sim_timeout' seconds if
         sim_timeout is not None.
-        If the model run has been broken simlply '[nan]' will be returned.
+        If the model run has been broken, the run has no simulation and a NaN like and is not saved. The same holds
+        for the parallel backends.
+        Without a timeout the model is called directly, which is faster for very fast models.
     random_state: int or None, default: None
         the algorithms uses the number in random_state as seed for numpy. This way stochastic processes can be reproduced.
+    batch_size: int, default: 1000
+        the maximum number of parameter sets given to spot_setup.simulation_batch in one call. The results of
+        a batch are saved, before the next batch is simulated.
     """
 
     _unaccepted_parameter_types = (parameter.List, )
@@ -141,7 +241,8 @@ class _algorithm(object):
     def __init__(self, spot_setup, dbname=None, dbformat=None, dbinit=True,
                  dbappend=False, parallel='seq', save_sim=True, alt_objfun=None,
                  breakpoint=None, backup_every_rep=100, save_threshold=-np.inf,
-                 db_precision=np.float16, sim_timeout=None, random_state=None):
+                 db_precision=np.float16, sim_timeout=None, random_state=None, db_thread=False,
+                 batch_size=1000):
         # Initialize the user defined setup class
         self.setup = spot_setup
         # Philipp: Changed from Tobi's version, now we are using both new class defined parameters
@@ -171,11 +272,22 @@ class _algorithm(object):
         # else self.setup.objectivefunction
         self.objectivefunction = getattr(
             objectivefunctions, alt_objfun or '', None) or self.setup.objectivefunction
+        # Resolve once, if the objectivefunction takes the parameters
+        self.objectivefunction_params = _takes_params(self.objectivefunction)
         self.evaluation = self.setup.evaluation()
+        # The functions of spotpy.objectivefunctions compute the quantities of the evaluation,
+        # that they need, only once. Other objectivefunctions get the evaluation as it is
+        self.evaluation_context = self.evaluation
+        if getattr(self.objectivefunction, '__module__', None) == objectivefunctions.__name__:
+            try:
+                self.evaluation_context = objectivefunctions.EvaluationContext(self.evaluation)
+            except (TypeError, ValueError):
+                pass
         self.save_sim = save_sim
         self.dbname = dbname or 'customDb'
         self.dbformat = dbformat or 'ram'
         self.db_precision = db_precision
+        self.db_thread = db_thread
         self.breakpoint = breakpoint
         self.backup_every_rep = backup_every_rep
         # Two parameters to control the data base handling
@@ -191,6 +303,7 @@ class _algorithm(object):
 
         # If value is not None a timeout will set so that the simulation will break after sim_timeout seconds without return a value
         self.sim_timeout = sim_timeout
+        self._timeout_runner = _TimeoutRunner(sim_timeout)
         self.save_threshold = save_threshold
 
         if breakpoint == 'read' or breakpoint == 'readandwrite':
@@ -217,6 +330,26 @@ class _algorithm(object):
         # and randomized
         elif parallel == 'umpc':
             from spotpy.parallel.umproc import ForEach
+
+        # Threads need no pickling and no extra processes, but only speed up models that release the GIL.
+        # Every thread works with a copy of the sampler (see thread_copy)
+        elif parallel == 'thread':
+            from spotpy.parallel.thread import ForEach
+        elif parallel == 'uthread':
+            from spotpy.parallel.thread import UnorderedForEach as ForEach
+
+        # Setups with an "async def simulation" can have many runs in flight in one event loop.
+        # The results are given back as soon as they are finished
+        elif parallel == 'async':
+            # spotpy.parallel.aio uses the async syntax of python >= 3.5
+            if sys.version_info < (3, 5):
+                raise ImportError("parallel='async' needs python >= 3.5")
+            from spotpy.parallel.aio import ForEach
+
+        # A persistent pool of workers (e.g. spotpy.parallel.pool.Pool) can be shared by
+        # several samplers. The pool creates the repeater with its foreach method
+        elif hasattr(parallel, 'foreach'):
+            ForEach = parallel.foreach
         else:
             raise ValueError(
                 "'%s' is not a valid keyword for parallel processing" % parallel)
@@ -228,6 +361,14 @@ class _algorithm(object):
         # the normal work on the chains
         self.repeat = ForEach(self.simulate)
 
+        # Setups, that can simulate many parameter sets at once, are called with batches of a generation.
+        # In parallel runs the generations are distributed to the workers as usual. A sim_timeout
+        # applies to single runs, hence the runs are simulated one by one if it is set
+        self.simulation_batch = None
+        self.batch_size = max(1, int(batch_size))
+        if parallel == 'seq' and sim_timeout is None:
+            self.simulation_batch = getattr(self.setup, 'simulation_batch', None)
+
         self.status = _RunStatistic()
 
     def __str__(self):
@@ -278,7 +419,8 @@ class _algorithm(object):
                 self.dbname, self.parnames, like, randompar, simulations,
                 save_sim=self.save_sim, dbappend=self.dbappend,
                 dbinit=self.dbinit, db_precision=self.db_precision,
-                setup=self.setup)
+                setup=self.setup, repetitions=self.status.repetitions,
+                background=self.db_thread)
 
             self.dbinit = False
 
@@ -324,7 +466,10 @@ class _algorithm(object):
     def postprocessing(self, rep, params, simulation, chains=1, save_run=True, negativlike=False, block_print=False): # TODO: rep not necessaray
     
         params = self.update_params(params)
-        if negativlike is True:
+        if simulation is None:
+            # Failed and timed out runs have no simulation, their like is NaN
+            like = np.nan
+        elif negativlike is True:
             like = -self.getfitness(simulation=simulation, params=params)
         else:
             like = self.getfitness(simulation=simulation, params=params)
@@ -345,15 +490,21 @@ class _algorithm(object):
     
     def getfitness(self, simulation, params):
         """
-        Calls the user defined spot_setup objectivefunction
+        Calls the user defined spot_setup objectivefunction, with the parameters
+        if the objectivefunction takes them
         """
+        if self.objectivefunction_params:
+            return self.objectivefunction(evaluation=self.evaluation_context, simulation=simulation,
+                                          params=(params, self.parnames))
+        elif self.objectivefunction_params is False:
+            return self.objectivefunction(evaluation=self.evaluation_context, simulation=simulation)
         try:
             #print('Using parameters in fitness function')
-            return self.objectivefunction(evaluation=self.evaluation, simulation=simulation, params = (params,self.parnames))
+            return self.objectivefunction(evaluation=self.evaluation_context, simulation=simulation, params = (params,self.parnames))
 
         except TypeError: # Happens if the user does not allow to pass parameter in the spot_setup.objectivefunction
             #print('Not using parameters in fitness function')            
-            return self.objectivefunction(evaluation=self.evaluation, simulation=simulation)
+            return self.objectivefunction(evaluation=self.evaluation_context, simulation=simulation)
     
     def simulate(self, id_params_tuple):
         """This is a simple wrapper of the model, returning the result together with
@@ -361,29 +512,90 @@ class _algorithm(object):
         can mix up the ordering of runs
         """
         id, params = id_params_tuple
-        self.all_params[self.non_constant_positions] = params #TODO: List parameters are not updated if not accepted for the algorithm, we may have to warn/error if list is given
-        all_params = self.all_params
-
-        # we need a layer to fetch returned data from a threaded process into a queue.
-        def model_layer(q,all_params):
-            # Call self.model with a namedtuple instead of another sequence
-            q.put(self.setup.simulation(self.partype(*all_params)))
-
-        # starting a queue, where in python2.7 this is a multiprocessing class and can cause errors because of
-        # incompability which the main thread. Therefore only for older Python version a workaround follows
-        que = Queue()
-        sim_thread = threading.Thread(target=model_layer, args=(que, all_params))
-        sim_thread.daemon = True
-        sim_thread.start()
-
-
-        # If self.sim_timeout is not None the self.model will break after self.sim_timeout seconds otherwise is runs as
-        # long it needs to run
-        sim_thread.join(self.sim_timeout)
-
-        # If no result from the thread is given, i.e. the thread was killed from the watcher the default result is
-        # '[nan]' and will not be saved. Otherwise get the result from the thread
-        model_result = None
-        if not que.empty():
-            model_result = que.get()
+        # A copy of all_params is used, since parallel threads may simulate at the same time
+        all_params = np.copy(self.all_params)
+        all_params[self.non_constant_positions] = params #TODO: List parameters are not updated if not accepted for the algorithm, we may have to warn/error if list is given
+
+        if self.sim_timeout is None:
+            # Without a timeout the model is called directly, a thread per run costs more than fast models
+            model_result = self._run_model(all_params)
+        else:
+            # If the model does not return within self.sim_timeout seconds, the result is None
+            # and will not be saved. The watchdog thread is reused for the next runs
+            model_result = self._timeout_runner(self._run_model, all_params)
         return id, params, model_result
+
+    def _run_model(self, all_params):
+        """
+        Calls the model with a namedtuple instead of another sequence. If the model
+        raises an error, the traceback is printed and None is returned.
+        An async simulation of the setup is run to its end, see spotpy.parallel.aio
+        """
+        try:
+            model_result = self.setup.simulation(self.partype(*all_params))
+            if hasattr(model_result, '__await__'):
+                from spotpy.parallel.aio import run
+                model_result = run(model_result)
+            return model_result
+        except Exception:
+            traceback.print_exc()
+            return None
+
+    def thread_copy(self):
+        """
+        Is called by parallel='thread' for every worker thread.
+        :return: A shallow copy of the sampler with its own parameter set and timeout watchdog.
+                 The setup is deep copied, unless it declares itself thread safe (thread_safe = True)
+        """
+        sampler = copy.copy(self)
+        sampler.all_params = np.copy(self.all_params)
+        sampler.partype = copy.deepcopy(self.partype)
+        sampler._timeout_runner = _TimeoutRunner(self.sim_timeout)
+        if not getattr(self.setup, 'thread_safe', False):
+            sampler.setup = copy.deepcopy(self.setup)
+        return sampler
+
+    def simulate_batch(self, jobs):
+        """
+        Simulates a list of (id, params) jobs with one call of setup.simulation_batch.
+        If the call raises an error, the traceback is printed and the simulations are None,
+        like failing runs of simulate.
+        :return: A list of (id, params, simulation) like the results of simulate
+        """
+        jobs = list(jobs)
+        if not jobs:
+            return []
+        ids, params = zip(*jobs)
+        # Every row holds all parameters, including the constant ones
+        matrix = np.tile(np.asarray(self.all_params, dtype=float), (len(jobs), 1))
+        matrix[:, self.non_constant_positions] = np.array(params, dtype=float)
+        try:
+            simulations = self.simulation_batch(matrix)
+        except Exception:
+            traceback.print_exc()
+            simulations = [None] * len(jobs)
+        if len(simulations) != len(jobs):
+            raise ValueError('simulation_batch returned {} simulations for {} parameter sets'.format(
+                len(simulations), len(jobs)))
+        return list(zip(ids, params, simulations))
+
+    def repeat_population(self, jobs):
+        """
+        Used by population based samplers instead of self.repeat, to simulate a whole
+        generation of (id, params) jobs. If the setup has a simulation_batch method, the
+        jobs are simulated in batches of at most self.batch_size runs, otherwise the jobs
+        are given to the repeater.
+        In both cases the results are (id, params, simulation) tuples, the results of
+        a batch are given back before the next batch is simulated.
+        """
+        if self.simulation_batch is None:
+            return self.repeat(jobs)
+        return self._repeat_batches(iter(jobs))
+
+    def _repeat_batches(self, jobs):
+        while True:
+            batch = list(itertools.islice(jobs, self.batch_size))
+            if not batch:
+                break
+            for result in self.simulate_batch(batch):
+                yield result
@@ -10,6 +10,7 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 from . import _algorithm
+import copy
 import numpy as np
 
 
@@ -184,7 +185,7 @@ class demcz(_algorithm):
             for rep, vector, simulations in self.repeat(param_generator):
                 burnInpar[i][rep] = vector
                 likelist = self.postprocessing(i, vector, simulations, chains=rep)
-                simulationlist.append(simulations)
+                simulationlist.append(copy.copy(simulations))
                 self._logPs.append(likelist)
                 old_like[rep] = likelist                
                 burnInpar[i][rep] = vector
@@ -250,7 +251,7 @@ class demcz(_algorithm):
                 param_generator = (
                     (rep, list(proposalVectors[rep])) for rep in range(int(nChains)))
                 for rep, vector, simulations in self.repeat(param_generator):
-                    new_simulationlist.append(simulations)
+                    new_simulationlist.append(copy.copy(simulations))
                     like = self.postprocessing(cur_iter+nSeedIterations, list(vector), simulations, chains=rep)
                     self._logPs.append(like)
                     new_likelist.append(like)
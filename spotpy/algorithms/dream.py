@@ -10,6 +10,7 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 from . import _algorithm
+import copy
 import numpy as np
 import random
 import time
@@ -146,7 +147,8 @@ class dream(_algorithm):
     def update_mcmc_status(self,par,like,sim,cur_chain):  
         self.bestpar[cur_chain][self.nChainruns[cur_chain]]=par
         self.bestlike[cur_chain]=like
-        self.bestsim[cur_chain]=sim
+        # The simulation may be a view into a reused buffer (see spotpy.parallel.shm)
+        self.bestsim[cur_chain]=copy.copy(sim)
 
     def get_r_hat(self, parameter_array):
         """
@@ -254,7 +256,7 @@ class dream(_algorithm):
         startpoints = self.get_regular_startingpoint(nChains)
         #param_generator = ((curChain,list(self.parameter()['random'])) for curChain in range(int(self.nChains)))   #TODO: Start with regular interval raster             
         param_generator = ((curChain,list(startpoints[curChain])) for curChain in range(int(self.nChains)))   #TODO: Start with regular interval raster             
-        for curChain,par,sim in self.repeat(param_generator):
+        for curChain,par,sim in self.repeat_population(param_generator):
             like = self.postprocessing(self.iter, par, sim, chains=curChain)
             self.update_mcmc_status(par,like,sim,curChain)
             self.iter+=1
@@ -274,7 +276,7 @@ class dream(_algorithm):
         newN = [True]*self.N
         while self.iter < self.repetitions:
             param_generator = ((curChain,self.get_new_proposal_vector(curChain,newN,nrN)) for curChain in range(int(self.nChains)))                
-            for cChain,par,sim in self.repeat(param_generator):
+            for cChain,par,sim in self.repeat_population(param_generator):
                 pCr = np.random.randint(0,nCr)
                 ids=[]         
                 for i in range(self.N):
@@ -223,7 +223,7 @@ class fast(_algorithm):
 
         param_generator = (
             (rep, Matrix[rep]) for rep in range(len(Matrix)))
-        for rep, randompar, simulations in self.repeat(param_generator):
+        for rep, randompar, simulations in self.repeat_population(param_generator):
             # Calculate the objective function
             self.postprocessing(rep, randompar, simulations)
 
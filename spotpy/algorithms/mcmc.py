@@ -10,6 +10,7 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 from . import _algorithm
+import copy
 import numpy as np
 import time
 
@@ -95,7 +96,8 @@ class mcmc(_algorithm):
     def update_mcmc_status(self,par,like,sim,cur_chain):  
         self.bestpar[cur_chain]=par
         self.bestlike[cur_chain]=like
-        self.bestsim[cur_chain]=sim
+        # The simulation may be a view into a reused buffer (see spotpy.parallel.shm)
+        self.bestsim[cur_chain]=copy.copy(sim)
 
             
     def sample(self, repetitions,nChains=1):
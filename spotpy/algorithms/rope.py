@@ -144,7 +144,7 @@ class rope(_algorithm):
         # A generator that produces the parameters
         param_generator = ((rep, matrix[rep])
                            for rep in range(int(first_run) - 1))
-        for rep, randompar, simulations in self.repeat(param_generator):
+        for rep, randompar, simulations in self.repeat_population(param_generator):
             # A function that calculates the fitness of the run and the manages the database 
             like = self.postprocessing(rep, randompar, simulations)
             likes.append(like)
@@ -181,7 +181,7 @@ class rope(_algorithm):
                 repetitions_following_runs = len(new_pars)
             param_generator = (
                 (rep, new_pars[rep]) for rep in range(int(repetitions_following_runs)))   
-            for rep, ropepar, simulations in self.repeat(param_generator):
+            for rep, ropepar, simulations in self.repeat_population(param_generator):
                 # Calculate the objective function
                 like = self.postprocessing(first_run + rep + repetitions_following_runs * subset, ropepar, simulations)
                 likes.append(like)
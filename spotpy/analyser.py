@@ -17,20 +17,45 @@ font = {'family' : 'calibri',
     'weight' : 'normal',
     'size'   : 18}
 
-def load_csv_results(filename, usecols=None):
+def load_csv_results(filename, usecols=None, mmap_file=None, chunksize=2 ** 14):
     """
-    Get an array of your results in the given file.
+    Get an array of your results in the given file. The file is parsed in chunks,
+    incomplete lines (e.g. of a running sampler) are left out.
 
     :filename: Expects an available filename, without the csv, in your working directory
     :type: str
+    :usecols: Names of the columns to load, may contain wildcards (e.g. ['like*', 'par*', 'simulation*'])
+              or indices of the columns. None loads all columns
+    :type: list
+    :mmap_file: If given, the results are written to this .npy file, which is mapped into memory.
+                Use this for results larger than the memory
+    :type: str
+    :chunksize: Number of lines parsed at once
+    :type: int
 
     :return: Result array
     :rtype: array
     """
-    if usecols == None:
-        return np.genfromtxt(filename+'.csv',delimiter=',',names=True,invalid_raise=False)
-    else:
-        return np.genfromtxt(filename+'.csv',delimiter=',',names=True,skip_footer=1,invalid_raise=False,usecols=usecols)[1:]
+    from spotpy.database.csv import load_results
+    return load_results(filename, usecols, mmap_file, chunksize)
+
+def iter_csv_results(filename, usecols=None, chunksize=2 ** 14):
+    """
+    Get your results in the given file chunk by chunk, without loading the whole file.
+
+    :filename: Expects an available filename, without the csv, in your working directory
+    :type: str
+    :usecols: Names of the columns to load, may contain wildcards (e.g. ['like*', 'par*', 'simulation*'])
+              or indices of the columns. None loads all columns
+    :type: list
+    :chunksize: Number of runs in a chunk
+    :type: int
+
+    :return: Generator of result arrays
+    :rtype: generator
+    """
+    from spotpy.database.csv import iter_results
+    return iter_results(filename, usecols, chunksize)
 
 def load_hdf5_results(filename):
     """
@@ -48,6 +73,36 @@ def load_hdf5_results(filename):
     with h5py.File(filename+'.h5', 'r') as f:
         return f[filename][()]
 
+def load_npy_results(filename):
+    """
+    Get an array of your results in the given file, written with dbformat='npy'.
+    The file is mapped into memory and not read, hence this is fast for large files.
+
+    :filename: Expects an available filename, without the .npy ending, in your working directory
+    :type: str
+
+    :return: Result array, a read-only view of the file
+    :rtype: array
+    """
+    from spotpy.database.npy import load_results
+    return load_results(filename)
+
+def load_parquet_results(filename, columns=None):
+    """
+    Get an array of your results in the given file, written with dbformat='parquet'.
+    Only the given columns are read from the file.
+
+    :filename: Expects an available filename, without the .parquet ending, in your working directory
+    :type: str
+    :columns: Names of the fields to read, may contain wildcards (e.g. ['like1', 'par*']), None reads all fields
+    :type: list
+
+    :return: Result array
+    :rtype: array
+    """
+    from spotpy.database.parquet import load_results
+    return load_results(filename, columns)
+
 def load_csv_parameter_results(filename, usecols=None):
     """
     Get an array of your results in the given file, without the first and the
@@ -60,19 +115,124 @@ def load_csv_parameter_results(filename, usecols=None):
     :return: Result array
     :rtype: array
     """
-    ofile=open(filename+'.csv')
-    line = ofile.readline()
-    header=line.split(',')
-    ofile.close()
-    
-    words=[]
-    index =[]
-    for i,word in enumerate(header): 
-        if word.startswith('par'):
-           words.append(word)
-           index.append(i)
-    return np.genfromtxt(filename+'.csv', delimiter=',', names=words, 
-                         usecols=index, invalid_raise=False, skip_header=1)
+    return load_csv_results(filename, usecols=['par*'])
+
+class ResultStream(object):
+    """
+    The results of a database file, read chunk by chunk. Results larger than the memory
+    can be analysed with get_modelruns, get_percentiles, calc_like and get_posterior,
+    which accept a ResultStream instead of a result array.
+
+    :dbname: Name of the database file without ending, or a result array (e.g. of a ram database)
+    :type: str
+    :dbformat: 'csv', 'npy', 'hdf5', 'parquet' or 'sql', None looks for a file with the ending
+               of one of these formats
+    :type: str
+    :chunksize: Number of runs in a chunk
+    :type: int
+    :columns: Names of the columns to read, may contain wildcards (e.g. ['like1', 'par*']),
+              None reads all columns
+    :type: list
+    """
+    extensions = {'csv': '.csv', 'npy': '.npy', 'hdf5': '.h5', 'parquet': '.parquet', 'sql': '.db'}
+
+    def __init__(self, dbname, dbformat=None, chunksize=2 ** 14, columns=None):
+        import os
+        if dbformat is None and isinstance(dbname, np.ndarray):
+            dbformat = 'ram'
+        elif dbformat is None:
+            for dbformat, extension in self.extensions.items():
+                if os.path.isfile(dbname + extension):
+                    break
+            else:
+                raise ValueError('No database file found for {}'.format(dbname))
+        self.dbname = dbname
+        self.dbformat = dbformat
+        self.chunksize = chunksize
+        self.columns = columns
+
+    def __iter__(self):
+        if self.dbformat == 'ram':
+            from fnmatch import fnmatch
+            names = [name for name in self.dbname.dtype.names
+                     if self.columns is None or any(fnmatch(name, pattern) for pattern in self.columns)]
+            return (self.dbname[start:start + self.chunksize][names]
+                    for start in range(0, len(self.dbname), self.chunksize))
+        from importlib import import_module
+        db_module = import_module('spotpy.database.' + self.dbformat)
+        return db_module.iter_results(self.dbname, self.columns, self.chunksize)
+
+    def select(self, columns):
+        """
+        :return: A ResultStream reading only the given columns
+        """
+        return ResultStream(self.dbname, self.dbformat, self.chunksize, columns)
+
+
+class QuantileSketch(object):
+    """
+    Estimates quantiles of many columns from values given chunk by chunk, with a
+    memory use independent of the number of values (a KLL like sketch).
+
+    The values are collected in levels, every value in level h stands for 2**h
+    values. If a level holds more than size rows, it is sorted and every second
+    row is moved to the next level. Up to size values per column the quantiles
+    are exact, otherwise the rank error is in the order of 1 / size.
+    """
+    def __init__(self, size=1024):
+        self.size = size
+        self.levels = []
+        self.toggle = 0
+
+    def update(self, values):
+        """
+        Adds the rows of a 2D array of values
+        """
+        values = np.asarray(values, dtype=float)
+        if not self.levels:
+            self.levels.append(values)
+        else:
+            self.levels[0] = np.concatenate([self.levels[0], values])
+        h = 0
+        while h < len(self.levels) and len(self.levels[h]) > self.size:
+            level = np.sort(self.levels[h], axis=0)
+            # An odd row stays in the level
+            self.levels[h] = level[len(level) - len(level) % 2:]
+            promoted = level[self.toggle:len(level) - len(level) % 2:2]
+            self.toggle = 1 - self.toggle
+            if h + 1 == len(self.levels):
+                self.levels.append(promoted)
+            else:
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+            h += 1
+
+    def percentile(self, q):
+        """
+        :param q: Percentile or sequence of percentiles (0 - 100)
+        :return: The percentiles of every column, like np.percentile(values, q, axis=0)
+        """
+        if len(self.levels) == 1:
+            return np.percentile(self.levels[0], q, axis=0)
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 2.0 ** h) for h, level in enumerate(self.levels)])
+        order = np.argsort(values, axis=0)
+        values = np.take_along_axis(values, order, axis=0)
+        ranks = np.cumsum(weights[order], axis=0)
+        result = []
+        for p in np.atleast_1d(q):
+            # Index of the first value, that has a rank above the rank of the percentile
+            index = (ranks <= p / 100.0 * (ranks[-1] - 1)).sum(axis=0)
+            result.append(values[np.minimum(index, len(values) - 1), np.arange(values.shape[1])])
+        return np.array(result) if np.ndim(q) else result[0]
+
+
+def _values(results, dtype=float):
+    """
+    :return: The fields of a result array as a 2D array, a view if possible.
+             With dtype=None the common type of the fields is used
+    """
+    from numpy.lib.recfunctions import structured_to_unstructured
+    return structured_to_unstructured(results, dtype=dtype)
 
 def get_header(results):
     return results.dtype.names
@@ -103,6 +263,8 @@ def get_modelruns(results):
     :return: Array containing just the columns beginnning with the indice "sim"
     :rtype: array
     """
+    if isinstance(results, ResultStream):
+        return results.select(['sim*'])
     fields=[word for word in results.dtype.names if word.startswith('sim')]
     return results[fields]
 
@@ -203,15 +365,18 @@ def get_percentiles(results,sim_number=''):
     :return: Percentiles of simulations
     :rtype: int and float
     """
-    p5,p25,p50,p75,p95=[],[],[],[],[]
+    if isinstance(results, ResultStream):
+        # The percentiles are estimated chunk by chunk
+        sketch = QuantileSketch()
+        for chunk in results.select(['simulation' + str(sim_number) + '*']):
+            sketch.update(_values(chunk))
+        return tuple(list(p) for p in sketch.percentile([5, 25, 50, 75, 95]))
     fields=[word for word in results.dtype.names if word.startswith('simulation'+str(sim_number))]
-    for i in range(len(fields)):
-        p5.append(np.percentile(list(results[fields[i]]),5))
-        p25.append(np.percentile(list(results[fields[i]]),25))
-        p50.append(np.percentile(list(results[fields[i]]),50))
-        p75.append(np.percentile(list(results[fields[i]]),75))
-        p95.append(np.percentile(list(results[fields[i]]),95))
-    return p5,p25,p50,p75,p95
+    if not fields:
+        return [],[],[],[],[]
+    # All percentiles of all simulation fields in one call
+    percentiles = np.percentile(_values(np.ravel(results[fields]), dtype=None), [5, 25, 50, 75, 95], axis=0)
+    return tuple(list(p) for p in percentiles)
 
 def calc_like(results,evaluation,objectivefunction):
     """
@@ -230,10 +395,31 @@ def calc_like(results,evaluation,objectivefunction):
     :rtype: list
     """
     likes=[]
-    sim=get_modelruns(results)
-    for s in sim:
-        likes.append(objectivefunction(list(s),evaluation))
-    return likes
+    if isinstance(results, ResultStream):
+        for chunk in get_modelruns(results):
+            likes.extend(_calc_like(_values(chunk, dtype=None), evaluation, objectivefunction))
+        return likes
+    if results.ndim != 1:
+        for s in get_modelruns(results):
+            likes.append(objectivefunction(list(s),evaluation))
+        return likes
+    # The simulations are converted to a 2D array at once, not run by run
+    return _calc_like(_values(get_modelruns(results), dtype=None), evaluation, objectivefunction)
+
+def _calc_like(simulations, evaluation, objectivefunction):
+    """
+    :return: The objectivefunction of every row of simulations as a list. The functions of
+             spotpy.objectivefunctions get blocks of rows, small enough to stay in the cache
+    """
+    if objectivefunction in spotpy.objectivefunctions._batch_functions:
+        rows = max(1, 2 ** 16 // max(1, simulations.shape[-1]))
+        likes = []
+        for i in range(0, len(simulations), rows):
+            # The runs take the place of the evaluation, as in objectivefunction(list(s), evaluation)
+            runs = simulations[i:i + rows].view(spotpy.objectivefunctions._Runs)
+            likes.extend(objectivefunction(runs, evaluation))
+        return likes
+    return [objectivefunction(list(s), evaluation) for s in simulations]
 
 def compare_different_objectivefunctions(like1,like2):
     """
@@ -270,14 +456,37 @@ def get_posterior(results,percentage=10, maximize=True):
     :maximize: If True (default), higher "like1" column values are assumed to be better.
                If False, lower "like1" column values are assumed to be better.
 
+    All runs tied with the "like1" percentile are part of the posterior, for arrays and
+    for a ResultStream.
+
     :return: Posterior result array
     :rtype: array
     """
+    if isinstance(results, ResultStream):
+        return _get_posterior_stream(results, percentage, maximize)
+    return results[_posterior_index(results['like1'], results['like1'], percentage, maximize)]
+
+def _posterior_index(like, all_like, percentage, maximize):
+    """
+    The runs of like, that belong to the best percentage of all_like. All runs tied
+    with the percentile of all_like are kept.
+    """
     if maximize:
-        index = np.where(results['like1']>=np.percentile(results['like1'],100.0-percentage))
+        return np.where(like >= np.percentile(all_like, 100.0 - percentage))
     else:
-        index = np.where(results['like1']>=np.percentile(results['like1'],100.0-percentage))
-    return results[index]
+        return np.where(like >= np.percentile(all_like, 100.0 - percentage))
+
+def _get_posterior_stream(results, percentage, maximize):
+    """
+    get_posterior for a ResultStream. The percentile is computed from the like1 column
+    in a first pass, then the runs beyond the percentile are kept, while the chunks are read.
+    """
+    likes = [chunk['like1'] for chunk in results.select(['like1'])]
+    if not likes:
+        return None
+    all_like = np.concatenate(likes)
+    return np.concatenate([chunk[_posterior_index(chunk['like1'], all_like, percentage, maximize)]
+                           for chunk in results])
 
 def plot_parameter_uncertainty(posterior_results,evaluation):
     import pylab as plt
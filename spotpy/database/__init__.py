@@ -31,7 +31,11 @@ def __getattr__(name):
 def get_datawriter(dbformat, *args, **kwargs):
     """Given a dbformat (ram, csv, sql, noData, etc), return the constructor
         of the appropriate class from this file.
+        With background=True, the datawriter saves the runs in a thread (see base.background)
     """
     db_class = __getattr__(dbformat)
     datawriter = db_class(*args, **kwargs)
+    if kwargs.get('background', False):
+        from .base import background
+        datawriter = background(datawriter)
     return datawriter
@@ -14,6 +14,8 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 import numpy as np
+import copy
+import threading
 import time
 from itertools import product
 import sys
@@ -22,6 +24,31 @@ if sys.version_info[0] >= 3:
 
 from importlib import import_module
 
+try:
+    from queue import Queue
+except ImportError:
+    from Queue import Queue
+
+_float16_strings = None
+
+
+def _float16_table():
+    """
+    :return: The string of every float16 value, indexed by the bits of the value
+    """
+    global _float16_strings
+    if _float16_strings is None:
+        values = np.arange(2 ** 16, dtype=np.uint16).view(np.float16)
+        _float16_strings = np.array([unicode(v) for v in values])
+    return _float16_strings
+
+def _structured(data, names):
+    """
+    :return: A structured view of a 2D array with one field per column
+    """
+    dtype = np.dtype([(str(name), data.dtype) for name in names])
+    return data.view(dtype).reshape(len(data))
+
 class database(object):
     """
     Parent class for database. It can handle the basic functionalities of all
@@ -123,6 +150,32 @@ class database(object):
     def _tuple_2_xrange(self, t):
         return (range(1, x + 1) for x in t)
 
+    def _column_counts(self):
+        '''
+        :return: The number of columns for like, parameters, simulation and chain in a row
+        '''
+        n_like = int(np.prod(self.singular_data_lens[0]))
+        n_par = int(np.prod(self.singular_data_lens[1]))
+        return [n_like, n_par, len(self.header) - n_like - n_par - 1, 1]
+
+    def _fill_row(self, row, objectivefunction, parameterlist, simulations, chains):
+        '''
+        Writes the values of a run into row, a numpy array with one entry per header column
+        :return: False, if the run does not fit into the row
+        '''
+        parts = [objectivefunction, parameterlist, simulations if self.save_sim else [], [chains]]
+        start = 0
+        try:
+            for part, size in zip(parts, self._column_counts()):
+                values = np.ravel(part)
+                if values.size != size:
+                    return False
+                row[start:start + size] = values
+                start += size
+        except (TypeError, ValueError):
+            return False
+        return True
+
 
 class noData(database):
     """
@@ -170,4 +223,67 @@ class custom(database):
         pass
 
 
+class background(object):
+    """
+    This class wraps a datawriter and saves the runs in a dedicated thread, so
+    the sampler can send new jobs to the workers while the runs are written.
+
+    The runs are passed to the thread through a queue of maxsize runs. If the queue
+    is full, save waits until the thread has written a run (back-pressure).
+    getdata and finalize wait until all queued runs are written. An error of the
+    datawriter is raised by the next call of save, getdata or finalize.
+    """
+    # Maximum number of runs waiting to be written
+    maxsize = 1000
+
+    def __init__(self, datawriter):
+        self.datawriter = datawriter
+        self.queue = Queue(maxsize=max(1, self.maxsize))
+        self.error = None
+        self.thread = threading.Thread(target=self._write, name='spotpy-datawriter')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def __getattr__(self, name):
+        # Attributes like header and dbname are taken from the datawriter
+        return getattr(self.__dict__['datawriter'], name)
+
+    def _write(self):
+        """
+        Saves the queued runs until None is queued
+        """
+        while True:
+            run = self.queue.get()
+            try:
+                if run is None:
+                    return
+                if self.error is None:
+                    args, kwargs = run
+                    self.datawriter.save(*args, **kwargs)
+            except Exception as e:
+                self.error = e
+            finally:
+                self.queue.task_done()
 
+    def _raise_error(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def save(self, objectivefunction, parameterlist, simulations=None, *args, **kwargs):
+        self._raise_error()
+        # The sampler and the parallel backends may reuse their arrays for the next run
+        run = (objectivefunction, parameterlist, simulations) + args
+        self.queue.put((copy.deepcopy(run), kwargs))
+
+    def finalize(self):
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+        self._raise_error()
+        self.datawriter.finalize()
+
+    def getdata(self):
+        self.queue.join()
+        self._raise_error()
+        return self.datawriter.getdata()
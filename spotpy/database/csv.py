@@ -2,19 +2,140 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
-from .base import database
+from .base import database, _float16_table, _structured
+from fnmatch import fnmatch
+from itertools import islice
 import numpy as np
 import io
 import time
 import sys
+import warnings
 if sys.version_info[0] >= 3:
     unicode = str
 
+
+def _parse_lines(lines, columns):
+    """
+    Parses lines of comma separated values
+    :return: A 2D float array with a row for every line with the number of columns
+    """
+    text = b''.join(lines).replace(b'\n', b',').decode('ascii', 'replace')
+    with warnings.catch_warnings():
+        # Unparsable text is a DeprecationWarning in older numpy versions
+        warnings.simplefilter('error', DeprecationWarning)
+        try:
+            values = np.fromstring(text, sep=',')
+            if values.size == len(lines) * columns:
+                return values.reshape(len(lines), columns)
+        except (ValueError, DeprecationWarning):
+            pass
+    # Like np.genfromtxt(..., invalid_raise=False), fields that can not be parsed (e.g. empty
+    # fields of failed runs) are NaN and lines with a wrong number of fields are left out
+    rows = []
+    for line in lines:
+        fields = line.rstrip(b'\r\n').split(b',')
+        if len(fields) == columns:
+            rows.append([_parse_field(field) for field in fields])
+    return np.array(rows, dtype=float).reshape(len(rows), columns)
+
+
+def _parse_field(field):
+    """
+    :return: The float value of a field, or NaN if the field is not a number
+    """
+    try:
+        return float(field)
+    except ValueError:
+        return np.nan
+
+
+def _read_header(f):
+    """
+    :return: The field names (like np.genfromtxt(..., names=True)) of the header line of f
+    """
+    header = f.readline().decode('utf-8').strip().split(',')
+    return list(np.lib._iotools.NameValidator()(header))
+
+
+def _select(names, columns):
+    """
+    :param columns: None for all columns, or names (may contain wildcards like 'par*') or indices of columns
+    :return: The indices of the selected columns
+    """
+    if columns is None:
+        return list(range(len(names)))
+    return [i for i, name in enumerate(names)
+            if any(i == c if isinstance(c, int) else fnmatch(name, c) for c in columns)]
+
+
+def iter_results(dbname, columns=None, chunksize=2 ** 14):
+    """
+    Reads dbname.csv in chunks, without holding the whole file in memory
+
+    :param dbname: Name of the file, without the .csv ending
+    :param columns: Names of the columns to read, may contain wildcards (e.g. ['like1', 'par*']).
+                    If None, all columns are read
+    :param chunksize: Number of lines parsed at once
+    :return: A generator of structured arrays with up to chunksize runs
+    """
+    with io.open(dbname + '.csv', 'rb') as f:
+        names = _read_header(f)
+        index = _select(names, columns)
+        dtype = np.dtype([(str(names[i]), np.float64) for i in index])
+        while True:
+            lines = list(islice(f, chunksize))
+            if not lines:
+                return
+            values = _parse_lines(lines, len(names))
+            if len(index) < len(names):
+                values = values[:, index]
+            yield _structured(np.ascontiguousarray(values), dtype.names)
+
+
+def load_results(dbname, columns=None, mmap_file=None, chunksize=2 ** 14):
+    """
+    Reads dbname.csv chunk by chunk into a structured array
+
+    :param dbname: Name of the file, without the .csv ending
+    :param columns: Names of the columns to read, may contain wildcards (e.g. ['like1', 'par*']).
+                    If None, all columns are read
+    :param mmap_file: If given, the runs are written to this .npy file and a memory mapped
+                      array of the file is returned, for results larger than the memory
+    :param chunksize: Number of lines parsed at once
+    :return: A structured array with the runs
+    """
+    # Count the lines to allocate the result at once
+    with io.open(dbname + '.csv', 'rb') as f:
+        names = _read_header(f)
+        rows = sum(block.count(b'\n') for block in iter(lambda: f.read(2 ** 24), b''))
+        f.seek(-1, io.SEEK_END)
+        if f.tell() and f.read(1) != b'\n':
+            rows += 1
+    index = _select(names, columns)
+    dtype = np.dtype([(str(names[i]), np.float64) for i in index])
+    if mmap_file is None:
+        data = np.empty(rows, dtype=dtype)
+    else:
+        data = np.lib.format.open_memmap(mmap_file, mode='w+', dtype=dtype, shape=(rows,))
+    count = 0
+    for chunk in iter_results(dbname, columns, chunksize):
+        data[count:count + len(chunk)] = chunk
+        count += len(chunk)
+    return data[:count]
+
 class csv(database):
     """
     This class saves the process in the working storage. It can be used if
     safety matters.
+
+    The runs are collected in a block of db_precision values and the block is
+    formatted and written at once, when it is full, after flush_interval seconds
+    and at the end of the sampling. The file is the same as written run by run.
     """
+    # Maximum number of values (runs * columns) collected before they are written
+    buffer_size = 2 ** 18
+    # Maximum time in seconds between two writes to the disc
+    flush_interval = 2
 
     def __init__(self, *args, **kwargs):
         # init base class
@@ -30,27 +151,78 @@ class csv(database):
             print("* Appending to database file '{}.csv'.".format(self.dbname))
             # Continues writing file
             self.db = io.open(self.dbname + '.csv', 'a')
+        self.block = None
+        self.count = 0
+        try:
+            dtype = np.dtype(self.db_precision)
+        except TypeError:
+            dtype = None
+        # Only floats are collected in the block, other precisions are written run by run
+        self.dtype = dtype if dtype is not None and dtype.kind == 'f' else None
 
     def save(self, objectivefunction, parameterlist, simulations=None, chains=1):
+        if self.dtype is None or not self._collect(objectivefunction, parameterlist, simulations, chains):
+            # The run does not fit into the block, keep the order of the runs
+            self._write_block()
+            self.db.write(self._format_run(objectivefunction, parameterlist, simulations, chains))
+
+        acttime = time.time()
+        # Force writing to disc at least every two seconds
+        if acttime - self.last_flush >= self.flush_interval:
+            self._write_block()
+            self.db.flush()
+            self.last_flush = time.time()
+
+    def _collect(self, objectivefunction, parameterlist, simulations, chains):
+        """
+        Puts a run into the next row of the block
+        :return: False, if the run does not fit into a row
+        """
+        if self.block is None:
+            rows = max(1, self.buffer_size // len(self.header))
+            self.block = np.empty((rows, len(self.header)), dtype=self.dtype)
+        if not self._fill_row(self.block[self.count], objectivefunction, parameterlist, simulations, chains):
+            return False
+        self.count += 1
+        if self.count == len(self.block):
+            self._write_block()
+        return True
+
+    def _format_run(self, objectivefunction, parameterlist, simulations, chains):
         coll = (self.dim_dict['like'](objectivefunction) +
                 self.dim_dict['par'](parameterlist) +
                 self.dim_dict['simulation'](simulations) +
                 [chains])
         # Apply rounding of floats
         coll = map(self.db_precision, coll)
-        self.db.write(
-            ','.join(map(str, coll)) + '\n')
+        return ','.join(map(str, coll)) + '\n'
 
-        acttime = time.time()
-        # Force writing to disc at least every two seconds
-        if acttime - self.last_flush >= 2:
-            self.db.flush()
-            self.last_flush = time.time()
+    def _write_block(self):
+        """
+        Formats the collected runs and writes them to the file
+        """
+        if not self.count:
+            return
+        block = self.block[:self.count]
+        if self.dtype == np.float16:
+            rows = _float16_table()[block.view(np.uint16)].tolist()
+            lines = [','.join(row) for row in rows]
+        elif self.dtype == np.float64:
+            # repr of a python float is the same as str of a numpy float64, also on python 2,
+            # where str of a python float has only 12 digits
+            lines = [','.join(map(repr, row)) for row in block.tolist()]
+        else:
+            lines = [','.join(map(str, row)) for row in block]
+        self.db.write(unicode('\n'.join(lines) + '\n'))
+        self.count = 0
 
     def finalize(self):
+        self._write_block()
         self.db.flush()  # Just to make sure that everything is written in file
         self.db.close()
 
     def getdata(self):
-        data = np.genfromtxt(self.dbname + '.csv', delimiter=',', names=True)
-        return data
+        if not self.db.closed:
+            self._write_block()
+            self.db.flush()
+        return load_results(self.dbname)
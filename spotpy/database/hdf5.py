@@ -14,20 +14,66 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 
+from fnmatch import fnmatch
 import numpy as np
+from numpy.lib.recfunctions import repack_fields
 from .base import database
 import tables
 import sys
+import time
 if sys.version_info[0] >= 3:
     unicode = str
 
 
+def iter_results(dbname, columns=None, chunksize=2 ** 14):
+    """
+    Reads the runs of dbname.h5 in chunks, without holding the whole table in memory
+
+    :param dbname: Name of the file, without the .h5 ending
+    :param columns: Names of the columns to read, may contain wildcards (e.g. ['like1', 'par*']).
+                    If None, all columns are read. The simulation is a single column named 'simulation'
+    :param chunksize: Number of runs in a chunk
+    :return: A generator of structured arrays with up to chunksize runs
+    """
+    with tables.open_file(dbname + '.h5', 'r') as db:
+        table = db.root[dbname]
+        names = [name for name in table.colnames
+                 if columns is None or any(fnmatch(name, pattern) for pattern in columns)]
+        for start in range(0, table.nrows, chunksize):
+            chunk = table.read(start, start + chunksize)
+            yield repack_fields(chunk[names])
+
+
 class hdf5(database):
     """
     A database class to store the result in hdf5 tables.
 
     This is only available if PyTables is installed
+
+    The table is compressed with the filter complib (with zlib as fallback, if the
+    library is not available) and its chunks are sized for the number of repetitions
+    of the sampler. The runs are collected in a block, which is appended to the table,
+    when it is full and after flush_interval seconds.
     """
+    # Compression library (e.g. 'blosc', 'blosc:lz4', 'zlib') and level (0 - 9, 0 is no compression)
+    complib = 'blosc:lz4'
+    complevel = 5
+    # Number of runs appended to the table at once
+    buffer_rows = 1000
+    # Maximum time in seconds between two writes to the disc
+    flush_interval = 2
+
+    def get_filters(self):
+        """
+        Returns the compression filters for the table
+        """
+        if not self.complevel:
+            return None
+        complib = self.complib
+        if tables.which_lib_version(complib.split(':')[0]) is None:
+            complib = 'zlib'
+        return tables.Filters(complevel=self.complevel, complib=complib, shuffle=True)
+
     def get_table_def(self):
         """
         Returns a dict of column definitions using multidimensional
@@ -79,26 +125,47 @@ class hdf5(database):
         if not kwargs.get('dbappend', False):
             # Create an open file, which needs to be closed after the sampling
             self.db = tables.open_file(self.dbname + '.h5', 'w', self.dbname)
-            self.table = self.db.create_table('/', self.dbname, description=self.get_table_def())
+            self.table = self.db.create_table('/', self.dbname, description=self.get_table_def(),
+                                              filters=self.get_filters(),
+                                              expectedrows=kwargs.get('repetitions') or 10000)
         else:
             # Continues writing file
             self.db = tables.open_file(self.dbname + '.h5', 'a')
             self.table = self.db.root[self.dbname]
+        self.block = np.zeros(max(1, self.buffer_rows), dtype=self.table.dtype)
+        self.count = 0
 
     def save(self, objectivefunction, parameterlist, simulations=None, chains=1):
-        new_row = self.table.row
-
         coll = self.dim_dict['like'](objectivefunction) + self.dim_dict['par'](parameterlist)
-        for header, value in zip(self.header, coll):
-            new_row[header] = value
         if self.save_sim:
-            new_row['simulation'] = simulations
-        new_row['chains'] = chains
-        new_row.append()
+            coll.append(simulations)
+        coll.append(chains)
+        # The fields of the block are ordered by the positions of the columns
+        self.block[self.count] = tuple(coll)
+        self.count += 1
+
+        acttime = time.time()
+        if self.count == len(self.block) or acttime - self.last_flush >= self.flush_interval:
+            self._append_block()
+            self.table.flush()
+            self.last_flush = acttime
+
+    def _append_block(self):
+        """
+        Appends the collected runs to the table
+        """
+        if self.count:
+            self.table.append(self.block[:self.count])
+            self.count = 0
 
     def finalize(self):
+        self._append_block()
         self.db.close()
 
     def getdata(self):
-        with tables.open_file(self.dbname + '.h5', 'a') as db:
+        if self.db.isopen:
+            self._append_block()
+            self.table.flush()
+            return self.table[:]
+        with tables.open_file(self.dbname + '.h5', 'r') as db:
             return db.root[self.dbname][:]
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+'''
+Copyright (c) 2018 by Tobias Houska
+
+This file is part of Statistical Parameter Optimization Tool (SPOTPY).
+
+:author: Tobias Houska
+
+A binary datawriter, that stores the runs in a .npy file.
+
+All values of a run (like, parameters, simulation and chain) are written as one
+row of db_precision values to dbname.npy. The names of the columns are stored
+in dbname.json. The runs are appended to the file without any formatting and
+the shape in the header of the .npy file is updated, when the runs are written.
+
+getdata() and spotpy.analyser.load_npy_results(dbname) map the file into memory
+and return a structured array with the same fields as the other databases.
+The array is a view of the file, hence loading even large databases is fast.
+'''
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from fnmatch import fnmatch
+import io
+import json
+import struct
+import sys
+import time
+
+import numpy as np
+from .base import database, _structured
+if sys.version_info[0] >= 3:
+    unicode = str
+
+# Total size of the .npy header. It has a fixed size, so the shape can be updated in place
+_header_size = 128
+
+
+def _npy_header(dtype, shape):
+    """
+    :return: The header of a .npy file (version 1.0) with a fixed size of _header_size
+    """
+    text = "{'descr': '%s', 'fortran_order': False, 'shape': (%i, %i), }" % (
+        np.lib.format.dtype_to_descr(dtype), shape[0], shape[1])
+    text = text.ljust(_header_size - 10 - 1) + '\n'
+    return b'\x93NUMPY\x01\x00' + struct.pack('<H', len(text)) + text.encode('latin1')
+
+
+def load_results(dbname):
+    """
+    Maps dbname.npy into memory
+    :return: A read-only structured array with the runs
+    """
+    with io.open(dbname + '.json') as f:
+        info = json.load(f)
+    data = np.load(dbname + '.npy', mmap_mode='r')
+    if not len(data):
+        return np.zeros(0, dtype=[(str(name), data.dtype) for name in info['header']])
+    return _structured(data, info['header'])
+
+
+def iter_results(dbname, columns=None, chunksize=2 ** 14):
+    """
+    Reads the runs of dbname.npy in chunks from the memory mapped file
+
+    :param dbname: Name of the file, without the .npy ending
+    :param columns: Names of the columns to read, may contain wildcards (e.g. ['like1', 'par*']).
+                    If None, all columns are read
+    :param chunksize: Number of runs in a chunk
+    :return: A generator of structured arrays with up to chunksize runs
+    """
+    with io.open(dbname + '.json') as f:
+        header = json.load(f)['header']
+    data = np.load(dbname + '.npy', mmap_mode='r')
+    index = [i for i, name in enumerate(header)
+             if columns is None or any(fnmatch(name, pattern) for pattern in columns)]
+    names = [header[i] for i in index]
+    for start in range(0, len(data), chunksize):
+        yield _structured(np.ascontiguousarray(data[start:start + chunksize, index]), names)
+
+
+class npy(database):
+    """
+    This class saves the runs in a binary .npy file, which is fast to write and
+    to read. The runs are collected in a block and the block is written, when it
+    is full, after flush_interval seconds and at the end of the sampling.
+    """
+    # Maximum number of values (runs * columns) collected before they are written
+    buffer_size = 2 ** 18
+    # Maximum time in seconds between two writes to the disc
+    flush_interval = 2
+
+    def __init__(self, *args, **kwargs):
+        # init base class
+        super(npy, self).__init__(*args, **kwargs)
+        self.dtype = np.dtype(self.db_precision)
+        columns = len(self.header)
+        if kwargs.get('dbappend', False) is False:
+            print("* Database file '{}.npy' created.".format(self.dbname))
+            self.db = io.open(self.dbname + '.npy', 'w+b')
+            self.rows = 0
+            self.db.write(_npy_header(self.dtype, (0, columns)))
+            with io.open(self.dbname + '.json', 'w') as f:
+                f.write(unicode(json.dumps({'header': self.header,
+                                    'dtype': np.lib.format.dtype_to_descr(self.dtype),
+                                    'columns': dict(zip(['like', 'par', 'simulation', 'chain'],
+                                                        self._column_counts()))},
+                                   indent=1)))
+        else:
+            print("* Appending to database file '{}.npy'.".format(self.dbname))
+            self.db = io.open(self.dbname + '.npy', 'r+b')
+            np.lib.format.read_magic(self.db)
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(self.db)
+            if self.db.tell() != _header_size or shape[1:] != (columns,) or dtype != self.dtype:
+                raise ValueError('{}.npy does not fit to the runs of the sampler'.format(self.dbname))
+            self.rows = shape[0]
+            self.db.seek(0, io.SEEK_END)
+        self.block = np.empty((max(1, self.buffer_size // columns), columns), dtype=self.dtype)
+        self.count = 0
+
+    def save(self, objectivefunction, parameterlist, simulations=None, chains=1):
+        if not self._fill_row(self.block[self.count], objectivefunction, parameterlist, simulations, chains):
+            raise ValueError('The run does not fit into the {} columns of the npy database'.format(
+                len(self.header)))
+        self.count += 1
+        acttime = time.time()
+        if self.count == len(self.block) or acttime - self.last_flush >= self.flush_interval:
+            self._write_block()
+            self.db.flush()
+            self.last_flush = acttime
+
+    def _write_block(self):
+        """
+        Appends the collected runs to the file and updates the shape in the header
+        """
+        if not self.count:
+            return
+        self.db.seek(0, io.SEEK_END)
+        self.db.write(self.block[:self.count].tobytes())
+        self.rows += self.count
+        self.count = 0
+        self.db.seek(0)
+        self.db.write(_npy_header(self.dtype, (self.rows, len(self.header))))
+        self.db.seek(0, io.SEEK_END)
+
+    def finalize(self):
+        self._write_block()
+        self.db.close()
+
+    def getdata(self):
+        if not self.db.closed:
+            self._write_block()
+            self.db.flush()
+        return load_results(self.dbname)
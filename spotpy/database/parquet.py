@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+'''
+Copyright (c) 2018 by Tobias Houska
+
+This file is part of Statistical Parameter Optimization Tool (SPOTPY).
+
+:author: Tobias Houska
+
+A datawriter for Apache Parquet files (dbformat='parquet'), needs pyarrow.
+
+The likes, parameters and the chain are stored as one column each, like in a csv
+file. The simulation of a run is stored as a single fixed size list column named
+'simulation', instead of one column per simulated value. The runs are collected
+in a block, which is written as a row group of the file, when it is full and at
+the end of the sampling. The file is readable, when the sampling is finished.
+
+getdata(columns) and spotpy.analyser.load_parquet_results(dbname, columns) read
+only the selected columns and return a structured array with the same fields as
+the csv database (like1, parx, ..., simulation_0, ..., chain).
+'''
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from fnmatch import fnmatch
+import json
+import os
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from .base import database
+
+
+def _read_info(db, columns):
+    """
+    :return: The metadata of the spotpy file, the selected field names and the columns to read
+    """
+    info = json.loads(db.schema_arrow.metadata[b'spotpy'].decode('utf-8'))
+    names = info['header']
+    if columns is not None:
+        names = [name for name in names if any(fnmatch(name, pattern) for pattern in columns)]
+    # The simulation fields are read from one column
+    read = [name for name in names if name not in info['simulation']]
+    if set(info['simulation']).intersection(names):
+        read.append('simulation')
+    return info, names, read
+
+
+def _to_structured(table, info, names):
+    """
+    :return: A structured array with the fields names from an arrow table
+    """
+    simulation_names = set(info['simulation'])
+    dtype = np.dtype(info['dtype'])
+    data = np.zeros(table.num_rows, dtype=[(str(name), dtype) for name in names])
+    for name in names:
+        if name not in simulation_names:
+            data[name] = table.column(name).to_numpy()
+    if simulation_names.intersection(names):
+        simulation = table.column('simulation').combine_chunks()
+        values = simulation.flatten().to_numpy().reshape(table.num_rows, len(info['simulation']))
+        for i, name in enumerate(info['simulation']):
+            if name in data.dtype.names:
+                data[name] = values[:, i]
+    return data
+
+
+def load_results(dbname, columns=None):
+    """
+    Reads the runs from dbname.parquet
+
+    :param dbname: Name of the file, without the .parquet ending
+    :param columns: Names of the fields to read, may contain wildcards (e.g. ['like1', 'par*']).
+                    If None, all fields are read
+    :return: A structured array with the runs
+    """
+    db = pq.ParquetFile(dbname + '.parquet')
+    info, names, read = _read_info(db, columns)
+    return _to_structured(db.read(columns=read), info, names)
+
+
+def iter_results(dbname, columns=None, chunksize=2 ** 14):
+    """
+    Reads the runs from dbname.parquet in chunks, without holding the whole file in memory
+
+    :param dbname: Name of the file, without the .parquet ending
+    :param columns: Names of the fields to read, may contain wildcards (e.g. ['like1', 'par*']).
+                    If None, all fields are read
+    :param chunksize: Number of runs in a chunk
+    :return: A generator of structured arrays with up to chunksize runs
+    """
+    db = pq.ParquetFile(dbname + '.parquet')
+    info, names, read = _read_info(db, columns)
+    for batch in db.iter_batches(batch_size=chunksize, columns=read):
+        yield _to_structured(pa.Table.from_batches([batch]), info, names)
+
+
+class parquet(database):
+    """
+    This class saves the runs in an Apache Parquet file, for the analysis with
+    Arrow based tools. The runs are written in row groups of up to buffer_size
+    values (runs * columns).
+    """
+    # Maximum number of values (runs * columns) collected before they are written
+    buffer_size = 2 ** 20
+    # Compression of the file ('snappy', 'zstd', 'gzip', 'lz4' or 'none')
+    compression = 'snappy'
+
+    def __init__(self, *args, **kwargs):
+        # init base class
+        super(parquet, self).__init__(*args, **kwargs)
+        self.dtype = np.dtype(self.db_precision)
+        # Parquet has no half precision floats, they are stored as single precision
+        self.file_dtype = np.dtype(np.float32) if self.dtype == np.float16 else self.dtype
+        value_type = pa.from_numpy_dtype(self.file_dtype)
+
+        n_like, n_par, n_sim = self._column_counts()[:3]
+        self.simulation_columns = slice(n_like + n_par, n_like + n_par + n_sim)
+        fields = [pa.field(name, value_type) for name in self.header[:n_like + n_par]]
+        if n_sim:
+            fields.append(pa.field('simulation', pa.list_(value_type, n_sim)))
+        fields.append(pa.field(self.header[-1], value_type))
+        info = {'header': self.header,
+                'simulation': self.header[self.simulation_columns],
+                'dtype': np.lib.format.dtype_to_descr(self.file_dtype)}
+        self.schema = pa.schema(fields, metadata={'spotpy': json.dumps(info)})
+
+        filename = self.dbname + '.parquet'
+        if kwargs.get('dbappend', False) is False:
+            print("* Database file '{}' created.".format(filename))
+            self.db = pq.ParquetWriter(filename, self.schema, compression=self.compression)
+        else:
+            # A parquet file can not be continued, the row groups are copied into a new file
+            print("* Appending to database file '{}'.".format(filename))
+            if not pq.read_schema(filename).equals(self.schema):
+                raise ValueError('{} does not fit to the runs of the sampler'.format(filename))
+            os.replace(filename, filename + '.old')
+            old = pq.ParquetFile(filename + '.old')
+            self.db = pq.ParquetWriter(filename, self.schema, compression=self.compression)
+            for i in range(old.num_row_groups):
+                self.db.write_table(old.read_row_group(i))
+            old.close()
+            os.remove(filename + '.old')
+        self.block = np.empty((max(1, self.buffer_size // len(self.header)), len(self.header)),
+                              dtype=self.dtype)
+        self.count = 0
+
+    def save(self, objectivefunction, parameterlist, simulations=None, chains=1):
+        if not self._fill_row(self.block[self.count], objectivefunction, parameterlist, simulations, chains):
+            raise ValueError('The run does not fit into the {} columns of the parquet database'.format(
+                len(self.header)))
+        self.count += 1
+        if self.count == len(self.block):
+            self._write_block()
+
+    def _write_block(self):
+        """
+        Writes the collected runs as a row group
+        """
+        if not self.count:
+            return
+        block = self.block[:self.count].astype(self.file_dtype)
+        sim = self.simulation_columns
+        columns = [pa.array(block[:, i]) for i in range(sim.start)]
+        if sim.stop > sim.start:
+            values = pa.array(np.ascontiguousarray(block[:, sim]).ravel())
+            columns.append(pa.FixedSizeListArray.from_arrays(values, sim.stop - sim.start))
+        columns.append(pa.array(block[:, -1]))
+        self.db.write_table(pa.Table.from_arrays(columns, schema=self.schema))
+        self.count = 0
+
+    def finalize(self):
+        self._write_block()
+        self.db.close()
+        self.db = None
+
+    def getdata(self, columns=None):
+        """
+        Reads the runs from the file, after the sampling is finished
+
+        :param columns: Names of the fields to read, may contain wildcards (e.g. ['like1', 'par*']).
+                        If None, all fields are read
+        :return: A structured array with the runs
+        """
+        if self.db is not None:
+            raise ValueError('{}.parquet can be read after the sampling is finished'.format(self.dbname))
+        return load_results(self.dbname, columns)
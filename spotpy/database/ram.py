@@ -15,7 +15,7 @@ from __future__ import print_function
 from __future__ import unicode_literals
 
 import numpy as np
-from .base import database
+from .base import database, _structured
 import sys
 if sys.version_info[0] >= 3:
     unicode = str
@@ -25,39 +25,42 @@ class ram(database):
     """
     This class saves the process in the working storage. It can be used if
     time matters.
+
+    The runs are written into the rows of a preallocated array, which is sized for
+    the repetitions of the sampler and doubled, when more runs are saved.
     """
+    # Number of rows allocated, if the repetitions are not known
+    initial_rows = 1000
 
     def __init__(self, *args, **kwargs):
         # init base class
         super(ram, self).__init__(*args, **kwargs)
         # init the status vars
-        self.ram = []
+        rows = kwargs.get('repetitions') or self.initial_rows
+        self.ram = np.zeros((max(1, rows), len(self.header)), dtype=np.float64)
+        self.count = 0
 
     def save(self, objectivefunction, parameterlist, simulations=None,
              chains=1):
-        self.ram.append(tuple(self.dim_dict['like'](objectivefunction) +
-                              self.dim_dict['par'](parameterlist) +
-                              self.dim_dict['simulation'](simulations) +
-                              [chains]))
+        if self.count == len(self.ram):
+            grown = np.zeros((2 * len(self.ram), len(self.header)), dtype=self.ram.dtype)
+            grown[:self.count] = self.ram
+            self.ram = grown
+        if not self._fill_row(self.ram[self.count], objectivefunction, parameterlist, simulations, chains):
+            raise ValueError('The run does not fit into the {} columns of the ram database'.format(
+                len(self.header)))
+        self.count += 1
 
     def finalize(self):
         """
         Is called in a last step of every algorithm.
-        Forms the List of values into a strutured numpy array in order to have
-        the same structure as a csv database.
+        Releases the rows, which were allocated but not used.
         """
-        dt = {'names': self.header,
-              'formats': [np.float] * len(self.header)}
-        i = 0
-        Y = np.zeros(len(self.ram), dtype=dt)
-
-        for line in self.ram:
-            Y[i] = line
-            i += 1
-
-        self.data = Y
+        self.ram = self.ram[:self.count].copy()
 
     def getdata(self):
         """
-        Returns a finalized database"""
-        return self.data
+        Returns the saved runs as a strutured numpy array in order to have
+        the same structure as a csv database. The array is a view of the runs, also
+        while sampling."""
+        return _structured(self.ram[:self.count], self.header)
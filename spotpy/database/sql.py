@@ -2,10 +2,12 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
+from fnmatch import fnmatch
 import numpy as np
 import sqlite3
 import sys
-from .base import database
+import time
+from .base import database, _float16_table
 
 if sys.version_info[0] >= 3:
     unicode = str
@@ -31,58 +33,167 @@ class PickalableSQL3Cursor(sqlite3.Cursor, PickalableSWIG):
 
 
 
+def _quote(name):
+    """
+    :return: name as a quoted sql identifier
+    """
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _select(db_cursor, dbname, columns=None, threshold=None, like='like1'):
+    """
+    Executes a query for the runs in the table dbname
+    :return: The dtype of a run and the cursor with the selected rows
+    """
+    names = [row[1] for row in db_cursor.execute("PRAGMA table_info(" + _quote(dbname) + ");")]
+    if columns is not None:
+        names = [name for name in names if any(fnmatch(name, pattern) for pattern in columns)]
+    if sys.version_info[0] >= 3:
+        headers = [(name, "<f8") for name in names]
+    else:
+        # Workaround for python2
+        headers = [(unicode(name).encode("ascii"), unicode("<f8").encode("ascii")) for name in names]
+
+    query = 'SELECT ' + ','.join(map(_quote, names)) + ' FROM ' + _quote(dbname)
+    if threshold is None:
+        rows = db_cursor.execute(query)
+    else:
+        rows = db_cursor.execute(query + ' WHERE ' + _quote(like) + ' > ?', (threshold,))
+    return headers, rows
+
+
+def iter_results(dbname, columns=None, chunksize=2 ** 14):
+    """
+    Reads the runs of dbname.db in chunks, without holding the whole database in memory
+
+    :param dbname: Name of the database, without the .db ending
+    :param columns: Names of the columns to read, may contain wildcards (e.g. ['like1', 'par*']).
+                    If None, all columns are read
+    :param chunksize: Number of runs in a chunk
+    :return: A generator of structured arrays with up to chunksize runs
+    """
+    db = PickalableSQL3Connect(dbname + '.db')
+    try:
+        headers, rows = _select(PickalableSQL3Cursor(db), dbname, columns)
+        while True:
+            chunk = rows.fetchmany(chunksize)
+            if not chunk:
+                return
+            yield np.array(chunk, dtype=headers)
+    finally:
+        db.close()
+
+
 class sql(database):
     """
-    This class saves the process in the working storage. It can be used if
+    This class saves the process in a sqlite database. It can be used if
     safety matters.
+
+    The runs are collected and inserted with one executemany call and one commit,
+    every commit_every runs and after commit_interval seconds. The database uses
+    the write ahead log, so the runs can be read by other processes while sampling.
     """
+    # Number of runs inserted with one commit
+    commit_every = 1000
+    # Maximum time in seconds between two commits
+    commit_interval = 2
 
     def __init__(self, *args, **kwargs):
         import os
         # init base class
         super(sql, self).__init__(*args, **kwargs)
+        if kwargs.get('dbappend', False) is False:
+            # A new database replaces an existing one
+            for ending in ('.db', '.db-wal', '.db-shm'):
+                try:
+                    os.remove(self.dbname + ending)
+                except OSError:
+                    pass
         # Create a open file, which needs to be closed after the sampling
-        try:
-            os.remove(self.dbname + '.db')
-        except:
-            pass
-
         self.db = PickalableSQL3Connect(self.dbname + '.db')
         self.db_cursor = PickalableSQL3Cursor(self.db)
+        self.db_cursor.execute('PRAGMA journal_mode=WAL')
+        self.db_cursor.execute('PRAGMA synchronous=NORMAL')
         # Create Table
         #        self.db_cursor.execute('''CREATE TABLE IF NOT EXISTS  '''+self.dbname+'''
         #                     (like1 real, parx real, pary real, simulation1 real, chain int)''')
-        self.db_cursor.execute('''CREATE TABLE IF NOT EXISTS  ''' + self.dbname + '''
-                     (''' + ' real ,'.join(self.header) + ''')''')
-
-    def save(self, objectivefunction, parameterlist, simulations=None, chains=1):
-        coll = (self.dim_dict['like'](objectivefunction) +
-                self.dim_dict['par'](parameterlist) +
-                self.dim_dict['simulation'](simulations) +
-                [chains])
-        # Apply rounding of floats
-        coll = map(self.db_precision, coll)
-        self.db_cursor.execute(
-            "INSERT INTO " + self.dbname + " VALUES (" + '"' + str('","'.join(map(str, coll))) + '"' + ")")
-
+        self.db_cursor.execute('''CREATE TABLE IF NOT EXISTS  ''' + _quote(self.dbname) + '''
+                     (''' + ' real ,'.join(map(_quote, self.header)) + ''' real)''')
         self.db.commit()
+        self.insert = 'INSERT INTO {} VALUES ({})'.format(
+            _quote(self.dbname), ','.join('?' * len(self.header)))
+        try:
+            dtype = np.dtype(self.db_precision)
+        except TypeError:
+            dtype = None
+        # Only floats are collected in a block, other precisions are inserted run by run
+        self.dtype = dtype if dtype is not None and dtype.kind == 'f' else None
+        self.block = None
+        self.count = 0
+        self.closed = False
 
-    def finalize(self):
-        self.db.close()
-
-    def getdata(self):
-        self.db = PickalableSQL3Connect(self.dbname + '.db')
-        self.db_cursor = PickalableSQL3Cursor(self.db)
-
-        if sys.version_info[0] >= 3:
-            headers = [(row[1], "<f8") for row in
-                       self.db_cursor.execute("PRAGMA table_info(" + self.dbname + ");")]
+    def save(self, objectivefunction, parameterlist, simulations=None, chains=1):
+        if self.block is None and self.dtype is not None:
+            self.block = np.empty((max(1, self.commit_every), len(self.header)), dtype=self.dtype)
+        if self.block is not None and self._fill_row(self.block[self.count], objectivefunction,
+                                                     parameterlist, simulations, chains):
+            self.count += 1
         else:
-            # Workaround for python2
-            headers = [(unicode(row[1]).encode("ascii"), unicode("<f8").encode("ascii")) for row in
-                       self.db_cursor.execute("PRAGMA table_info(" + self.dbname + ");")]
-
-        back = np.array([row for row in self.db_cursor.execute('SELECT * FROM ' + self.dbname)], dtype=headers)
+            # The run does not fit into the block, keep the order of the runs
+            self._insert_block()
+            coll = (self.dim_dict['like'](objectivefunction) +
+                    self.dim_dict['par'](parameterlist) +
+                    self.dim_dict['simulation'](simulations) +
+                    [chains])
+            # Apply rounding of floats
+            coll = [float(str(self.db_precision(value))) for value in coll]
+            self.db_cursor.execute(self.insert, coll)
+
+        acttime = time.time()
+        if self.count == self.commit_every or acttime - self.last_flush >= self.commit_interval:
+            self._insert_block()
+            self.db.commit()
+            self.last_flush = acttime
+
+    def _insert_block(self):
+        """
+        Inserts the collected runs
+        """
+        if not self.count:
+            return
+        block = self.block[:self.count]
+        # The values are stored as the decimal text of the rounded values, like in a csv file
+        if self.dtype == np.float16:
+            values = _float16_table()[block.view(np.uint16)].astype(float)
+        elif self.dtype == np.float64:
+            values = block
+        else:
+            values = block.astype(str).astype(float)
+        self.db_cursor.executemany(self.insert, values.tolist())
+        self.count = 0
 
+    def finalize(self):
+        self._insert_block()
+        self.db.commit()
         self.db.close()
+        self.closed = True
+
+    def getdata(self, columns=None, threshold=None, like='like1'):
+        """
+        Reads the runs from the database
+
+        :param columns: Names of the columns to read, may contain wildcards (e.g. ['like1', 'par*']).
+                        If None, all columns are read
+        :param threshold: If given, only the runs with a value of like higher than threshold are read
+        :param like: The column compared with threshold
+        :return: A structured array with the runs
+        """
+        if not self.closed:
+            self._insert_block()
+            self.db.commit()
+        db = PickalableSQL3Connect(self.dbname + '.db')
+        headers, rows = _select(PickalableSQL3Cursor(db), self.dbname, columns, threshold, like)
+        back = np.array(rows.fetchall(), dtype=headers)
+
+        db.close()
         return back
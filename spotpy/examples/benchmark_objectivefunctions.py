@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+'''
+Copyright (c) 2018 by Tobias Houska
+This file is part of Statistical Parameter Optimization Tool for Python(SPOTPY).
+:author: Tobias Houska
+
+This file compares two ways to score many model runs with the functions of
+spotpy.objectivefunctions:
+
+* per run: a python loop calling the function for every run (row)
+* batch: one call with the 2D array of all runs (runs x timesteps)
+'''
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import time
+
+import numpy as np
+
+try:
+    import spotpy
+except ImportError:
+    import sys
+    sys.path.append(".")
+    import spotpy
+
+from spotpy import objectivefunctions
+
+
+def benchmark(runs, timesteps):
+    """
+    Scores runs random simulations of timesteps values with every objective function
+    and prints the time per run
+    """
+    random = np.random.RandomState(42)
+    evaluation = random.uniform(0.5, 2, timesteps)
+    simulations = random.uniform(0.5, 2, (runs, timesteps))
+
+    print('{} runs x {} timesteps'.format(runs, timesteps))
+    for function in objectivefunctions._batch_functions:
+        start = time.time()
+        per_run = [function(evaluation, simulation) for simulation in simulations]
+        per_run_time = (time.time() - start) / runs
+        start = time.time()
+        batch = function(evaluation, simulations)
+        batch_time = (time.time() - start) / runs
+        error = np.max(np.abs(np.array(per_run) - batch))
+        print('  {:<22} {:10.1f} µs per run {:10.2f} µs per run batched ({:6.1f}x), max. difference {:.1e}'.format(
+            function.__name__, per_run_time * 1e6, batch_time * 1e6, per_run_time / batch_time, error))
+
+    start = time.time()
+    for simulation in simulations:
+        for function in objectivefunctions._all_functions:
+            function(evaluation, simulation)
+    per_run_time = (time.time() - start) / runs
+    context = objectivefunctions.EvaluationContext(evaluation)
+    start = time.time()
+    objectivefunctions.calculate_all_functions(context, simulations)
+    batch_time = (time.time() - start) / runs
+    print('  {:<22} {:10.1f} µs per run {:10.2f} µs per run batched ({:6.1f}x)'.format(
+        'calculate_all_functions', per_run_time * 1e6, batch_time * 1e6, per_run_time / batch_time))
+
+
+if __name__ == '__main__':
+    benchmark(10000, 365)
+    benchmark(1000, 10000)
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+'''
+Copyright (c) 2018 by Tobias Houska
+This file is part of Statistical Parameter Optimization Tool for Python(SPOTPY).
+:author: Tobias Houska
+
+This file compares the overhead of the ways _algorithm.simulate can call a model:
+
+* thread per run: the former implementation, starting a new thread and queue for every run
+* direct call: used if sim_timeout is None
+* watchdog thread: used if sim_timeout is set, one thread is reused for all runs
+
+The benchmark is run for the fast Rosenbrock function and the python version of hymod.
+'''
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import threading
+import time
+
+try:
+    from queue import Queue
+except ImportError:
+    from Queue import Queue
+
+try:
+    import spotpy
+except ImportError:
+    import sys
+    sys.path.append(".")
+    import spotpy
+
+from spotpy.examples.spot_setup_rosenbrock import spot_setup as rosenbrock_setup
+from spotpy.examples.spot_setup_hymod_python import spot_setup as hymod_setup
+
+
+def simulate_thread_per_run(sampler, id_params_tuple):
+    """
+    The former implementation of _algorithm.simulate
+    """
+    id, params = id_params_tuple
+    sampler.all_params[sampler.non_constant_positions] = params
+    all_params = sampler.all_params
+
+    def model_layer(q, all_params):
+        q.put(sampler.setup.simulation(sampler.partype(*all_params)))
+
+    que = Queue()
+    sim_thread = threading.Thread(target=model_layer, args=(que, all_params))
+    sim_thread.daemon = True
+    sim_thread.start()
+    sim_thread.join(sampler.sim_timeout)
+    model_result = None
+    if not que.empty():
+        model_result = que.get()
+    return id, params, model_result
+
+
+def benchmark(setup, repetitions):
+    """
+    Runs the model repetitions times with every method and prints the time per run
+    """
+    timings = []
+    for name, sim_timeout, legacy in [('thread per run', None, True),
+                                      ('direct call', None, False),
+                                      ('watchdog thread', 10, False)]:
+        sampler = spotpy.algorithms.mc(setup, dbname='benchmark', dbformat='ram',
+                                       sim_timeout=sim_timeout)
+        jobs = [(rep, sampler.parameter()['random']) for rep in range(repetitions)]
+        # Warm up, e.g. for just in time compiled models
+        sampler.simulate(jobs[0])
+        start = time.time()
+        for job in jobs:
+            if legacy:
+                simulate_thread_per_run(sampler, job)
+            else:
+                sampler.simulate(job)
+        timings.append((name, (time.time() - start) / repetitions))
+
+    print('{}, {} runs'.format(type(setup).__module__, repetitions))
+    reference = timings[0][1]
+    for name, seconds in timings:
+        print('  {:<16} {:10.1f} µs per run ({:.2f}x)'.format(name, seconds * 1e6, reference / seconds))
+
+
+if __name__ == '__main__':
+    benchmark(rosenbrock_setup(), 20000)
+    benchmark(hymod_setup(), 1000)
@@ -32,6 +32,18 @@ class spot_setup(object):
             n = float(len(vector))
         return [-20.0*np.exp(-0.2*np.sqrt(firstSum/n)) - np.exp(secondSum/n) + 20 + np.e]
 
+    def simulation_batch(self, matrix):
+        # Simulates all parameter sets (rows of matrix) at once, summing up in the same order as simulation
+        matrix = np.asarray(matrix)
+        firstSum = 0.0
+        secondSum = np.zeros(len(matrix))
+        for c in range(matrix.shape[1]):
+            firstSum += c**2.0
+            secondSum += np.cos(2.0*np.pi*matrix[:, c])
+        n = float(matrix.shape[1])
+        simulations = -20.0*np.exp(-0.2*np.sqrt(firstSum/n)) - np.exp(secondSum/n) + 20 + np.e
+        return simulations[:, np.newaxis]
+
     def evaluation(self):
         observations=[0]
         return observations
@@ -34,7 +34,20 @@ class spot_setup(object):
         for j in range(n): 
             p = p * np.cos(vector[j] / np.sqrt(j+1))
         simulation = [s / fr - p + 1]
-        return simulation     
+        return simulation
+
+    def simulation_batch(self, matrix):
+        # Simulates all parameter sets (rows of matrix) at once, summing up in the same order as simulation
+        matrix = np.asarray(matrix)
+        fr = 4000
+        s = np.zeros(len(matrix))
+        p = np.ones(len(matrix))
+        for j in range(matrix.shape[1]):
+            s = s + matrix[:, j]**2
+        for j in range(matrix.shape[1]):
+            p = p * np.cos(matrix[:, j] / np.sqrt(j+1))
+        simulations = s / fr - p + 1
+        return simulations[:, np.newaxis]     
        
     def evaluation(self):
         observations = [0]
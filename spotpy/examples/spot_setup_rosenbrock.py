@@ -28,6 +28,12 @@ class spot_setup(object):
         x=np.array(vector)
         simulations= [sum(100.0 * (x[1:] - x[:-1] ** 2.0) ** 2.0 + (1 - x[:-1]) ** 2.0)]
         return simulations
+
+    def simulation_batch(self, matrix):
+        # Simulates all parameter sets (rows of matrix) at once
+        x = np.asarray(matrix)
+        simulations = np.sum(100.0 * (x[:, 1:] - x[:, :-1] ** 2.0) ** 2.0 + (1 - x[:, :-1]) ** 2.0, axis=1)
+        return simulations[:, np.newaxis]
         
     def evaluation(self):
         observations = [0]
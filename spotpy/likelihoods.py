@@ -21,6 +21,7 @@ We modified the formula so, that a best fit of model can be archived by maximizi
 import numpy as np
 import math
 import warnings
+from .objectivefunctions import EvaluationContext
 
 
 class LikelihoodError(Exception):
@@ -60,6 +61,138 @@ def __jitter_measerror_if_needed(fun_name, measerror):
     return measerror
 
 
+def __measerror(fun_name, data, measerror):
+    """
+    Generates the measurement errors from the data, if measerror is None, and jitters zero values.
+    The generated errors of an EvaluationContext are computed only once.
+
+    :return: The measurement errors and True, if they are the cached errors of the EvaluationContext
+    """
+    def generate():
+        generated = __generateMeaserror(data)
+        generated.flags.writeable = False
+        return generated
+
+    if measerror is None and isinstance(data, EvaluationContext):
+        generated = data.cached('measerror', generate)
+        # Zero values are jittered with new random values for every run
+        if generated.all():
+            return generated, True
+    if measerror is None:
+        measerror = __generateMeaserror(data)
+    measerror = np.array(measerror)
+    return __jitter_measerror_if_needed(fun_name, measerror), False
+
+
+def __once(data, cached, name, function):
+    """
+    :return: function(), which is computed only once for the cached measurement errors of an EvaluationContext
+    """
+    if cached:
+        return data.cached(name, function)
+    return function()
+
+
+# The (first) position of every parameter name, resolved once for every set of parameter names
+__name_positions = {}
+
+
+def __positions(parameternames):
+    """
+    :param parameternames: A list or array of the parameter names
+    :return: A dict with the (first) position of every name
+    """
+    if isinstance(parameternames, np.ndarray):
+        key = tuple(parameternames.tolist())
+    else:
+        key = tuple(parameternames)
+    positions = __name_positions.get(key)
+    if positions is None:
+        positions = dict((name, i) for i, name in reversed(list(enumerate(key))))
+        # Keeps only the names of a few setups
+        if len(__name_positions) >= 64:
+            __name_positions.clear()
+        __name_positions[key] = positions
+    return positions
+
+
+def __parameter_values(params, names):
+    """
+    :param params: A tuple of the parameter values and names
+    :param names: The names of the parameters the likelihood needs
+    :return: The values of the parameters names as floats
+    :raises LikelihoodError: If a parameter is missing
+    """
+    randomparset, parameternames = params
+    positions = __positions(parameternames)
+    missingparams = [nm for nm in names if nm not in positions]
+    if missingparams.__len__() > 0:
+        raise LikelihoodError(
+            "Unfortunately contains your param list not all parameters which are needed for this class."
+            "Following parameter are needed, too: " + str(missingparams))
+    return [float(randomparset[positions[nm]]) for nm in names]
+
+
+# The loops of generalizedLikelihoodFunction, the skewed student and the AR(1) likelihoods run
+# as numba compiled kernels, if numba is installed. The kernels keep the order of the operations
+# (and of the sums and products) of the NumPy implementation, so both give the same numbers.
+# Set use_numba to False for the NumPy implementation
+use_numba = True
+__compiled_kernels = {}
+
+
+def __compiled(kernel):
+    """
+    :return: The kernel compiled with numba, or None if numba is not installed or use_numba is False
+    """
+    if not use_numba:
+        return None
+    if kernel not in __compiled_kernels:
+        try:
+            import numba
+            __compiled_kernels[kernel] = numba.njit(nogil=True)(kernel)
+        except ImportError:
+            __compiled_kernels[kernel] = None
+    return __compiled_kernels[kernel]
+
+
+def __generalized_sum_at(errorArr, measerror, phi1, xi, mu_xi, sigma_xi, beta):
+    """
+    Kernel of generalizedLikelihoodFunction, the sum of the transformed residuals a_xi_t
+    """
+    sum_at = 0.0
+    for t in range(1, len(errorArr)):
+        a_t = (errorArr[t] - phi1 * errorArr[t - 1]) / measerror[t]
+        a_xi_t = xi ** (-1 * np.sign(mu_xi + sigma_xi * a_t)) * (mu_xi + sigma_xi * a_t)
+        sum_at += np.abs(a_xi_t) ** (2 / (1 + beta))
+    return sum_at
+
+
+def __skewed_student_densities(eta_all, measerror, c_1, c_2, k, nu, numerator, denominator):
+    """
+    Kernel of the skewed student likelihoods, the densities of eta_all. They are multiplied
+    with np.prod, so the product is identical to the NumPy implementation. The constant
+    numerator and denominator are computed in python, numba has its own math.gamma
+    """
+    densities = np.empty(len(eta_all))
+    for i in range(len(eta_all)):
+        eta = c_1 + c_2 * eta_all[i]
+        densities[i] = numerator / (denominator * measerror[i + 1]) * (
+                1 + (1 / (nu - 2)) * (eta / (k ** np.sign(eta))) ** 2) ** (-(nu + 1) / 2)
+    return densities
+
+
+def __ar1_terms(errorArr, measerror, c, phi):
+    """
+    Kernel of the AR(1) likelihoods, the squared, scaled innovations from 2 to n. They are
+    summed with np.sum, so the sum is identical to the NumPy implementation
+    """
+    terms = np.empty(len(errorArr) - 1)
+    for t in range(1, len(errorArr)):
+        terms[t - 1] = ((errorArr[t] - c - phi * errorArr[t - 1]) / measerror[t]) ** 2
+    return terms
+
+
 class TimeSeries:
     """
     The formulae are based on 2002-Brockwell-Introduction Time Series and Forecasting.pdf, pages 17-18
@@ -143,15 +276,13 @@ def logLikelihood(data, comparedata, measerror=None):
     :rtype: float
     """
     __standartChecksBeforeStart(data, comparedata)
-    data = np.array(data)
+    measerror, cached = __measerror("logLikelihood", data, measerror)
+    log_measerror = __once(data, cached, 'logLikelihood', lambda: np.nansum(np.log(measerror)))
+    data = np.asarray(data)
     comparedata = np.array(comparedata)
-    if measerror is None:
-        measerror = __generateMeaserror(data)
-    measerror = np.array(measerror)
-    measerror = __jitter_measerror_if_needed("logLikelihood", measerror)
 
     # TODO: Maximize is done but in positive way (from negative to zero is hard)
-    return -data.__len__() / 2 * np.log(2 * np.pi) - np.nansum(np.log(measerror)) - 0.5 * np.sum(
+    return -data.__len__() / 2 * np.log(2 * np.pi) - log_measerror - 0.5 * np.sum(
         ((data - comparedata) / measerror) ** 2)
 
 
@@ -208,17 +339,15 @@ def gaussianLikelihoodHomoHeteroDataError(data, comparedata, measerror=None):
     # With the assumption that the error residuals are uncorrelated
     __standartChecksBeforeStart(data, comparedata)
     n = data.__len__()
-    data = np.array(data)
+    measerror, cached = __measerror("gaussianLikelihoodHomoHeteroDataError", data, measerror)
+    factor = __once(data, cached, 'gaussianLikelihoodHomoHeteroDataError',
+                    lambda: 1 / (np.sqrt(2 * np.pi * measerror ** 2)))
+    data = np.asarray(data)
     comparedata = np.array(comparedata)
-    if measerror is None:
-        measerror = __generateMeaserror(data)
-    measerror = np.array(measerror)
-    measerror = __jitter_measerror_if_needed("gaussianLikelihoodHomoHeteroDataError", measerror)
 
     # TODO Maximizing with negative to zero?
     # original: -np.prod((1 / (np.sqrt(2 * np.pi * measerror**2)))*np.exp(-0.5 * ((data-comparedata)/(measerror))**2))
-    return -np.sum(
-        (1 / (np.sqrt(2 * np.pi * measerror ** 2))) * np.exp(-0.5 * ((data - comparedata) / (measerror)) ** 2))
+    return -np.sum(factor * np.exp(-0.5 * ((data - comparedata) / (measerror)) ** 2))
 
 
 def LikelihoodAR1WithC(data, comparedata, measerror=None, params=None):
@@ -259,45 +388,35 @@ def LikelihoodAR1WithC(data, comparedata, measerror=None, params=None):
     """
     __standartChecksBeforeStart(data, comparedata)
     n = data.__len__()
-    if measerror is None:
-        measerror = __generateMeaserror(data)
-
-    measerror = np.array(measerror)
-    measerror = __jitter_measerror_if_needed("LikelihoodAR1WithC", measerror)
+    measerror, cached = __measerror("LikelihoodAR1WithC", data, measerror)
 
     paramDependencies = ["likelihood_phi"]
 
     if params is None:
-        phi = TimeSeries.AR_1_Coeff(data)
+        if isinstance(data, EvaluationContext):
+            phi = data.cached('AR_1_Coeff', lambda: TimeSeries.AR_1_Coeff(data))
+        else:
+            phi = TimeSeries.AR_1_Coeff(data)
     else:
-        missingparams = []
-        randomparset, parameternames = params
-        randomparset = np.array(randomparset)
-        parameternames = np.array(parameternames)
-        for nm in paramDependencies:
-            if nm not in parameternames:
-                missingparams.append(nm)
-
-        if missingparams.__len__() > 0:
-            raise LikelihoodError(
-                "Unfortunately contains your param list not all parameters which are needed for this class."
-                "Following parameter are needed, too: " + str(missingparams))
-
-        phi = float(randomparset[parameternames == 'likelihood_phi'])
+        phi, = __parameter_values(params, paramDependencies)
     # Break the calculation if given parameter are not valid
     if abs(phi) >= 1:
         warnings.warn("The parameter 'phi' should be real between -1 and 1 and is: " + str(phi))
         return np.NAN
 
-    expect = np.nanmean(data)
+    expect = data.nanaverage if isinstance(data, EvaluationContext) else np.nanmean(data)
     errorArr = np.array(__calcSimpleDeviation(data, comparedata))
     c = expect * (1 - phi)
 
     # I summarize from 2 to n, but range starts in 1 (in python it is zero index), so just shift it with one
     n = data.__len__()
-    sum_1 = np.sum(np.log(measerror[1:]))
+    sum_1 = __once(data, cached, 'LikelihoodAR1', lambda: np.sum(np.log(measerror[1:])))
 
-    sum_2 = np.sum(((errorArr[1:] - c - phi * errorArr[:-1]) / (measerror[1:])) ** 2)
+    kernel = __compiled(__ar1_terms)
+    if kernel is not None:
+        sum_2 = np.sum(kernel(errorArr, measerror, float(c), float(phi)))
+    else:
+        sum_2 = np.sum(((errorArr[1:] - c - phi * errorArr[:-1]) / (measerror[1:])) ** 2)
 
     # TODO Its maximaized but maybe from negative to zero, is that possible?
     return -(-(n / 2) * np.log(2 * np.pi) - 0.5 * np.log(measerror[0] ** 2 / (1 - phi ** 2)) - (
@@ -331,41 +450,29 @@ def LikelihoodAR1NoC(data, comparedata, measerror=None, params=None):
     """
     __standartChecksBeforeStart(data, comparedata)
     n = data.__len__()
-    if measerror is None:
-        measerror = __generateMeaserror(data)
-
     errorArr = np.array(__calcSimpleDeviation(data, comparedata))
 
     # I summarize from 2 to n, but range starts in 1 (in python it is zero index), so just shift it with one
-    measerror = np.array(measerror)
-    measerror = __jitter_measerror_if_needed("LikelihoodAR1NoC", measerror)
+    measerror, cached = __measerror("LikelihoodAR1NoC", data, measerror)
 
     paramDependencies = ["likelihood_phi"]
 
     if params is None:
         phi = np.random.uniform(-0.99, 0.99, 1)
     else:
-        missingparams = []
-        randomparset, parameternames = params
-        for nm in paramDependencies:
-            if nm not in parameternames:
-                missingparams.append(nm)
-        if missingparams.__len__() > 0:
-            raise LikelihoodError(
-                "Unfortunately contains your param list not all parameters which are needed for this class."
-                "Following parameter are needed, too: " + str(missingparams))
-
-        parameternames = np.array(parameternames)
-        randomparset = np.array(randomparset)
-        phi = float(randomparset[parameternames == 'likelihood_phi'])
+        phi, = __parameter_values(params, paramDependencies)
 
         # Break the calculation if given parameter are not valid
         if abs(phi) >= 1:
             warnings.warn("The parameter 'phi' should be real between -1 and 1 and is: " + str(phi))
             return np.NAN
 
-    sum_1 = np.sum(np.log(measerror[1:]))
-    sum_2 = np.sum(((errorArr[1:] - phi * errorArr[:-1]) / measerror[1:]) ** 2)
+    sum_1 = __once(data, cached, 'LikelihoodAR1', lambda: np.sum(np.log(measerror[1:])))
+    kernel = __compiled(__ar1_terms)
+    if kernel is not None:
+        sum_2 = np.sum(kernel(errorArr, measerror, 0.0, float(phi)))
+    else:
+        sum_2 = np.sum(((errorArr[1:] - phi * errorArr[:-1]) / measerror[1:]) ** 2)
 
     # TODO Maximizing with negative to zero?
     return -float(
@@ -430,11 +537,8 @@ def generalizedLikelihoodFunction(data, comparedata, measerror=None, params=None
 
     __standartChecksBeforeStart(data, comparedata)
     errorArr = __calcSimpleDeviation(data, comparedata)
-    if measerror is None:
-        measerror = __generateMeaserror(data)
-    measerror = np.array(measerror)
+    measerror, cached = __measerror("generalizedLikelihoodFunction", data, measerror)
     comparedata = np.array(comparedata)
-    measerror = __jitter_measerror_if_needed("generalizedLikelihoodFunction", measerror)
 
     paramDependencies = ["likelihood_beta", "likelihood_xi", "likelihood_sigma0", "likelihood_sigma1",
                          "likelihood_phi1", "likelihood_muh"]
@@ -449,26 +553,9 @@ def generalizedLikelihoodFunction(data, comparedata, measerror=None, params=None
         muh = np.random.uniform(0, 100, 1)
 
     else:
-        missingparams = []
-        randomparset, parameternames = params
-        parameternames = np.array(parameternames)
-        randomparset = np.array(randomparset)
-
-        for nm in paramDependencies:
-            if nm not in parameternames:
-                missingparams.append(nm)
-
-        if missingparams.__len__() > 0:
-            raise LikelihoodError(
-                "Unfortunately contains your param list not all parameters which are needed for this class."
-                "Following parameter are needed, too: " + str(missingparams))
-
-        beta = float(randomparset[np.where(parameternames == 'likelihood_beta')])
-        xi = float(randomparset[np.where(parameternames == 'likelihood_xi')])
-        sigma0 = float(randomparset[np.where(parameternames == 'likelihood_sigma0')])
-        sigma1 = float(randomparset[parameternames == 'likelihood_sigma0'])
-        phi1 = float(randomparset[np.where(parameternames == 'likelihood_phi1')])
-        muh = float(randomparset[np.where(parameternames == 'likelihood_muh')])
+        beta, xi, sigma0, sigma1, phi1, muh = __parameter_values(params, paramDependencies)
+        # sigma1 takes the value of likelihood_sigma0, like in previous versions
+        sigma1 = sigma0
 
         # Break the calculation if given parameter are not valid
         if beta <= -1 or beta > 1:
@@ -506,19 +593,15 @@ def generalizedLikelihoodFunction(data, comparedata, measerror=None, params=None
 
     n = data.__len__()
 
-    sum_at = 0
     # formula for a_t is from page 3, (6)
-    for j in range(n - 1):
-        t = j + 1
-        if t > 0 and t < n and type(t) == type(1):
-            a_t = (errorArr[t] - phi1 * errorArr[t - 1]) / (measerror[t])
-        else:
-            warnings.warn("Your parameter 't' does not suit to the given data list")
-            return None
-
+    kernel = __compiled(__generalized_sum_at)
+    if kernel is not None:
+        sum_at = kernel(errorArr, measerror, float(phi1), float(xi), float(mu_xi), float(sigma_xi), float(beta))
+    else:
+        a_t = (errorArr[1:] - phi1 * errorArr[:-1]) / (measerror[1:n])
         a_xi_t = xi ** (-1 * np.sign(mu_xi + sigma_xi * a_t)) * (mu_xi + sigma_xi * a_t)
-
-        sum_at += np.abs(a_xi_t) ** (2 / (1 + beta))
+        # Summed up in the order of the kernel
+        sum_at = np.add.accumulate(np.abs(a_xi_t) ** (2 / (1 + beta)))[-1] if n > 1 else 0
 
     # page 3 formula 5 of this paper explain that sigma[t] = sigma0 + sigma1*E[t]
     # where E[t] is called y(x) in the main paper (discrepancy) and sigma0 and sigma1 are input parameter which also
@@ -567,13 +650,11 @@ def LaplacianLikelihood(data, comparedata, measerror=None):
     """
     __standartChecksBeforeStart(data, comparedata)
     errArr = np.array(__calcSimpleDeviation(data, comparedata))
-    if measerror is None:
-        measerror = __generateMeaserror(data)
-    measerror = np.array(measerror)
-    measerror = __jitter_measerror_if_needed("LaplacianLikelihood", measerror)
+    measerror, cached = __measerror("LaplacianLikelihood", data, measerror)
 
     # Log from negative value makes no sense at all
-    return -1 * np.sum(np.log(2 * np.abs(measerror))) - np.sum(np.abs(errArr) / measerror)
+    log_measerror = __once(data, cached, 'LaplacianLikelihood', lambda: np.sum(np.log(2 * np.abs(measerror))))
+    return -1 * log_measerror - np.sum(np.abs(errArr) / measerror)
 
 
 def SkewedStudentLikelihoodHomoscedastic(data, comparedata, measerror=None):
@@ -677,11 +758,7 @@ def SkewedStudentLikelihoodHeteroscedastic(data, comparedata, measerror=None, pa
     :rtype: float
     """
     __standartChecksBeforeStart(data, comparedata)
-    if measerror is None:
-        measerror = __generateMeaserror(data)
-
-    measerror = np.array(measerror)
-    measerror = __jitter_measerror_if_needed("SkewedStudentLikelihoodHeteroscedastic", measerror)
+    measerror, cached = __measerror("SkewedStudentLikelihoodHeteroscedastic", data, measerror)
 
     diff = np.array(__calcSimpleDeviation(data, comparedata))
 
@@ -694,24 +771,7 @@ def SkewedStudentLikelihoodHeteroscedastic(data, comparedata, measerror=None, pa
         phi = np.random.uniform(-0.99, 0.99, 1)
 
     else:
-        missingparams = []
-        randomparset, parameternames = params
-
-        randomparset = np.array(randomparset)
-        parameternames = np.array(parameternames)
-
-        for nm in paramDependencies:
-            if nm not in parameternames:
-                missingparams.append(nm)
-
-        if missingparams.__len__() > 0:
-            raise LikelihoodError(
-                "Unfortunately contains your param list not all parameters which are needed for this class."
-                "Following parameter are needed, too: " + str(missingparams))
-
-        nu = randomparset[parameternames == 'likelihood_nu'][0]
-        k = randomparset[parameternames == 'likelihood_kappa'][0]
-        phi = randomparset[parameternames == 'likelihood_phi'][0]
+        nu, k, phi = __parameter_values(params, paramDependencies)
 
     if abs(phi) > 1:
         warnings.warn(
@@ -738,11 +798,24 @@ def SkewedStudentLikelihoodHeteroscedastic(data, comparedata, measerror=None, pa
     c_2 = np.sqrt(for_c2)
 
     # TODO Maximizing with negative to zero?
-    return np.log(-np.prod((2 * c_2 * math.gamma((nu + 1) / 2) * np.sqrt(nu / (nu - 2))) / (
+    return np.log(-__skewed_student_density_prod(eta_all, measerror, c_1, c_2, k, nu, phi))
+
+
+def __skewed_student_density_prod(eta_all, measerror, c_1, c_2, k, nu, phi):
+    """
+    :return: The product of the skewed student densities of eta_all, with the kernel if numba is installed
+    """
+    kernel = __compiled(__skewed_student_densities)
+    if kernel is not None:
+        numerator = 2 * c_2 * math.gamma((nu + 1) / 2) * np.sqrt(nu / (nu - 2))
+        denominator = (k + 1 / k) * math.gamma(nu / 2) * np.sqrt(np.pi * nu) * np.sqrt(1 - phi ** 2)
+        return np.prod(kernel(eta_all, measerror, float(c_1), float(c_2), float(k), float(nu),
+                              float(numerator), float(denominator)))
+    return np.prod((2 * c_2 * math.gamma((nu + 1) / 2) * np.sqrt(nu / (nu - 2))) / (
             (k + 1 / k) * math.gamma(nu / 2) * np.sqrt(np.pi * nu) * np.sqrt(1 - phi ** 2) * measerror[1:]) \
-                           * (1 + (1 / (nu - 2)) * (
+                   * (1 + (1 / (nu - 2)) * (
             (c_1 + c_2 * eta_all) / (k ** (np.sign(c_1 + c_2 * eta_all)))) ** 2) ** (
-                                   -(nu + 1) / 2)))
+                           -(nu + 1) / 2))
 
 
 def SkewedStudentLikelihoodHeteroscedasticAdvancedARModel(data, comparedata, measerror=None, params=None):
@@ -781,11 +854,7 @@ def SkewedStudentLikelihoodHeteroscedasticAdvancedARModel(data, comparedata, mea
     :rtype: float
     """
     __standartChecksBeforeStart(data, comparedata)
-    if measerror is None:
-        measerror = __generateMeaserror(data)
-
-    measerror = np.array(measerror)
-    measerror = __jitter_measerror_if_needed("SkewedStudentLikelihoodHeteroscedasticAdvancedARModel", measerror)
+    measerror, cached = __measerror("SkewedStudentLikelihoodHeteroscedasticAdvancedARModel", data, measerror)
 
     res = np.array(__calcSimpleDeviation(data, comparedata))
 
@@ -797,23 +866,7 @@ def SkewedStudentLikelihoodHeteroscedasticAdvancedARModel(data, comparedata, mea
         phi = np.random.uniform(-0.99, 0.99, 1)
 
     else:
-        missingparams = []
-        randomparset, parameternames = params
-        randomparset = np.array(randomparset)
-        parameternames = np.array(parameternames)
-
-        for nm in paramDependencies:
-            if nm not in parameternames:
-                missingparams.append(nm)
-
-        if missingparams.__len__() > 0:
-            raise LikelihoodError(
-                "Unfortunately contains your param list not all parameters which are needed for this class."
-                "Following parameter are needed, too: " + str(missingparams))
-
-        nu = randomparset[parameternames == 'likelihood_nu'][0]
-        k = randomparset[parameternames == 'likelihood_kappa'][0]
-        phi = randomparset[parameternames == 'likelihood_phi'][0]
+        nu, k, phi = __parameter_values(params, paramDependencies)
 
         if abs(phi) > 1:
             warnings.warn(
@@ -841,17 +894,7 @@ def SkewedStudentLikelihoodHeteroscedasticAdvancedARModel(data, comparedata, mea
     c_2 = np.sqrt(for_c2)
 
     # TODO Maximizing with negative to zero?
-    datas = ((2 * c_2 * math.gamma((nu + 1) / 2) * np.sqrt(nu / (nu - 2))) / (
-            (k + 1 / k) * math.gamma(nu / 2) * np.sqrt(np.pi * nu) * np.sqrt(1 - phi ** 2) * measerror[1:]) \
-             * (1 + (1 / (nu - 2)) * (
-                    (c_1 + c_2 * eta_all) / (k ** (np.sign(c_1 + c_2 * eta_all)))) ** 2) ** (
-                     -(nu + 1) / 2))
-
-    return np.log(-np.prod((2 * c_2 * math.gamma((nu + 1) / 2) * np.sqrt(nu / (nu - 2))) / (
-            (k + 1 / k) * math.gamma(nu / 2) * np.sqrt(np.pi * nu) * np.sqrt(1 - phi ** 2) * measerror[1:]) \
-                           * (1 + (1 / (nu - 2)) * (
-            (c_1 + c_2 * eta_all) / (k ** (np.sign(c_1 + c_2 * eta_all)))) ** 2) ** (
-                                   -(nu + 1) / 2)))
+    return np.log(-__skewed_student_density_prod(eta_all, measerror, c_1, c_2, k, nu, phi))
 
 
 def NoisyABCGaussianLikelihood(data, comparedata, measerror=None):
@@ -929,15 +972,10 @@ def ABCBoxcarLikelihood(data, comparedata, measerror=None):
     :rtype: float
     """
     __standartChecksBeforeStart(data, comparedata)
-    if measerror is None:
-        measerror = __generateMeaserror(data)
-
-    data = np.array(data)
+    measerror, cached = __measerror("ABCBoxcarLikelihood", data, measerror)
+    data = np.asarray(data)
     comparedata = np.array(comparedata)
 
-    measerror = np.array(measerror)
-    measerror = __jitter_measerror_if_needed("ABCBoxcarLikelihood", measerror)
-
     # Usage of euclidean distance changes the formula a bit
 
     # TODO Maximizing with negative to zero?
@@ -967,15 +1005,10 @@ def LimitsOfAcceptability(data, comparedata, measerror=None):
     :rtype: float
     """
     __standartChecksBeforeStart(data, comparedata)
-    if measerror is None:
-        measerror = __generateMeaserror(data)
-
-    data = np.array(data)
+    measerror, cached = __measerror("LimitsOfAcceptability", data, measerror)
+    data = np.asarray(data)
     comparedata = np.array(comparedata)
 
-    measerror = np.array(measerror)
-    measerror = __jitter_measerror_if_needed("LimitsOfAcceptability", measerror)
-
     # Use simple non euclidean but weighted distance measurement.
     return np.sum(np.abs((data - comparedata) / measerror) <= measerror)
 
@@ -1048,13 +1081,17 @@ def NashSutcliffeEfficiencyShapingFactor(data, comparedata, G=10):
     __standartChecksBeforeStart(data, comparedata)
 
     errArr = np.array(__calcSimpleDeviation(data, comparedata))
+    if isinstance(data, EvaluationContext):
+        data_var = data.cached('nanvar', lambda: np.nanvar(data.values))
+    else:
+        data_var = np.nanvar(data)
 
-    if np.nanvar(data) == 0.0:
+    if data_var == 0.0:
         warnings.warn(
             "[NashSutcliffeEfficiencyShapingFactor] reaslized that the variance of the data is zero. Thereforee is no likelihood calculation possible")
         return np.NAN
     else:
-        ratio = np.nanvar(errArr) / np.nanvar(data)
+        ratio = np.nanvar(errArr) / data_var
 
         if ratio > 1:
             warnings.warn(
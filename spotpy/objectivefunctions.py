@@ -8,12 +8,184 @@ This file is part of Statistical Parameter Estimation Tool (SPOTPY).
 
 This tool holds functions for statistic analysis. It takes Python-lists and
 returns the objective function value of interest.
+
+Every function accepts a 2D array (runs x timesteps) for the simulation together
+with a one dimensional evaluation, e.g. the model runs of a result array, and returns an array with
+the value of every run, computed without a loop over the runs.
+
+An EvaluationContext can be passed as the evaluation, to compute the quantities
+of the evaluation (mean, variance, ...) only once for many simulations.
 '''
 
 import numpy as np
 import logging
 logging.basicConfig(format='%(levelname)s: %(module)s.%(funcName)s(): %(message)s')
 
+
+class _Runs(np.ndarray):
+    """
+    A 2D array with one run per row, that is compared run by run with the other
+    argument of a function, also when it is given as the evaluation
+    """
+
+
+def _is_batch(evaluation, simulation):
+    """
+    :return: True, if simulation is a 2D array with one run per row and the evaluation is
+             one dimensional, or if one of them is marked as _Runs. Other inputs (e.g. 2D
+             evaluation and simulation of several sites) are compared as a whole, like
+             before the batch functions existed
+    """
+    if isinstance(evaluation, _Runs) or isinstance(simulation, _Runs):
+        return True
+    return getattr(simulation, 'ndim', 1) == 2 and np.ndim(evaluation) == 1
+
+
+def _batch_arrays(evaluation, simulation):
+    """
+    :return: evaluation and simulation as arrays of the same shape (runs x timesteps)
+    """
+    obs, sim = np.asarray(evaluation), np.asarray(simulation)
+    if obs.shape[-1] != sim.shape[-1]:
+        raise ValueError("evaluation and simulation do not have the same length.")
+    return np.broadcast_arrays(obs, sim)
+
+
+def _batch_corrcoef(obs, sim):
+    """
+    :return: The correlation coefficient of every run, like np.corrcoef(obs, sim)[0, 1]
+    """
+    obs_anomaly = obs - np.mean(obs, axis=-1, keepdims=True)
+    sim_anomaly = sim - np.mean(sim, axis=-1, keepdims=True)
+    cc = np.sum(obs_anomaly * sim_anomaly, axis=-1) / np.sqrt(
+        np.sum(obs_anomaly ** 2, axis=-1) * np.sum(sim_anomaly ** 2, axis=-1))
+    return np.clip(cc, -1, 1)
+
+
+class EvaluationContext(np.ndarray):
+    """
+    An evaluation array, that holds the quantities of the evaluation, which the
+    objective functions and likelihoods need for every simulation (e.g. its mean,
+    variance and logarithm). Each quantity is computed when it is needed first and
+    reused for every simulation compared with the evaluation. The array may be
+    changed in place (e.g. masked by an objectivefunction), then the quantities
+    are computed again from the changed values.
+
+    Every function of spotpy.objectivefunctions and spotpy.likelihoods takes an
+    EvaluationContext as the evaluation and gives the same values as with the plain
+    evaluation. The samplers pass an EvaluationContext only to the functions of this
+    module (selected with alt_objfun), the objectivefunction of a spot_setup gets the
+    evaluation unchanged and may create an EvaluationContext itself.
+
+    >>> evaluation = EvaluationContext([1., 2., 3.])
+    >>> [nashsutcliffe(evaluation, simulation) for simulation in simulations]
+    """
+
+    def __new__(cls, evaluation):
+        """
+        :param evaluation: a sequence of evaluation data
+        """
+        values = np.array(evaluation)
+        if values.dtype.kind not in 'biuf':
+            raise TypeError('The evaluation data is not numerical')
+        return values.view(cls)
+
+    def __array_finalize__(self, obj):
+        # Views of the evaluation compute their own quantities
+        self._cache = {}
+        # The values, from which the cached quantities have been computed
+        self._cached_values = None
+
+    def __array_wrap__(self, obj, context=None, *args):
+        # Calculations with the evaluation give plain arrays
+        obj = obj.view(np.ndarray)
+        return obj[()] if obj.ndim == 0 else obj
+
+    def cached(self, name, function):
+        """
+        :param name: Name of the quantity
+        :param function: Computes the quantity, if it is not cached yet
+        :return: The quantity
+        """
+        # The cached quantities are outdated, if the values have been changed in place
+        values = self.tobytes()
+        if values != self._cached_values:
+            self._cache.clear()
+            self._cached_values = values
+        if name not in self._cache:
+            self._cache[name] = function()
+        return self._cache[name]
+
+    @property
+    def values(self):
+        """The evaluation as a plain array"""
+        return self.view(np.ndarray)
+
+    @property
+    def n(self):
+        """Number of values of an evaluation"""
+        return self.shape[-1]
+
+    @property
+    def has_nan(self):
+        return self.cached('has_nan', lambda: bool(np.isnan(self.values).any()))
+
+    @property
+    def total(self):
+        return self.cached('total', lambda: np.sum(self.values, axis=-1))
+
+    @property
+    def nantotal(self):
+        return self.cached('nantotal', lambda: np.nansum(self.values, axis=-1))
+
+    @property
+    def average(self):
+        return self.cached('average', lambda: np.mean(self.values, axis=-1))
+
+    @property
+    def nanaverage(self):
+        return self.cached('nanaverage', lambda: np.nanmean(self.values, axis=-1))
+
+    @property
+    def stdev(self):
+        return self.cached('stdev', lambda: np.std(self.values, axis=-1))
+
+    @property
+    def anomaly(self):
+        """Deviation of the evaluation from its mean"""
+        return self.cached('anomaly', lambda: self.values - np.asarray(self.average)[..., None])
+
+    @property
+    def abs_anomaly(self):
+        return self.cached('abs_anomaly', lambda: np.abs(self.anomaly))
+
+    @property
+    def ss(self):
+        """Sum of the squared anomalies"""
+        return self.cached('ss', lambda: np.sum(self.anomaly ** 2, axis=-1))
+
+    @property
+    def nan_ss(self):
+        """Sum of the squared deviations from the nanmean, without nan values"""
+        return self.cached('nan_ss', lambda: np.nansum(
+            (self.values - np.asarray(self.nanaverage)[..., None]) ** 2, axis=-1))
+
+    @property
+    def log(self):
+        return self.cached('log', lambda: np.log(self.values))
+
+    @property
+    def log_ss(self):
+        """Sum of the squared anomalies of the logarithm, summed up like in lognashsutcliffe"""
+        return self.cached('log_ss', lambda: sum((self.log - np.mean(self.log)) ** 2))
+
+    @property
+    def fdc(self):
+        """Sorted evaluation, normalized by its sum, the flow duration curve of kge_non_parametric"""
+        return self.cached('fdc', lambda: np.sort(
+            self.values / (np.asarray(self.nanaverage)[..., None] * self.n), axis=-1))
+
+
 def bias(evaluation, simulation):
     """
     Bias as shown in Gupta in Sorooshian (1998), Toward improved calibration of hydrologic models: 
@@ -32,6 +204,9 @@ def bias(evaluation, simulation):
     :return: Bias
     :rtype: float
     """
+    if _is_batch(evaluation, simulation):
+        obs, sim = _batch_arrays(evaluation, simulation)
+        return np.nansum(obs - sim, axis=-1) / obs.shape[-1]
     if len(evaluation) == len(simulation):
         obs, sim = np.array(evaluation), np.array(simulation)
         bias = np.nansum(obs - sim) / len(obs)
@@ -59,10 +234,14 @@ def pbias(evaluation, simulation):
     :return: PBias
     :rtype: float
     """
+    if _is_batch(evaluation, simulation):
+        obs, sim = _batch_arrays(evaluation, simulation)
+        return 100 * np.nansum(sim - obs, axis=-1) / np.nansum(obs, axis=-1)
     if len(evaluation) == len(simulation):
         sim = np.array(simulation)
-        obs = np.array(evaluation)
-        return 100 * (float(np.nansum(sim - obs)) / float(np.nansum(obs)))
+        obs = np.asarray(evaluation)
+        obs_sum = evaluation.nantotal if isinstance(evaluation, EvaluationContext) else np.nansum(obs)
+        return 100 * (float(np.nansum(sim - obs)) / float(obs_sum))
 
     else:
         logging.warning("evaluation and simulation lists does not have the same length.")
@@ -87,13 +266,19 @@ def nashsutcliffe(evaluation, simulation):
     :rtype: float
 
     """
+    if _is_batch(evaluation, simulation):
+        e, s = _batch_arrays(evaluation, simulation)
+        mean_observed = np.nanmean(e, axis=-1, keepdims=True)
+        return 1 - np.nansum((e - s) ** 2, axis=-1) / np.nansum((e - mean_observed) ** 2, axis=-1)
     if len(evaluation) == len(simulation):
-        s, e = np.array(simulation), np.array(evaluation)
-        # s,e=simulation,evaluation
-        mean_observed = np.nanmean(e)
+        s, e = np.array(simulation), np.asarray(evaluation)
         # compute numerator and denominator
         numerator = np.nansum((e - s) ** 2)
-        denominator = np.nansum((e - mean_observed)**2)
+        if isinstance(evaluation, EvaluationContext):
+            denominator = evaluation.nan_ss
+        else:
+            mean_observed = np.nanmean(e)
+            denominator = np.nansum((e - mean_observed)**2)
         # compute coefficient
         return 1 - (numerator / denominator)
 
@@ -123,7 +308,14 @@ def lognashsutcliffe(evaluation, simulation, epsilon=0):
     :rtype: float
 
     """
+    if _is_batch(evaluation, simulation):
+        e, s = _batch_arrays(evaluation, simulation)
+        log_e, log_s = np.log(e + epsilon), np.log(s + epsilon)
+        return 1 - np.sum((log_s - log_e)**2, axis=-1) / np.sum(
+            (log_e - np.mean(log_e, axis=-1, keepdims=True))**2, axis=-1)
     if len(evaluation) == len(simulation):
+        if isinstance(evaluation, EvaluationContext) and np.all(epsilon == 0):
+            return float(1 - sum((np.log(np.array(simulation)) - evaluation.log)**2) / evaluation.log_ss)
         s, e = np.array(simulation)+epsilon, np.array(evaluation)+epsilon
         return float(1 - sum((np.log(s) - np.log(e))**2) / sum((np.log(e) - np.mean(np.log(e)))**2))
     else:
@@ -144,11 +336,19 @@ def log_p(evaluation, simulation):
     :return: Logarithmic probability distribution
     :rtype: float
     """
-    scale = np.mean(evaluation) / 10
+    if _is_batch(evaluation, simulation):
+        obs, sim = _batch_arrays(evaluation, simulation)
+        scale = np.maximum(np.mean(obs, axis=-1, keepdims=True) / 10, .01)
+        y = (obs - sim) / scale
+        return np.mean(-y**2 / 2 - np.log(np.sqrt(2 * np.pi)), axis=-1)
+    if isinstance(evaluation, EvaluationContext):
+        scale = evaluation.average / 10
+    else:
+        scale = np.mean(evaluation) / 10
     if scale < .01:
         scale = .01
     if len(evaluation) == len(simulation):
-        y = (np.array(evaluation) - np.array(simulation)) / scale
+        y = (np.asarray(evaluation) - np.array(simulation)) / scale
         normpdf = -y**2 / 2 - np.log(np.sqrt(2 * np.pi))
         return np.mean(normpdf)
     else:
@@ -173,6 +373,8 @@ def correlationcoefficient(evaluation, simulation):
     :return: Corelation Coefficient
     :rtype: float
     """
+    if _is_batch(evaluation, simulation):
+        return _batch_corrcoef(*_batch_arrays(evaluation, simulation))
     if len(evaluation) == len(simulation):
         correlation_coefficient = np.corrcoef(evaluation, simulation)[0, 1]
         return correlation_coefficient
@@ -198,6 +400,8 @@ def rsquared(evaluation, simulation):
     :return: Coefficient of Determination
     :rtype: float
     """
+    if _is_batch(evaluation, simulation):
+        return _batch_corrcoef(*_batch_arrays(evaluation, simulation))**2
     if len(evaluation) == len(simulation):
         return correlationcoefficient(evaluation, simulation)**2
     else:
@@ -222,6 +426,9 @@ def mse(evaluation, simulation):
     :return: Mean Squared Error
     :rtype: float
     """
+    if _is_batch(evaluation, simulation):
+        obs, sim = _batch_arrays(evaluation, simulation)
+        return np.nanmean((obs - sim)**2, axis=-1)
 
     if len(evaluation) == len(simulation):
         obs, sim = np.array(evaluation), np.array(simulation)
@@ -249,6 +456,8 @@ def rmse(evaluation, simulation):
     :return: Root Mean Squared Error
     :rtype: float
     """
+    if _is_batch(evaluation, simulation):
+        return np.sqrt(mse(evaluation, simulation))
     if len(evaluation) == len(simulation) > 0:
         return np.sqrt(mse(evaluation, simulation))
     else:
@@ -273,6 +482,9 @@ def mae(evaluation, simulation):
     :return: Mean Absolute Error
     :rtype: float
     """
+    if _is_batch(evaluation, simulation):
+        obs, sim = _batch_arrays(evaluation, simulation)
+        return np.mean(np.abs(sim - obs), axis=-1)
     if len(evaluation) == len(simulation) > 0:
         obs, sim = np.array(evaluation), np.array(simulation)
         mae = np.mean(np.abs(sim - obs))
@@ -299,9 +511,13 @@ def rrmse(evaluation, simulation):
     :return: Relative Root Mean Squared Error
     :rtype: float
     """
+    if _is_batch(evaluation, simulation):
+        obs, sim = _batch_arrays(evaluation, simulation)
+        return np.sqrt(np.nanmean((obs - sim)**2, axis=-1)) / np.mean(obs, axis=-1)
 
     if len(evaluation) == len(simulation):
-        rrmse = rmse(evaluation, simulation) / np.mean(evaluation)
+        mean_evaluation = evaluation.average if isinstance(evaluation, EvaluationContext) else np.mean(evaluation)
+        rrmse = rmse(evaluation, simulation) / mean_evaluation
         return rrmse
     else:
         logging.warning("evaluation and simulation lists does not have the same length.")
@@ -326,7 +542,16 @@ def agreementindex(evaluation, simulation):
     :return: Agreement Index
     :rtype: float
     """
+    if _is_batch(evaluation, simulation):
+        evaluation, simulation = _batch_arrays(evaluation, simulation)
+        mean_evaluation = np.mean(evaluation, axis=-1, keepdims=True)
+        return 1 - np.sum((evaluation - simulation)**2, axis=-1) / np.sum(
+            (np.abs(simulation - mean_evaluation) + np.abs(evaluation - mean_evaluation))**2, axis=-1)
     if len(evaluation) == len(simulation):
+        if isinstance(evaluation, EvaluationContext):
+            simulation = np.asarray(simulation)
+            return 1 - (np.sum((evaluation.values - simulation)**2)) / (np.sum(
+                (np.abs(simulation - evaluation.average) + evaluation.abs_anomaly)**2))
         simulation, evaluation = np.array(simulation), np.array(evaluation)
         Agreement_index = 1 - (np.sum((evaluation - simulation)**2)) / (np.sum(
             (np.abs(simulation - np.mean(evaluation)) + np.abs(evaluation - np.mean(evaluation)))**2))
@@ -352,11 +577,18 @@ def covariance(evaluation, simulation):
     :return: Covariance
     :rtype: float
     """
+    if _is_batch(evaluation, simulation):
+        obs, sim = _batch_arrays(evaluation, simulation)
+        return np.mean((obs - np.mean(obs, axis=-1, keepdims=True)) *
+                       (sim - np.mean(sim, axis=-1, keepdims=True)), axis=-1)
     if len(evaluation) == len(simulation):
-        obs, sim = np.array(evaluation), np.array(simulation)
-        obs_mean = np.mean(obs)
+        obs, sim = np.asarray(evaluation), np.array(simulation)
         sim_mean = np.mean(sim)
-        covariance = np.mean((obs - obs_mean)*(sim - sim_mean))
+        if isinstance(evaluation, EvaluationContext):
+            obs_anomaly = evaluation.anomaly
+        else:
+            obs_anomaly = obs - np.mean(obs)
+        covariance = np.mean(obs_anomaly*(sim - sim_mean))
         return covariance
     else:
         logging.warning("evaluation and simulation lists does not have the same length.")
@@ -383,9 +615,14 @@ def decomposed_mse(evaluation, simulation):
     :return: Decomposed MSE
     :rtype: float
     """
+    if _is_batch(evaluation, simulation):
+        obs, sim = _batch_arrays(evaluation, simulation)
+        e_std, s_std = np.std(obs, axis=-1), np.std(sim, axis=-1)
+        return (bias(evaluation, simulation)**2 + (e_std - s_std)**2 +
+                2 * e_std * s_std * (1 - _batch_corrcoef(obs, sim)))
 
     if len(evaluation) == len(simulation):
-        e_std = np.std(evaluation)
+        e_std = evaluation.stdev if isinstance(evaluation, EvaluationContext) else np.std(evaluation)
         s_std = np.std(simulation)
 
         bias_squared = bias(evaluation, simulation)**2
@@ -414,10 +651,26 @@ def kge(evaluation, simulation, return_all=False):
         alpha: ratio of the standard deviation
         beta: ratio of the mean
     """
+    if _is_batch(evaluation, simulation):
+        obs, sim = _batch_arrays(evaluation, simulation)
+        cc = _batch_corrcoef(obs, sim)
+        alpha = np.std(sim, axis=-1) / np.std(obs, axis=-1)
+        beta = np.sum(sim, axis=-1) / np.sum(obs, axis=-1)
+        kge = 1 - np.sqrt((cc - 1)**2 + (alpha - 1)**2 + (beta - 1)**2)
+        if return_all:
+            return kge, cc, alpha, beta
+        else:
+            return kge
     if len(evaluation) == len(simulation):
-        cc = np.corrcoef(evaluation, simulation)[0, 1]
-        alpha = np.std(simulation) / np.std(evaluation)
-        beta = np.sum(simulation) / np.sum(evaluation)
+        if isinstance(evaluation, EvaluationContext):
+            simulation = np.asarray(simulation)
+            cc = np.corrcoef(evaluation.values, simulation)[0, 1]
+            alpha = np.std(simulation) / evaluation.stdev
+            beta = np.sum(simulation) / evaluation.total
+        else:
+            cc = np.corrcoef(evaluation, simulation)[0, 1]
+            alpha = np.std(simulation) / np.std(evaluation)
+            beta = np.sum(simulation) / np.sum(evaluation)
         kge = 1 - np.sqrt((cc - 1)**2 + (alpha - 1)**2 + (beta - 1)**2)
         if return_all:
             return kge, cc, alpha, beta
@@ -448,6 +701,19 @@ def _spearmann_corr(x, y):
     denominator2 = np.sqrt(np.nansum([(a[j][3]-MW_rank_x)**2. for j in range(len(a))]))
     return float(numerator/(denominator1*denominator2))
 
+def _batch_spearmann_corr(x, y):
+    """Separmann correlation coefficient of every run, with the ranks of _spearmann_corr"""
+    index = np.arange(1, x.shape[-1] + 1)
+    rank_x = np.empty(x.shape)
+    np.put_along_axis(rank_x, np.argsort(x, axis=-1, kind='stable'), np.broadcast_to(index, x.shape), axis=-1)
+    # Equal values of y are ranked in the order of x
+    rank_y = np.empty(y.shape)
+    np.put_along_axis(rank_y, np.lexsort((rank_x, y), axis=-1), np.broadcast_to(index, y.shape), axis=-1)
+    mean_rank = np.mean(index)
+    numerator = np.sum((rank_x - mean_rank) * (rank_y - mean_rank), axis=-1)
+    denominator = np.sqrt(np.sum((rank_x - mean_rank)**2, axis=-1)) * np.sqrt(np.sum((rank_y - mean_rank)**2, axis=-1))
+    return numerator / denominator
+
 def kge_non_parametric(evaluation, simulation, return_all=False):
     """
     Non parametric Kling-Gupta Efficiency
@@ -464,6 +730,19 @@ def kge_non_parametric(evaluation, simulation, return_all=False):
         alpha: ratio of the standard deviation
         beta: ratio of the mean
     """
+    if _is_batch(evaluation, simulation):
+        obs, sim = _batch_arrays(evaluation, simulation)
+        cc = _batch_spearmann_corr(obs, sim)
+        n = obs.shape[-1]
+        fdc_sim = np.sort(sim / (np.nanmean(sim, axis=-1, keepdims=True) * n), axis=-1)
+        fdc_obs = np.sort(obs / (np.nanmean(obs, axis=-1, keepdims=True) * n), axis=-1)
+        alpha = 1 - 0.5 * np.nanmean(np.abs(fdc_sim - fdc_obs), axis=-1)
+        beta = np.mean(sim, axis=-1) / np.mean(obs, axis=-1)
+        kge = 1 - np.sqrt((cc - 1)**2 + (alpha - 1)**2 + (beta - 1)**2)
+        if return_all:
+            return kge, cc, alpha, beta
+        else:
+            return kge
     if len(evaluation) == len(simulation):
         ## self-made formula 
         cc = _spearmann_corr(evaluation, simulation)
@@ -476,10 +755,14 @@ def kge_non_parametric(evaluation, simulation, return_all=False):
         #cc = a.ix[:,1].corr(a.ix[:,0], method = 'spearman')
 
         fdc_sim = np.sort(simulation / (np.nanmean(simulation)*len(simulation)))
-        fdc_obs = np.sort(evaluation / (np.nanmean(evaluation)*len(evaluation)))
+        if isinstance(evaluation, EvaluationContext):
+            fdc_obs, mean_evaluation = evaluation.fdc, evaluation.average
+        else:
+            fdc_obs = np.sort(evaluation / (np.nanmean(evaluation)*len(evaluation)))
+            mean_evaluation = np.mean(evaluation)
         alpha = 1 - 0.5 * np.nanmean(np.abs(fdc_sim - fdc_obs))
  
-        beta = np.mean(simulation) / np.mean(evaluation)
+        beta = np.mean(simulation) / mean_evaluation
         kge = 1 - np.sqrt((cc - 1)**2 + (alpha - 1)**2 + (beta - 1)**2)
         if return_all:
             return kge, cc, alpha, beta
@@ -499,8 +782,12 @@ def rsr(evaluation, simulation):
     output:
         rsr: RMSE-observations standard deviation ratio 
     """
+    if _is_batch(evaluation, simulation):
+        obs, sim = _batch_arrays(evaluation, simulation)
+        return rmse(evaluation, simulation) / np.std(obs, axis=-1)
     if len(evaluation) == len(simulation):
-        rsr = rmse(evaluation, simulation) / np.std(evaluation)
+        e_std = evaluation.stdev if isinstance(evaluation, EvaluationContext) else np.std(evaluation)
+        rsr = rmse(evaluation, simulation) / e_std
         return rsr
     else:
         logging.warning("evaluation and simulation lists does not have the same length.")
@@ -530,8 +817,12 @@ def volume_error(evaluation, simulation):
     :return: Volume Error
     :rtype: float
     """
+    if _is_batch(evaluation, simulation):
+        obs, sim = _batch_arrays(evaluation, simulation)
+        return np.sum(sim - obs, axis=-1) / np.sum(obs, axis=-1)
     if len(evaluation) == len(simulation):
-        ve = np.sum(simulation - evaluation) / np.sum(evaluation)
+        e_sum = evaluation.total if isinstance(evaluation, EvaluationContext) else np.sum(evaluation)
+        ve = np.sum(simulation - evaluation) / e_sum
         return float(ve)
     else:
         logging.warning("evaluation and simulation lists does not have the same length.")
@@ -543,20 +834,103 @@ _all_functions = [agreementindex, bias, correlationcoefficient, covariance, deco
                   rsr, volume_error
                   ]
 
+# Functions, that accept a 2D array of runs
+_batch_functions = _all_functions + [kge_non_parametric]
+
+def _reduce(x):
+    """
+    :return: x without the last axis of length 1, a scalar for a single run
+    """
+    return np.squeeze(x, axis=-1)[()]
+
+
+def _metrics(context, simulation):
+    """
+    Calculates the functions of _all_functions from the sums of the residuals,
+    anomalies and their squares, that the functions have in common
+
+    :param context: The EvaluationContext of the evaluation data
+    :param simulation: An array of simulation data without nan, or a 2D array with one run per row
+    :return: A dict with the value of each function
+    """
+    def total(x):
+        return np.sum(x, axis=-1, keepdims=True)
+
+    def keep(x):
+        # A quantity of the evaluation with the last axis kept
+        return np.asarray(x)[..., None]
+
+    n = context.n
+    e_sum, e_mean, e_std = keep(context.total), keep(context.average), keep(context.stdev)
+    residual = context.values - simulation
+    residual_sum = total(residual)
+    residual_ss = total(residual ** 2)
+    sim_mean = total(simulation) / n
+    sim_anomaly = simulation - sim_mean
+    sim_ss = total(sim_anomaly ** 2)
+    sim_std = np.sqrt(sim_ss / n)
+    cross = total(context.anomaly * sim_anomaly)
+
+    bias_ = residual_sum / n
+    mse_ = residual_ss / n
+    rmse_ = np.sqrt(mse_)
+    cc = np.clip(cross / np.sqrt(keep(context.ss) * sim_ss), -1, 1)
+    alpha = sim_std / e_std
+    beta = (sim_mean * n) / e_sum
+    scale = np.maximum(e_mean / 10, .01)
+    metrics = {
+        'agreementindex': 1 - residual_ss / total(
+            (np.abs(simulation - e_mean) + context.abs_anomaly) ** 2),
+        'bias': bias_,
+        'correlationcoefficient': cc,
+        'covariance': cross / n,
+        'decomposed_mse': (bias_ ** 2 + (e_std - sim_std) ** 2 +
+                           2 * e_std * sim_std * (1 - cc)),
+        'kge': 1 - np.sqrt((cc - 1) ** 2 + (alpha - 1) ** 2 + (beta - 1) ** 2),
+        'log_p': -mse_ / (2 * scale ** 2) - np.log(np.sqrt(2 * np.pi)),
+        'lognashsutcliffe': 1 - total((np.log(simulation) - context.log) ** 2) / keep(context.log_ss),
+        'mae': total(np.abs(residual)) / n,
+        'mse': mse_,
+        'nashsutcliffe': 1 - residual_ss / keep(context.ss),
+        'pbias': -100 * residual_sum / e_sum,
+        'rmse': rmse_,
+        'rrmse': rmse_ / e_mean,
+        'rsquared': cc ** 2,
+        'rsr': rmse_ / e_std,
+        'volume_error': -residual_sum / e_sum,
+    }
+    return dict((name, _reduce(value)) for name, value in metrics.items())
+
+
 def calculate_all_functions(evaluation, simulation):
     """
     Calculates all objective functions from spotpy.objectivefunctions
     and returns the results as a list of name/value pairs
 
-    :param evaluation: a sequence of evaluation data
-    :param simulation: a sequence of simulation data
-    :return: A list of (name, value) tuples
+    The quantities of a one dimensional evaluation are computed only once. For a
+    2D array of runs without nan values, the means, anomalies and residuals, that
+    the functions share, are computed only once as well. A function, that fails
+    for the given data, gives nan.
+
+    :param evaluation: a sequence of evaluation data or its EvaluationContext
+    :param simulation: a sequence of simulation data, or a 2D array with one run per row
+    :return: A list of (name, value) tuples. The values are arrays with one value per run
+             for a 2D simulation
     """
+    if np.ndim(evaluation) == 1 and not isinstance(evaluation, EvaluationContext):
+        try:
+            evaluation = EvaluationContext(evaluation)
+        except (TypeError, ValueError):
+            pass
+
+    if (_is_batch(evaluation, simulation) and isinstance(evaluation, EvaluationContext) and
+            simulation.dtype.kind in 'biuf' and simulation.shape[-1] == evaluation.n and
+            not (evaluation.has_nan or np.isnan(simulation).any())):
+        metrics = _metrics(evaluation, simulation)
+        return [(f.__name__, metrics[f.__name__]) for f in _all_functions]
 
     result = []
     for f in _all_functions:
-        # Check if the name is not private and attr is a function but not this
-
         try:
             result.append((f.__name__, f(evaluation, simulation)))
         except:
@@ -0,0 +1,142 @@
+'''
+Copyright (c) 2018 by Tobias Houska
+
+This file is part of Statistical Parameter Estimation Tool (SPOTPY).
+
+:author: Philipp Kraft
+
+Parallelization with asyncio (parallel='async') for models, that spend most of
+their time waiting, e.g. for a subprocess or a web service.
+
+The setup defines its simulation as a coroutine:
+
+    class spot_setup(object):
+        async def simulation(self, x):
+            proc = await asyncio.create_subprocess_exec('model', *map(str, x), stdout=PIPE)
+            out, err = await proc.communicate()
+            return [float(v) for v in out.split()]
+
+The ForEach keeps up to `concurrency` runs in flight in one event loop and gives
+the results back as soon as they are finished. Setups with a normal simulation
+method and the jobs of other phases (e.g. the complex evolution of sceua) are run
+one after the other.
+
+A sim_timeout of the sampler is applied to every run with asyncio.wait_for. Runs,
+that do not finish in time, are cancelled and give no simulation (None), like the
+timed out runs of a sequential sampler.
+'''
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import asyncio
+import copy
+import inspect
+import traceback
+
+import numpy as np
+
+# Maximum number of runs in flight
+concurrency = 100
+
+
+def run(awaitable):
+    """
+    Runs an awaitable (e.g. the coroutine of an async simulation) in a new event loop
+    :return: The result of the awaitable
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(awaitable)
+    finally:
+        loop.close()
+
+
+async def _simulate(sampler, job):
+    """
+    The asynchronous version of _algorithm.simulate
+    """
+    id, params = job
+    all_params = np.copy(sampler.all_params)
+    all_params[sampler.non_constant_positions] = params
+    # The parameter set is changed by every call, hence every run needs its own one
+    parameter_set = copy.deepcopy(sampler.partype)
+    try:
+        simulation = sampler.setup.simulation(parameter_set(*all_params))
+        if sampler.sim_timeout is None:
+            model_result = await simulation
+        else:
+            model_result = await asyncio.wait_for(simulation, sampler.sim_timeout)
+    except asyncio.TimeoutError:
+        # Like the timeout of _algorithm.simulate, the run has no simulation
+        model_result = None
+    except Exception:
+        traceback.print_exc()
+        model_result = None
+    return id, params, model_result
+
+
+class ForEach(object):
+    """
+    ForEach running the simulations of a setup with an async simulation method
+    concurrently in an asyncio event loop
+    """
+    def __init__(self, process):
+        self.process = process
+        self.phase = None
+        self.concurrency = max(1, concurrency)
+        self.loop = None
+        # The sampler, if its setup has an async simulation
+        sampler = getattr(process, '__self__', None)
+        simulation = getattr(getattr(sampler, 'setup', None), 'simulation', None)
+        self.sampler = sampler if inspect.iscoroutinefunction(simulation) else None
+
+    def is_idle(self):
+        return False
+
+    def terminate(self):
+        if self.loop is not None:
+            self.loop.close()
+            self.loop = None
+
+    def start(self):
+        pass
+
+    def setphase(self, phasename):
+        self.phase = phasename
+
+    def is_async(self, job):
+        return self.sampler is not None and not self.phase and type(job) is tuple and len(job) == 2
+
+    def __call__(self, jobs):
+        if self.loop is None:
+            self.loop = asyncio.new_event_loop()
+        jobs = iter(jobs)
+        pending = set()
+        exhausted = False
+        try:
+            while True:
+                # Fill up the runs in flight
+                while not exhausted and len(pending) < self.concurrency:
+                    try:
+                        job = next(jobs)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    if self.is_async(job):
+                        pending.add(self.loop.create_task(_simulate(self.sampler, job)))
+                    else:
+                        yield self.process(job)
+                if not pending:
+                    break
+                done, pending = self.loop.run_until_complete(
+                    asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED))
+                for task in done:
+                    yield task.result()
+        finally:
+            # If the loop over the results has been left early, the runs in flight are cancelled
+            if pending:
+                for task in pending:
+                    task.cancel()
+                self.loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
@@ -0,0 +1,132 @@
+'''
+Copyright (c) 2018 by Tobias Houska
+
+This file is part of Statistical Parameter Estimation Tool (SPOTPY).
+
+:author: Philipp Kraft
+
+Helpers to send jobs in blocks to the workers of a parallel repeater.
+
+Sending every single job to a worker costs one message (including pickling) per
+model run. For fast models this overhead dominates. With a chunksize > 1 the
+repeater groups the jobs into a JobChunk, which is processed by the worker in one go
+and answered with a single ResultChunk. Jobs of the form (id, parameters) are packed
+into one contiguous float array.
+'''
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from itertools import islice
+import numpy as np
+
+
+class JobChunk(object):
+    """
+    A block of jobs, that is sent to a worker as one message.
+
+    Jobs of the form (id, parameters) are stored as a list of ids and a
+    2D float array (one row per job). Any other job type is kept as a list.
+    """
+    def __init__(self, jobs):
+        self.ids = None
+        self.params = None
+        self.jobs = None
+        try:
+            ids, params = zip(*jobs)
+            params = np.array(params, dtype=float)
+            if params.ndim != 2:
+                raise ValueError('Parameters of a chunk need to be vectors')
+            self.ids = list(ids)
+            self.params = params
+        except (TypeError, ValueError):
+            # Jobs are not (id, parameter vector) pairs, e.g. sceua complex evolution
+            self.jobs = list(jobs)
+
+    def __len__(self):
+        if self.jobs is not None:
+            return len(self.jobs)
+        return len(self.ids)
+
+    def __iter__(self):
+        if self.jobs is not None:
+            return iter(self.jobs)
+        return iter(zip(self.ids, self.params))
+
+    def __repr__(self):
+        return 'JobChunk(%i jobs)' % len(self)
+
+    def run(self, process):
+        """
+        Calls process for every job in the chunk
+        :param process: The callable of the repeater
+        :return: A ResultChunk
+        """
+        return ResultChunk([process(job) for job in self])
+
+
+class ResultChunk(object):
+    """
+    The results of a JobChunk, sent back to the master as one message.
+
+    Results of the form (id, parameters, simulation) are stored as a list of ids,
+    a 2D float array of the parameters and a list of the simulations.
+    """
+    def __init__(self, results):
+        self.ids = None
+        self.params = None
+        self.simulations = None
+        self.results = None
+        try:
+            ids, params, simulations = zip(*results)
+            params = np.array(params, dtype=float)
+            if params.ndim != 2:
+                raise ValueError('Parameters of a chunk need to be vectors')
+            self.ids = list(ids)
+            self.params = params
+            self.simulations = list(simulations)
+        except (TypeError, ValueError):
+            self.results = list(results)
+
+    def __len__(self):
+        if self.results is not None:
+            return len(self.results)
+        return len(self.ids)
+
+    def __iter__(self):
+        if self.results is not None:
+            return iter(self.results)
+        return iter(zip(self.ids, self.params, self.simulations))
+
+    def __repr__(self):
+        return 'ResultChunk(%i results)' % len(self)
+
+
+def chunked(jobs, chunksize):
+    """
+    Groups an iterable of jobs into JobChunks of chunksize jobs
+    :param jobs: An iterable of jobs
+    :param chunksize: Number of jobs per chunk
+    :return: A generator of JobChunk objects
+    """
+    jobiter = iter(jobs)
+    while True:
+        block = list(islice(jobiter, chunksize))
+        if not block:
+            return
+        yield JobChunk(block)
+
+
+def unchunked(results):
+    """
+    Flattens an iterable of results, that may contain ResultChunks
+    :param results: An iterable of results or ResultChunks
+    :return: A generator of single results
+    """
+    for result in results:
+        if isinstance(result, ResultChunk):
+            for item in result:
+                yield item
+        else:
+            yield result
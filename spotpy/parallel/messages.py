@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+'''
+Copyright (c) 2018 by Tobias Houska
+
+This file is part of Statistical Parameter Estimation Tool (SPOTPY).
+
+:author: Philipp Kraft
+
+The messages of the mpi repeater, independent of MPI.
+
+Jobs of the form (id, parameter array) and results of the form (id, parameters, simulation)
+with float vectors are packed into float64 buffers, which are sent without pickling (also
+as blocks of jobs and results). The pack functions return None for everything else, which
+is pickled by the repeater.
+'''
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+from numbers import Integral
+import numpy as np
+from .chunks import JobChunk, ResultChunk
+
+
+class tag:
+    """
+    This is just an enum to identify messages
+    """
+    job = 11
+    answer = 12
+    answer_header = 13
+    job_array = 14
+    job_chunk_array = 15
+
+
+class kind:
+    """
+    Enum for the format of an answer, the first entry of the answer header
+    """
+    pickled = 0
+    result = 1
+    result_chunk = 2
+
+
+def _float_vector(obj):
+    """
+    :return: obj as 1D float64 array, or None if obj is not a vector of floats
+    """
+    if isinstance(obj, np.ndarray):
+        values = obj
+    elif isinstance(obj, list) and not (obj and isinstance(obj[0], (list, tuple, np.ndarray))):
+        values = np.asarray(obj)
+    else:
+        return None
+    if values.dtype == np.float64 and values.ndim == 1:
+        return values
+    return None
+
+
+def pack_job(job):
+    """
+    :return: The tag and the float64 buffer to send job, or None if the job needs to be pickled
+    """
+    if type(job) is tuple and len(job) == 2 and isinstance(job[0], Integral):
+        if isinstance(job[1], np.ndarray) and job[1].dtype == np.float64 and job[1].ndim == 1:
+            return tag.job_array, np.concatenate(([job[0]], job[1]))
+    elif type(job) is JobChunk and job.params is not None:
+        if all(isinstance(id, Integral) for id in job.ids):
+            return tag.job_chunk_array, np.concatenate(([len(job)], job.ids, job.params.ravel()))
+    return None
+
+
+def unpack_job(jobtag, values):
+    """
+    Restores the job sent by pack_job
+    """
+    if jobtag == tag.job_array:
+        return int(values[0]), values[1:]
+    count = int(values[0])
+    ids = values[1:count + 1].astype(int).tolist()
+    params = values[count + 1:].reshape(count, -1)
+    return JobChunk(list(zip(ids, params)))
+
+
+def pack_answer(res):
+    """
+    :return: The header [kind, length, number of results, number of parameters, flags]
+             and the float64 buffer to send res, or None if res needs to be pickled.
+             The flags note, if the parameters (1) or simulations (2) have been lists
+    """
+    if type(res) is tuple and len(res) == 3 and isinstance(res[0], Integral):
+        id, params, simulation = res
+        param_values, sim_values = _float_vector(params), _float_vector(simulation)
+        if param_values is not None and sim_values is not None:
+            flags = isinstance(params, list) | isinstance(simulation, list) << 1
+            values = np.concatenate(([id], param_values, sim_values))
+            return [kind.result, len(values), 1, len(param_values), flags], values
+    elif type(res) is ResultChunk and res.params is not None:
+        if all(isinstance(id, Integral) for id in res.ids):
+            sim_values = [_float_vector(sim) for sim in res.simulations]
+            if all(v is not None for v in sim_values) and len(set(len(v) for v in sim_values)) == 1:
+                flags = isinstance(res.simulations[0], list) << 1
+                values = np.concatenate([np.asarray(res.ids, dtype=float), res.params.ravel()] + sim_values)
+                return [kind.result_chunk, len(values), len(res), res.params.shape[1], flags], values
+    return None
+
+
+def unpack_answer(header, values):
+    """
+    Restores the result sent by pack_answer
+    """
+    answer_kind, length, count, param_count, flags = header
+    if answer_kind == kind.result:
+        params = values[1:param_count + 1]
+        simulation = values[param_count + 1:]
+        return (int(values[0]),
+                params.tolist() if flags & 1 else params,
+                simulation.tolist() if flags & 2 else simulation)
+    ids = values[:count].astype(int).tolist()
+    params = values[count:count * (param_count + 1)].reshape(count, param_count)
+    simulations = values[count * (param_count + 1):].reshape(count, -1)
+    simulations = simulations.tolist() if flags & 2 else list(simulations)
+    return ResultChunk(list(zip(ids, params, simulations)))
@@ -10,26 +10,37 @@ This class makes the MPI parallelization.
 
 When an algorithm is constructed with parallel='mpi' the repeater of the algorithm as
 a ForEach object from this package. The .start() method seperates one master process from
-all the other processes that are used as workers. The master holds a list called "slots",
-where the master notes which processes are busy with a job. When a new job should be sent to 
-a worker, the master looks for a free slot and sends the job to the corresponding worker 
-process.
+all the other processes that are used as workers. The master sends the jobs with a
+Scheduler (spotpy.parallel.scheduler), which exchanges the messages by an MPICommunicator.
+
+The master does not poll the workers. For every worker a receive request for the header
+of the next answer is posted in advance. The master waits for any of these requests
+(Waitany), collects all other finished requests (Testsome) and receives the answers.
+
+With a chunksize > 1 the master sends blocks of jobs (JobChunk) to the workers, and
+the workers answer with blocks of results (ResultChunk). This reduces the number of
+messages for fast models.
+
+Jobs of the form (id, parameter array) and results of the form (id, parameters, simulation)
+with float vectors are sent as float64 buffers without pickling (also as blocks of jobs),
+see spotpy.parallel.messages. Everything else is pickled.
 '''
 
 from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
+from collections import deque
 from mpi4py import MPI
+import numpy as np
+from .chunks import JobChunk
+from .messages import tag, kind, pack_job, unpack_job, pack_answer, unpack_answer
+from .scheduler import Scheduler
 
-
-class tag:
-    """
-    This is just an enum to identify messages
-    """
-    job = 11
-    answer = 12
-
+# Number of jobs sent to a worker in one message
+chunksize = 1
+# Number of jobs (or chunks) a worker holds at once
+pipeline = 2
 
 class PhaseChange(object):
     """
@@ -39,6 +50,77 @@ class PhaseChange(object):
         self.phase = phase
 
 
+class MPICommunicator(object):
+    """
+    Exchanges the messages of the master with the workers by MPI, worker i is the rank i + 1.
+    This is the communicator of the Scheduler.
+    """
+
+    def __init__(self, comm, workers):
+        """
+        :param comm: The MPI communicator
+        :param workers: Number of workers
+        """
+        self.comm = comm
+        # The send requests (and buffers) of the jobs each worker is busy with
+        self.sent = [deque() for i in range(workers)]
+        # The receive requests for the header of the next answer of each worker
+        self.headers = np.zeros((workers, 5), dtype=np.int64)
+        self.requests = [self.__post_receive(i) for i in range(workers)]
+
+    def __post_receive(self, i):
+        """
+        Posts the receive request for the header of the next answer of worker i
+        """
+        return self.comm.Irecv([self.headers[i], MPI.INT64_T], source=i+1, tag=tag.answer_header)
+
+    def send(self, i, job):
+        """
+        Sends job to worker i without waiting for the worker
+        """
+        packed = pack_job(job)
+        if packed is None:
+            self.sent[i].append((self.comm.isend(job, dest=i+1, tag=tag.job), None))
+        else:
+            jobtag, values = packed
+            self.sent[i].append((self.comm.Isend([values, MPI.DOUBLE], dest=i+1, tag=jobtag), values))
+
+    def wait(self):
+        """
+        Waits until at least one worker has answered
+        :return: The workers, that have answered
+        """
+        finished = [MPI.Request.Waitany(self.requests)]
+        # Collect the other workers, that have answered in the meantime
+        finished.extend(MPI.Request.Testsome(self.requests) or [])
+        return finished
+
+    def receive(self, i):
+        """
+        Receives the answer of worker i, after its header has arrived
+        """
+        header = self.headers[i].tolist()
+        if header[0] == kind.pickled:
+            data = bytearray(header[1])
+            self.comm.Recv([data, MPI.BYTE], source=i+1, tag=tag.answer)
+            answer = MPI.pickle.loads(data)
+        else:
+            values = np.empty(header[1])
+            self.comm.Recv([values, MPI.DOUBLE], source=i+1, tag=tag.answer)
+            answer = unpack_answer(header, values)
+        self.requests[i] = self.__post_receive(i)
+        # The worker has received the job, hence the send request is complete
+        request, buffer = self.sent[i].popleft()
+        request.Wait()
+        return answer
+
+    def cancel(self):
+        """
+        Cancels the receive requests for the next answers
+        """
+        self.communicator.cancel()
+
+
 class ForEach(object):
     """
     This is the mpi version of the spot repetition object.
@@ -53,6 +135,9 @@ class ForEach(object):
         phase: The phase of the job (used by process)
         on_worker_terminate: An optional callable, that gets executed
                              when the worker processes terminate
+        chunksize: Number of jobs sent to a worker in one message
+        scheduler: Sends the jobs of the master to the workers, its pipeline is
+                   the number of jobs a worker holds at once
     """
 
     def __repr__(self):
@@ -72,10 +157,10 @@ class ForEach(object):
         self.process = process
         self.phase = None
         self.on_worker_terminate = None
+        self.chunksize = chunksize
         if self.rank == 0:
-            # The slots are a place for the master to remember which worker is doing something
-            # Idle slots contain None
-            self.slots = [None] * (self.size-1)
+            self.communicator = MPICommunicator(self.comm, self.size - 1)
+            self.scheduler = Scheduler(self.communicator, self.size - 1, pipeline)
 
     def is_master(self):
         """
@@ -96,7 +181,7 @@ class ForEach(object):
         :return: True, if all slots are empty 
         """
         assert self.is_master()
-        return all(s is None for s in self.slots)
+        return self.scheduler.is_idle()
 
     def terminate(self):
         """
@@ -106,6 +191,7 @@ class ForEach(object):
         assert self.is_master(), "Don't call terminate on worker"
         for i in range(1, self.size):
             self.comm.send(StopIteration(), dest=i, tag=tag.job)
+        self.communicator.cancel()
 
     def setphase(self, phasename):
         """
@@ -126,9 +212,16 @@ class ForEach(object):
         """
         try:
             assert self.is_worker()
+            status = MPI.Status()
             while True:
                 # Wait for a message
-                obj = self.comm.recv(source=0, tag=tag.job)
+                self.comm.Probe(source=0, tag=MPI.ANY_TAG, status=status)
+                if status.Get_tag() in (tag.job_array, tag.job_chunk_array):
+                    values = np.empty(status.Get_count(MPI.DOUBLE))
+                    self.comm.Recv([values, MPI.DOUBLE], source=0, tag=status.Get_tag())
+                    obj = unpack_job(status.Get_tag(), values)
+                else:
+                    obj = self.comm.recv(source=0, tag=tag.job)
                 # Handle messages
                 if type(obj) is StopIteration:
                     # Stop message
@@ -136,10 +229,14 @@ class ForEach(object):
                 elif type(obj) is PhaseChange:
                     # Phase change
                     self.phase = obj.phase
+                elif type(obj) is JobChunk:
+                    # Process a block of jobs and send the results back as one block
+                    res = obj.run(self.process)
+                    self.__answer(res)
                 else:  # obj is a job for self.process
                     # Send the object back for processing it
                     res = self.process(obj)
-                    self.comm.send(res, dest=0, tag=tag.answer)
+                    self.__answer(res)
     
             if callable(self.on_worker_terminate):
                 self.on_worker_terminate()
@@ -147,28 +244,21 @@ class ForEach(object):
         finally:
             exit()
 
-    def __send(self, jobiter):
-        """
-        The master uses this function to send jobs to the workers
-        First it looks for a free slots, and then the jobs go there
-        Used by __call__
-        :param jobiter: An iterator over job arguments 
-        :return: True if there are pending jobs
-        """
-        assert(self.is_master())
-        for i, slot in enumerate(self.slots):
-            # found a free slot
-            if slot is None:
-                # Move job from queue to job
-                try:
-                    # Changed from arg.next() which is not really py3 compliant
-                    job = next(jobiter)
-                    self.slots[i] = job
-                    # Send slot job to destination rank
-                    self.comm.send(job, dest=i+1, tag=tag.job)
-                except StopIteration:
-                    return False
-        return True
+    def __answer(self, res):
+        """
+        The worker sends a result to the master. A header with the format and the size
+        of the answer goes first, to fill the receive request the master has posted in advance
+        """
+        packed = pack_answer(res)
+        if packed is None:
+            data = MPI.pickle.dumps(res)
+            header = [kind.pickled, len(data), 0, 0, 0]
+            datatype = MPI.BYTE
+        else:
+            header, data = packed
+            datatype = MPI.DOUBLE
+        self.comm.Send([np.array(header, dtype=np.int64), MPI.INT64_T], dest=0, tag=tag.answer_header)
+        self.comm.Send([data, datatype], dest=0, tag=tag.answer)
 
     def start(self):
         """
@@ -187,19 +277,5 @@ class ForEach(object):
         :return: Yields the received result 
         """
 
-        # Get the iterator for the iterable
-        jobiter = iter(jobs)
-        # Send out job while we have them
-        # __send(jobiter) returns False when all jobs are send to the workers
-        while self.__send(jobiter) or not self.is_idle():
-            # Loop over the slots to get results
-            for i, slot in enumerate(self.slots):
-                # If slot is active
-                if slot is not None:
-                    # Check if slot has data in the pipeline
-                    if self.comm.Iprobe(source=i+1, tag=tag.answer):
-                        # Receive data
-                        data = self.comm.recv(source=i+1, tag=tag.answer)
-                        # Free slot
-                        self.slots[i] = None
-                        yield data
+        assert self.is_master()
+        return self.scheduler(jobs, self.chunksize)
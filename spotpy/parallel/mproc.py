@@ -11,8 +11,12 @@ from __future__ import print_function
 from __future__ import unicode_literals
 
 import pathos.multiprocessing as mp
+from .chunks import chunked, unchunked
 
 process_count = None
+# Number of jobs sent to a worker in one message. Larger values reduce the
+# communication overhead for fast models
+chunksize = 1
 
 class PhaseChange(object):
     """
@@ -31,6 +35,7 @@ class ForEach(object):
         self.size = process_count or mp.cpu_count()
         self.process = process
         self.phase=None
+        self.chunksize = chunksize
         self.pool = mp.ProcessingPool(self.size)
 
     def is_idle(self):
@@ -49,7 +54,14 @@ class ForEach(object):
         data = self.process(job)
         return data
 
+    def f_chunk(self, chunk):
+        return chunk.run(self.process)
+
     def __call__(self, jobs):
-        results = self.pool.imap(self.f, jobs)
+        if self.chunksize > 1:
+            # Send blocks of jobs to the workers and split the answers again
+            results = unchunked(self.pool.imap(self.f_chunk, chunked(jobs, self.chunksize)))
+        else:
+            results = self.pool.imap(self.f, jobs)
         for i in results:
             yield i
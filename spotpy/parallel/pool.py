@@ -0,0 +1,537 @@
+'''
+Copyright (c) 2018 by Tobias Houska
+
+This file is part of Statistical Parameter Estimation Tool (SPOTPY).
+
+:author: Philipp Kraft
+
+A persistent pool of worker processes, that can be shared by several samplers.
+
+The 'mpc' and 'umpc' repeaters create a new pathos pool for every sampler and
+send the process (including the sampler and the setup) with every job to the
+workers. A Pool starts its workers once and keeps them running until it is closed.
+When a sampler uses the pool, its process is installed once on every worker
+and the setup of the sampler is only sent once per pool. Afterwards only the
+job arguments (id and parameter vector) travel to the workers.
+
+Usage:
+
+    from spotpy.parallel.pool import Pool
+    with Pool(processes=4) as pool:
+        sampler = spotpy.algorithms.dds(spot_setup, parallel=pool)
+        sampler.sample(1000)
+        sampler = spotpy.algorithms.sceua(spot_setup, parallel=pool)
+        sampler.sample(1000)
+
+The master communicates with every worker through a pipe, similar to the slots
+of the mpi repeater.
+
+If a sampler has a sim_timeout (or the pool a timeout), the pool supervises the
+runs: a worker, that does not answer in time, is killed together with the programs
+it started (e.g. a hanging model executable) and replaced by a new worker. The run
+is given back without simulation (None), like a timed out run of a sequential sampler:
+the sampler gives it a NaN like and does not save it.
+'''
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import io
+import itertools
+import os
+import signal
+import time
+import traceback
+
+import dill
+from pathos.helpers import mp
+from .chunks import JobChunk, ResultChunk, chunked, unchunked
+
+try:
+    from multiprocess.connection import wait
+except ImportError:
+    def wait(connections, timeout=None):
+        """
+        Fallback for python versions without multiprocessing.connection.wait
+        """
+        start = time.time()
+        while True:
+            ready = [c for c in connections if c.poll()]
+            if ready or (timeout is not None and time.time() - start >= timeout):
+                return ready
+            time.sleep(0.0001)
+
+
+class Install(object):
+    """
+    Message to install a repeater on a worker. The repeater is pickled
+    by the master, since it references shared objects.
+    """
+    def __init__(self, key, data):
+        self.key = key
+        self.data = data
+
+
+class Uninstall(object):
+    """
+    Message to remove a repeater from a worker
+    """
+    def __init__(self, key):
+        self.key = key
+
+
+class Share(object):
+    """
+    Message to store an object, that is used by several repeaters, on a worker
+    """
+    def __init__(self, token, data):
+        self.token = token
+        self.data = data
+
+
+class PhaseChange(object):
+    """
+    Object to identify a change of a simulation phase
+    """
+    def __init__(self, key, phase):
+        self.key = key
+        self.phase = phase
+
+
+class Job(object):
+    """
+    Message with a job (or a JobChunk) for the repeater installed as key
+    """
+    def __init__(self, key, job):
+        self.key = key
+        self.job = job
+
+
+class WorkerError(RuntimeError):
+    """
+    Raised on the master if a job failed on a worker process
+    """
+    pass
+
+
+class _Pickler(dill.Pickler):
+    """
+    A pickler that replaces shared objects by their token
+    """
+    def __init__(self, file, shared):
+        dill.Pickler.__init__(self, file, protocol=dill.HIGHEST_PROTOCOL)
+        self.shared = shared
+
+    def persistent_id(self, obj):
+        return self.shared.get(id(obj))
+
+
+class _Unpickler(dill.Unpickler):
+    """
+    An unpickler that resolves the tokens of shared objects
+    """
+    def __init__(self, file, shared):
+        dill.Unpickler.__init__(self, file)
+        self.shared = shared
+
+    def persistent_load(self, token):
+        return self.shared[token]
+
+
+def _dumps(obj, shared):
+    f = io.BytesIO()
+    _Pickler(f, shared).dump(obj)
+    return f.getvalue()
+
+
+def _loads(data, shared):
+    return _Unpickler(io.BytesIO(data), shared).load()
+
+
+class Worker(object):
+    """
+    The loop of a worker process. Receives messages from the master until
+    None is sent
+    """
+    def __init__(self, conn):
+        self.conn = conn
+        self.shared = {}
+        self.repeaters = {}
+
+    def loop(self):
+        while True:
+            msg = self.conn.recv()
+            if msg is None:
+                break
+            self.handle(msg)
+        self.conn.close()
+
+    def handle(self, msg):
+        if type(msg) is Share:
+            self.shared[msg.token] = dill.loads(msg.data)
+        elif type(msg) is Install:
+            repeater = _loads(msg.data, self.shared)
+            repeater.installed()
+            self.repeaters[msg.key] = repeater
+        elif type(msg) is Uninstall:
+            self.repeaters.pop(msg.key, None)
+        elif type(msg) is PhaseChange:
+            self.repeaters[msg.key].phase = msg.phase
+        elif isinstance(msg, Job):
+            try:
+                res = self.run(msg)
+            except Exception:
+                res = WorkerError(traceback.format_exc())
+            self.conn.send(res)
+
+    def run(self, msg):
+        """
+        Processes the job of a Job message with the installed repeater
+        """
+        return self.repeaters[msg.key].run(msg.job)
+
+
+def _start_worker(worker_class, conn):
+    if hasattr(os, 'setpgrp'):
+        # An own process group, to kill the programs started by the model with the worker
+        os.setpgrp()
+    worker_class(conn).loop()
+
+
+class ForEach(object):
+    """
+    The repeater of a sampler using a Pool. Created by Pool.foreach
+    """
+    def __init__(self, pool, process, timeout=None):
+        self.pool = pool
+        self.process = process
+        self.phase = None
+        self.key = None
+        # Seconds a job may take, before its worker is killed
+        self.timeout = timeout
+
+    def __getstate__(self):
+        # The pool stays on the master
+        state = self.__dict__.copy()
+        state['pool'] = None
+        return state
+
+    def __repr__(self):
+        return 'ForEach(pool=%r,phase=%s)' % (self.pool, self.phase)
+
+    def is_idle(self):
+        return False
+
+    def start(self):
+        if self.key is None:
+            self.pool.install(self)
+
+    def terminate(self):
+        if self.key is not None:
+            self.pool.uninstall(self)
+
+    def setphase(self, phasename):
+        self.phase = phasename
+        if self.key is not None:
+            self.pool.setphase(self, phasename)
+
+    def installed(self):
+        """
+        Is called on the worker, after the repeater has been installed. If the pool
+        supervises the timeout, the sampler calls the model directly, since the
+        worker is killed anyway, when the model hangs
+        """
+        sampler = getattr(self.process, '__self__', None)
+        if self.timeout is not None and getattr(sampler, 'sim_timeout', None) is not None:
+            sampler.sim_timeout = None
+
+    def failed(self, job):
+        """
+        :return: The result for a job, whose worker has been killed after the timeout:
+                 the id and parameters of the job without simulation (None)
+        """
+        try:
+            id, params = job
+        except (TypeError, ValueError):
+            raise WorkerError('Job %r did not finish within %g s' % (job, self.timeout))
+        return id, params, None
+
+    def run(self, job):
+        """
+        Processes a job on the worker
+        """
+        if type(job) is JobChunk:
+            return job.run(self.process)
+        else:
+            return self.process(job)
+
+    def __call__(self, jobs):
+        self.start()
+        return self.pool.map(self, jobs)
+
+
+class Pool(object):
+    """
+    A pool of worker processes, that can be passed as parallel=pool to any sampler.
+
+    :param processes: Number of worker processes, default is the number of cpus
+    :param chunksize: Number of jobs sent to a worker in one message
+    :param ordered: If True, the results are given back in the order of the jobs
+                    (like 'mpc'), else as soon as they are finished (like 'umpc')
+    :param timeout: Seconds a worker may need for a job, before it is killed and replaced.
+                    The job is given back without simulation (None) and the sampler
+                    does not save it. If None, the sim_timeout of the sampler is used
+    """
+    # The class running the loop in the worker processes
+    worker_class = Worker
+
+    def __init__(self, processes=None, chunksize=1, ordered=True, timeout=None):
+        self.size = processes or mp.cpu_count()
+        self.chunksize = chunksize
+        self.ordered = ordered
+        self.timeout = timeout
+        self._keys = itertools.count()
+        # id of shared object -> token. The objects are kept in self._shared_objects
+        # to ensure the ids stay valid
+        self._shared = {}
+        self._shared_objects = []
+        # The messages to bring a new worker to the state of the others
+        self._shares = []
+        self._installs = {}
+        self._phases = {}
+        self.workers = [None] * self.size
+        self.connections = [None] * self.size
+        for i in range(self.size):
+            self._start(i)
+
+    def __repr__(self):
+        return 'Pool(processes=%i)' % self.size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _start(self, i):
+        conn, child_conn = mp.Pipe()
+        worker = mp.Process(target=_start_worker, args=(self.worker_class, child_conn))
+        worker.daemon = True
+        worker.start()
+        child_conn.close()
+        self.workers[i] = worker
+        self.connections[i] = conn
+
+    def restart(self, i):
+        """
+        Kills worker i with the programs it started and replaces it by a new worker,
+        which gets the shared objects and installed repeaters of the others
+        """
+        worker = self.workers[i]
+        try:
+            os.killpg(worker.pid, signal.SIGKILL)
+        except (AttributeError, OSError):  # No process groups on Windows
+            worker.terminate()
+        worker.join()
+        self.connections[i].close()
+        self._start(i)
+        self.restore(self.connections[i])
+
+    def restore(self, conn):
+        """
+        Sends the messages to a new worker, that brings it to the state of the other workers
+        """
+        for msg in self._shares:
+            conn.send(msg)
+        for key in sorted(self._installs):
+            conn.send(self._installs[key])
+            if key in self._phases:
+                conn.send(self._phases[key])
+
+    def foreach(self, process):
+        """
+        Creates a repeater for process, which uses the workers of this pool.
+        If the process is the method of a sampler, the setup of the sampler is
+        shared with the workers.
+        """
+        sampler = getattr(process, '__self__', None)
+        setup = getattr(sampler, 'setup', None)
+        if setup is not None:
+            self.share(setup)
+        timeout = self.timeout
+        if timeout is None:
+            timeout = getattr(sampler, 'sim_timeout', None)
+        return ForEach(self, process, timeout)
+
+    def share(self, obj):
+        """
+        Sends obj to the workers. Repeaters installed afterwards, that reference obj,
+        use the copy on the worker and do not need to send obj again.
+        """
+        if id(obj) not in self._shared:
+            token = len(self._shared_objects)
+            msg = Share(token, dill.dumps(obj, protocol=dill.HIGHEST_PROTOCOL))
+            self.broadcast(msg)
+            self._shares.append(msg)
+            self._shared[id(obj)] = token
+            self._shared_objects.append(obj)
+
+    def broadcast(self, msg):
+        """
+        Sends a message to all workers
+        """
+        for conn in self.connections:
+            conn.send(msg)
+
+    def install(self, foreach):
+        """
+        Sends the repeater with its process to every worker
+        """
+        foreach.key = next(self._keys)
+        msg = Install(foreach.key, _dumps(foreach, self._shared))
+        self.broadcast(msg)
+        self._installs[foreach.key] = msg
+
+    def uninstall(self, foreach):
+        self.broadcast(Uninstall(foreach.key))
+        self._installs.pop(foreach.key, None)
+        self._phases.pop(foreach.key, None)
+        foreach.key = None
+
+    def setphase(self, foreach, phasename):
+        msg = PhaseChange(foreach.key, phasename)
+        self.broadcast(msg)
+        self._phases[foreach.key] = msg
+
+    def has_capacity(self, foreach):
+        """
+        :return: True, if the pool can take another job
+        """
+        return True
+
+    def job_message(self, foreach, job, job_number):
+        """
+        :return: The message to send job to a worker
+        """
+        return Job(foreach.key, job)
+
+    def receive(self, foreach, data, job_number):
+        """
+        Is called when the answer for a job has been received
+        :return: The result as yielded by map
+        """
+        return data
+
+    def release(self, foreach, job_number):
+        """
+        Is called when the result of a job has been used by the caller of map
+        """
+        pass
+
+    def failed(self, foreach, job):
+        """
+        Is called, when the worker of a job has been killed after the timeout
+        :return: The result as yielded by map
+        """
+        if type(job) is JobChunk:
+            return ResultChunk([foreach.failed(j) for j in job])
+        return foreach.failed(job)
+
+    def _deadline(self, foreach, job):
+        if foreach.timeout is None:
+            return None
+        return time.time() + foreach.timeout * (len(job) if type(job) is JobChunk else 1)
+
+    def map(self, foreach, jobs):
+        """
+        Sends the jobs to the workers and yields the results
+        """
+        if self.chunksize > 1:
+            jobiter = chunked(jobs, self.chunksize)
+        else:
+            jobiter = iter(jobs)
+        # slots holds the number of the job a worker is busy with, idle workers hold None
+        slots = [None] * self.size
+        # The job of a busy worker and the time, when it is killed
+        sent = [None] * self.size
+        deadlines = [None] * self.size
+        results = {}
+        job_count = 0
+        next_result = 0
+        pending = True
+        try:
+            while True:
+                # Send jobs to idle workers
+                for i in range(self.size):
+                    if pending and slots[i] is None and self.has_capacity(foreach):
+                        try:
+                            job = next(jobiter)
+                        except StopIteration:
+                            pending = False
+                            break
+                        self.connections[i].send(self.job_message(foreach, job, job_count))
+                        slots[i] = job_count
+                        sent[i] = job
+                        deadlines[i] = self._deadline(foreach, job)
+                        job_count += 1
+
+                busy = [i for i in range(self.size) if slots[i] is not None]
+                if not busy:
+                    break
+                # Wait for any worker to finish
+                timeout = None
+                if foreach.timeout is not None:
+                    timeout = max(0.0, min(deadlines[i] for i in busy) - time.time())
+                for conn in wait([self.connections[i] for i in busy], timeout):
+                    i = self.connections.index(conn)
+                    data = conn.recv()
+                    job_number, slots[i] = slots[i], None
+                    if isinstance(data, WorkerError):
+                        raise data
+                    results[job_number] = self.receive(foreach, data, job_number)
+                # Replace the workers, that did not finish in time
+                for i in busy:
+                    if slots[i] is not None and deadlines[i] is not None and time.time() >= deadlines[i]:
+                        job_number, slots[i] = slots[i], None
+                        self.restart(i)
+                        results[job_number] = self.failed(foreach, sent[i])
+
+                if self.ordered:
+                    ready = []
+                    while next_result in results:
+                        ready.append(next_result)
+                        next_result += 1
+                else:
+                    ready = list(results)
+                for job_number in ready:
+                    for result in unchunked([results[job_number]]):
+                        yield result
+                    del results[job_number]
+                    self.release(foreach, job_number)
+        finally:
+            # If the loop is left early (e.g. the sampler stopped), collect the pending answers,
+            # otherwise they would be received by the next call
+            for i in range(self.size):
+                if slots[i] is not None:
+                    if deadlines[i] is None or self.connections[i].poll(max(0.0, deadlines[i] - time.time())):
+                        self.connections[i].recv()
+                    else:
+                        self.restart(i)
+                    self.release(foreach, slots[i])
+                    slots[i] = None
+            for job_number in results:
+                self.release(foreach, job_number)
+
+    def close(self):
+        """
+        Stops the worker processes
+        """
+        for conn, worker in zip(self.connections, self.workers):
+            try:
+                conn.send(None)
+            except (IOError, OSError):
+                pass
+            worker.join()
+        self.workers = []
+        self.connections = []
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+'''
+Copyright (c) 2018 by Tobias Houska
+
+This file is part of Statistical Parameter Estimation Tool (SPOTPY).
+
+:author: Philipp Kraft
+
+The scheduling of the jobs by the master process of the mpi repeater, independent of MPI.
+
+The master holds a list called "slots", where it notes the jobs a worker is busy with.
+Every worker gets up to `pipeline` jobs at once, so the next job is already waiting on
+the worker, when it sends a result. The master does not poll the workers, it waits until
+any of the workers has answered and receives the answers of all workers, that have answered.
+
+The messages are exchanged by a communicator (e.g. spotpy.parallel.mpi.MPICommunicator)
+with the following methods:
+
+    send(worker, job): Sends a job to the worker with the index worker, without waiting
+    wait(): Waits until at least one worker has answered and returns the indices
+            of all workers, that have answered
+    receive(worker): Returns the answer of a worker, that has answered (in the order the
+                     jobs have been sent to the worker), and gets ready for its next answer
+'''
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+from collections import deque
+from .chunks import chunked, unchunked
+
+
+class Scheduler(object):
+    """
+    Sends jobs to the workers of a communicator and yields the answers
+
+    Attributes:
+        comm: The communicator to exchange the messages with the workers
+        pipeline: Number of jobs (or chunks) a worker holds at once
+        slots: The jobs each worker is busy with
+    """
+
+    def __init__(self, comm, workers, pipeline=2):
+        """
+        :param comm: The communicator
+        :param workers: Number of workers of the communicator
+        :param pipeline: Number of jobs (or chunks) a worker holds at once
+        """
+        self.comm = comm
+        self.pipeline = max(1, pipeline)
+        self.slots = [deque() for i in range(workers)]
+
+    def is_idle(self):
+        """
+        :return: True, if all slots are empty
+        """
+        return not any(self.slots)
+
+    def send(self, jobiter):
+        """
+        Sends jobs to the workers. The workers are filled up round by round
+        until they hold self.pipeline jobs
+
+        :param jobiter: An iterator over job arguments
+        :return: True if there are pending jobs
+        """
+        for depth in range(self.pipeline):
+            for i, slot in enumerate(self.slots):
+                # found a free place
+                if len(slot) <= depth:
+                    try:
+                        job = next(jobiter)
+                    except StopIteration:
+                        return False
+                    self.comm.send(i, job)
+                    slot.append(job)
+        return True
+
+    def receive(self):
+        """
+        Waits until at least one worker has answered
+
+        :return: A list of the received answers
+        """
+        answers = []
+        for i in self.comm.wait():
+            answers.append(self.comm.receive(i))
+            self.slots[i].popleft()
+        return answers
+
+    def __call__(self, jobs, chunksize=1):
+        """
+        Sends the jobs out to the workers and receives the results
+
+        :param jobs: an iterable of jobs to be sent to the workers
+        :param chunksize: Number of jobs sent to a worker in one message
+        :return: Yields the received results in the order of their arrival
+        """
+        if chunksize > 1:
+            jobiter = chunked(jobs, chunksize)
+        else:
+            jobiter = iter(jobs)
+        try:
+            # send(jobiter) returns False when all jobs are send to the workers
+            while self.send(jobiter) or not self.is_idle():
+                for data in self.receive():
+                    # Split up a block of results
+                    for result in unchunked([data]):
+                        yield result
+        finally:
+            # If the loop is left early (e.g. the sampler stopped), collect the pending answers,
+            # otherwise they would be received by the next call
+            while not self.is_idle():
+                self.receive()
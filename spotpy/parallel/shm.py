@@ -0,0 +1,276 @@
+'''
+Copyright (c) 2018 by Tobias Houska
+
+This file is part of Statistical Parameter Estimation Tool (SPOTPY).
+
+:author: Philipp Kraft
+
+A worker pool, that transports the simulation results through shared memory.
+
+The workers of a spotpy.parallel.pool.Pool send their results pickled through a pipe.
+For long simulations (thousands of timesteps) the pickling and copying of the simulation
+costs CPU time and memory on both sides. A SharedMemoryPool allocates a ring buffer in
+shared memory (python >= 3.8) as soon as the first simulation of a sampler arrives.
+Every job gets a slot of the ring buffer, where the worker writes the simulation. The
+master yields read-only numpy views into the buffer, without copying the simulation.
+
+A slot is reused as soon as the loop over the results proceeds, hence a sampler needs
+to copy a simulation it wants to keep beyond its postprocessing.
+
+Usage:
+
+    from spotpy.parallel.shm import SharedMemoryPool
+    with SharedMemoryPool(processes=4) as pool:
+        sampler = spotpy.algorithms.mc(spot_setup, parallel=pool)
+        sampler.sample(10000)
+
+Simulations, that do not fit into the buffer (e.g. the failed runs), are sent pickled.
+'''
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import numpy as np
+
+from .chunks import JobChunk, ResultChunk
+from .pool import Pool, Worker, Job, Uninstall
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    raise ImportError('The SharedMemoryPool needs multiprocessing.shared_memory (python >= 3.8)')
+
+
+class AttachBuffer(object):
+    """
+    Message to the workers to use a ring buffer for the results of the repeater installed as key
+    """
+    def __init__(self, key, name, shape):
+        self.key = key
+        self.name = name
+        self.shape = shape
+
+
+class SharedJob(Job):
+    """
+    A job, that tells the worker the slots of the ring buffer to use for the simulations
+    """
+    def __init__(self, key, job, slots):
+        Job.__init__(self, key, job)
+        self.slots = slots
+
+
+class SharedSimulation(object):
+    """
+    Placeholder for a simulation, that has been written to a slot of the ring buffer
+    """
+    def __init__(self, slot):
+        self.slot = slot
+
+
+class RingBuffer(object):
+    """
+    A float array in shared memory with one simulation per slot (first dimension).
+
+    :param shape: (number of slots,) + shape of the simulation
+    :param name: Name of an existing buffer to attach to. If None, a new buffer is created
+    """
+    def __init__(self, shape, name=None):
+        self.shape = tuple(shape)
+        nbytes = max(1, int(np.prod(self.shape)) * np.dtype(float).itemsize)
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        else:
+            self.shm = _attach(name)
+        self.name = self.shm.name
+        self.array = np.ndarray(self.shape, dtype=float, buffer=self.shm.buf)
+        self.free = list(range(self.shape[0]))
+
+    def view(self, slot):
+        """
+        :return: A read-only view on the simulation in slot
+        """
+        view = self.array[slot]
+        view.flags.writeable = False
+        return view
+
+    def store(self, slot, simulation):
+        """
+        Writes simulation to slot, if it has the shape of the buffer
+        :return: A SharedSimulation placeholder or the simulation itself, if it does not fit
+        """
+        try:
+            values = np.asarray(simulation, dtype=float)
+        except (TypeError, ValueError):
+            return simulation
+        if values.shape != self.shape[1:]:
+            return simulation
+        self.array[slot] = values
+        return SharedSimulation(slot)
+
+    def close(self, unlink=False):
+        self.array = None
+        try:
+            self.shm.close()
+        except BufferError:
+            # Views on the buffer are still in use, the memory is released with them
+            pass
+        if unlink:
+            self.shm.unlink()
+
+
+def _attach(name):
+    """
+    Attaches to an existing shared memory block without registering it at the
+    resource tracker. The block belongs to the master, which unlinks it.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # python < 3.13 registers every attached block
+        register = shared_memory.resource_tracker.register
+        shared_memory.resource_tracker.register = lambda name, rtype: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            shared_memory.resource_tracker.register = register
+
+
+def _map_simulations(data, function):
+    """
+    Replaces the simulations of a result or a ResultChunk by function(index, simulation).
+    Results, that are not of the form (id, parameters, simulation), are left alone.
+    :return: The changed result
+    """
+    def apply(index, result):
+        if isinstance(result, tuple) and len(result) == 3:
+            id, params, simulation = result
+            return (id, params, function(index, simulation))
+        return result
+
+    if isinstance(data, ResultChunk):
+        if data.simulations is not None:
+            data.simulations = [function(i, sim) for i, sim in enumerate(data.simulations)]
+        else:
+            data.results = [apply(i, result) for i, result in enumerate(data.results)]
+        return data
+    else:
+        return apply(0, data)
+
+
+class SharedMemoryWorker(Worker):
+    """
+    Worker loop, that writes the simulations to the ring buffer
+    """
+    def __init__(self, conn):
+        Worker.__init__(self, conn)
+        self.buffers = {}
+
+    def handle(self, msg):
+        if type(msg) is AttachBuffer:
+            self.buffers[msg.key] = RingBuffer(msg.shape, msg.name)
+        else:
+            if type(msg) is Uninstall and msg.key in self.buffers:
+                self.buffers.pop(msg.key).close()
+            Worker.handle(self, msg)
+
+    def run(self, msg):
+        res = Worker.run(self, msg)
+        buffer = self.buffers.get(msg.key)
+        slots = getattr(msg, 'slots', None)
+        if buffer is None or not slots:
+            return res
+        return _map_simulations(res, lambda i, simulation: buffer.store(slots[i], simulation))
+
+
+class SharedMemoryPool(Pool):
+    """
+    A Pool, that sends the simulations through a ring buffer in shared memory.
+
+    :param processes: Number of worker processes, default is the number of cpus
+    :param chunksize: Number of jobs sent to a worker in one message
+    :param ordered: If True, the results are given back in the order of the jobs
+    :param buffer_size: Number of simulations in the ring buffer. Defaults to
+                        two times the number of runs the workers can work on at once
+    """
+    worker_class = SharedMemoryWorker
+
+    def __init__(self, processes=None, chunksize=1, ordered=True, buffer_size=None):
+        Pool.__init__(self, processes, chunksize, ordered)
+        self.buffer_size = max(buffer_size or 2 * self.size * self.chunksize, self.chunksize)
+        # key of repeater -> RingBuffer
+        self.buffers = {}
+        # (key of repeater, job number) -> slots of the job in the ring buffer
+        self.job_slots = {}
+
+    def __repr__(self):
+        return 'SharedMemoryPool(processes=%i)' % self.size
+
+    def has_capacity(self, foreach):
+        buffer = self.buffers.get(foreach.key)
+        return buffer is None or len(buffer.free) >= self.chunksize
+
+    def job_message(self, foreach, job, job_number):
+        buffer = self.buffers.get(foreach.key)
+        if buffer is None:
+            return Job(foreach.key, job)
+        count = len(job) if type(job) is JobChunk else 1
+        slots = [buffer.free.pop() for i in range(count)]
+        self.job_slots[(foreach.key, job_number)] = slots
+        return SharedJob(foreach.key, job, slots)
+
+    def receive(self, foreach, data, job_number):
+        buffer = self.buffers.get(foreach.key)
+        if buffer is None:
+            self._allocate(foreach, data)
+            return data
+        return _map_simulations(data, lambda i, simulation: self._resolve(buffer, simulation))
+
+    def release(self, foreach, job_number):
+        slots = self.job_slots.pop((foreach.key, job_number), None)
+        if slots:
+            self.buffers[foreach.key].free.extend(slots)
+
+    def restore(self, conn):
+        Pool.restore(self, conn)
+        for key, buffer in self.buffers.items():
+            conn.send(AttachBuffer(key, buffer.name, buffer.shape))
+
+    def uninstall(self, foreach):
+        key = foreach.key
+        Pool.uninstall(self, foreach)
+        if key in self.buffers:
+            self.buffers.pop(key).close(unlink=True)
+
+    def close(self):
+        Pool.close(self)
+        for buffer in self.buffers.values():
+            buffer.close(unlink=True)
+        self.buffers = {}
+
+    def _resolve(self, buffer, simulation):
+        if type(simulation) is SharedSimulation:
+            return buffer.view(simulation.slot)
+        return simulation
+
+    def _allocate(self, foreach, data):
+        """
+        Creates the ring buffer for the repeater, using the shape of the first float simulation
+        """
+        simulations = []
+
+        def collect(index, simulation):
+            simulations.append(simulation)
+            return simulation
+
+        _map_simulations(data, collect)
+        for simulation in simulations:
+            try:
+                values = np.asarray(simulation, dtype=float)
+            except (TypeError, ValueError):
+                continue
+            if values.size:
+                buffer = RingBuffer((self.buffer_size,) + values.shape)
+                self.buffers[foreach.key] = buffer
+                self.broadcast(AttachBuffer(foreach.key, buffer.name, buffer.shape))
+                return
@@ -0,0 +1,175 @@
+'''
+Copyright (c) 2018 by Tobias Houska
+
+This file is part of Statistical Parameter Estimation Tool (SPOTPY).
+
+:author: Philipp Kraft
+
+Parallelization with threads (parallel='thread' and parallel='uthread').
+
+Models, that release the GIL while they are running (numba compiled functions,
+C extensions like cmf or external programs started with subprocess), can run in
+threads of the sampler process. Compared to worker processes, nothing needs to be
+pickled and the setup is not loaded again in every process.
+
+Every worker thread gets its own copy of the sampler, with an own deep copy of the
+setup. A setup, that can be used by many threads at once, can declare this with a
+class attribute:
+
+    class spot_setup(object):
+        thread_safe = True
+
+Then all threads share the setup. The threads share the working directory of the
+process as well, a model should not change it (os.chdir). Setups with file based
+models can use worker_index() to find a folder for the current thread, e.g.
+subprocess.call(..., cwd='model%i' % worker_index())
+'''
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from collections import deque
+import copy
+import multiprocessing as mp
+import threading
+
+from .chunks import JobChunk, chunked, unchunked
+
+try:
+    import concurrent.futures as cf
+except ImportError:
+    raise ImportError("parallel='thread' needs concurrent.futures "
+                      "(python >= 3.2, or the futures package for python 2.7)")
+
+thread_count = None
+# Number of jobs given to a thread at once
+chunksize = 1
+# Number of jobs, that are waiting for a free thread, per thread
+pipeline = 2
+
+_local = threading.local()
+
+
+def worker_index():
+    """
+    :return: The number (0 ... number of threads - 1) of the current worker thread,
+             or None if not called from a worker thread
+    """
+    return getattr(_local, 'index', None)
+
+
+class ForEach(object):
+    """
+    ForEach runs the jobs in a concurrent.futures.ThreadPoolExecutor. The results
+    are given back in the order of the jobs.
+    """
+    def __init__(self, process):
+        self.size = thread_count or mp.cpu_count()
+        self.process = process
+        self.phase = None
+        self.chunksize = chunksize
+        self.pipeline = max(1, pipeline)
+        self.executor = None
+        self.lock = threading.Lock()
+        self.thread_count = 0
+
+    def is_idle(self):
+        return False
+
+    def terminate(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+            self.thread_count = 0
+
+    def start(self):
+        pass
+
+    def setphase(self, phasename):
+        self.phase = phasename
+
+    def thread_process(self):
+        """
+        :return: The process function for the current thread. Samplers are copied
+                 for every thread, to keep the threads from sharing their state
+        """
+        process = getattr(_local, 'process', None)
+        if process is None or getattr(_local, 'foreach', None) is not self:
+            with self.lock:
+                _local.index = self.thread_count
+                self.thread_count += 1
+            process = self.process
+            sampler = getattr(process, '__self__', None)
+            thread_copy = getattr(sampler, 'thread_copy', None)
+            if thread_copy is not None:
+                process = getattr(thread_copy(), process.__name__)
+            _local.foreach = self
+            _local.process = process
+        return process
+
+    def f(self, job):
+        # Jobs other than (id, parameters) may hold arrays, the process changes (e.g. sceua).
+        # They are copied, as the process backends do by pickling
+        if type(job) is not JobChunk and not (type(job) is tuple and len(job) == 2):
+            job = copy.deepcopy(job)
+        process = self.thread_process()
+        if type(job) is JobChunk:
+            return job.run(process)
+        return process(job)
+
+    def submit(self, jobs):
+        """
+        :return: A generator of futures for jobs. Only size * pipeline jobs are given to the
+                 executor in advance, so lazy job generators see the recent results
+        """
+        if self.executor is None:
+            self.executor = cf.ThreadPoolExecutor(self.size)
+        if self.chunksize > 1:
+            jobs = chunked(jobs, self.chunksize)
+        return (self.executor.submit(self.f, job) for job in jobs)
+
+    def results(self, futures):
+        pending = deque()
+        try:
+            for future in futures:
+                pending.append(future)
+                if len(pending) >= self.size * self.pipeline:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            # If the loop over the results has been left early, the pending jobs are not needed
+            for future in pending:
+                future.cancel()
+
+    def __call__(self, jobs):
+        results = self.results(self.submit(jobs))
+        try:
+            for i in (unchunked(results) if self.chunksize > 1 else results):
+                yield i
+        finally:
+            results.close()
+
+
+class UnorderedForEach(ForEach):
+    """
+    ForEach running the jobs in threads, that gives the results back as soon as
+    they are finished
+    """
+    def results(self, futures):
+        pending = set()
+        try:
+            for future in futures:
+                pending.add(future)
+                if len(pending) >= self.size * self.pipeline:
+                    done, pending = cf.wait(pending, return_when=cf.FIRST_COMPLETED)
+                    for f in done:
+                        yield f.result()
+            while pending:
+                done, pending = cf.wait(pending, return_when=cf.FIRST_COMPLETED)
+                for f in done:
+                    yield f.result()
+        finally:
+            for future in pending:
+                future.cancel()
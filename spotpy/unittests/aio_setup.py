@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+'''
+Copyright (c) 2018 by Tobias Houska
+This file is part of Statistical Parameter Optimization Tool for Python(SPOTPY).
+:author: Tobias Houska
+
+A setup with an async simulation for the tests of parallel='async' (python >= 3.5)
+'''
+
+import spotpy
+from spotpy.examples.spot_setup_rosenbrock import spot_setup
+
+
+class async_setup(object):
+    """
+    The Rosenbrock function as an async simulation, that waits for a moment
+    """
+    x = spotpy.parameter.Uniform(-10, 10)
+    y = spotpy.parameter.Uniform(-10, 10)
+    z = spotpy.parameter.Uniform(-10, 10)
+
+    def __init__(self, delay=0.05, hang=False):
+        self.delay = delay
+        self.hang = hang
+        self.rosenbrock = spot_setup()
+
+    async def simulation(self, vector):
+        import asyncio
+        await asyncio.sleep(self.delay)
+        if self.hang and vector[0] > 9.0:
+            await asyncio.sleep(60)
+        return self.rosenbrock.simulation(vector)
+
+    def evaluation(self):
+        return [0]
+
+    def objectivefunction(self, simulation, evaluation):
+        return -spotpy.objectivefunctions.rmse(evaluation, simulation)
@@ -3,3 +3,10 @@ for SAMPLER in abc demcz dream fast fscabc lhs mc mcmc mle rope sa # sceua
 do
     mpirun -c 6 python spotpy/examples/cli_cmf_lumped.py run -s $SAMPLER -n 10000 -p mpi
 done
+
+# Throughput of the mpi master with a growing number of ranks (needs a machine or cluster with enough cores)
+for RANKS in 8 32 128
+do
+    echo "mc with $RANKS ranks:"
+    mpirun -c $RANKS python spotpy/examples/cli_cmf_lumped.py run -s mc -n 100000 -p mpi | grep Duration
+done
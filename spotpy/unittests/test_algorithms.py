@@ -39,6 +39,16 @@ class TestAlgorithms(unittest.TestCase):
         results = sampler.getdata()
         self.assertEqual(len(results), self.rep)
 
+    def test_mc_db_thread(self):
+        results = []
+        for db_thread in (False, True):
+            sampler=spotpy.algorithms.mc(self.spot_setup,parallel=self.parallel, dbname='Rosen', dbformat=self.dbformat,
+                                         random_state=42, db_thread=db_thread)
+            sampler.sample(self.rep)
+            results.append(sampler.getdata())
+        self.assertEqual(len(results[1]), self.rep)
+        self.assertTrue(np.array_equal(results[0], results[1]))
+
     def test_lhs(self):
         sampler=spotpy.algorithms.lhs(self.spot_setup,parallel=self.parallel, dbname='Rosen', dbformat=self.dbformat, sim_timeout=self.timeout)
         sampler.sample(self.rep)
@@ -125,5 +135,187 @@ class TestAlgorithms(unittest.TestCase):
         except FileNotFoundError:
             pass
 
+
+class TestBatchSimulation(unittest.TestCase):
+    """
+    Samplers using spot_setup.simulation_batch must write the same database
+    as with single simulations
+    """
+    def sample(self, algorithm, batch, **kwargs):
+        import random
+        random.seed(42)
+        setup = spot_setup()
+        sampler = algorithm(setup, dbname='RosenBatch', dbformat='ram', **kwargs)
+        np.random.seed(42)
+        if batch:
+            self.assertIsNotNone(sampler.simulation_batch)
+        else:
+            sampler.simulation_batch = None
+        sampler.sample(500)
+        return sampler.getdata()
+
+    def test_mc(self):
+        results = self.sample(spotpy.algorithms.mc, True)
+        self.assertEqual(len(results), 500)
+        self.assertTrue(np.array_equal(results, self.sample(spotpy.algorithms.mc, False)))
+
+    def test_lhs(self):
+        results = self.sample(spotpy.algorithms.lhs, True)
+        self.assertTrue(np.array_equal(results, self.sample(spotpy.algorithms.lhs, False)))
+
+    def test_rope(self):
+        results = self.sample(spotpy.algorithms.rope, True)
+        self.assertTrue(np.array_equal(results, self.sample(spotpy.algorithms.rope, False)))
+
+    def test_parallel_without_batch(self):
+        sampler = spotpy.algorithms.mc(spot_setup(), dbname='RosenBatch', dbformat='ram', parallel='mpc')
+        self.assertIsNone(sampler.simulation_batch)
+
+    def test_timeout_without_batch(self):
+        sampler = spotpy.algorithms.mc(spot_setup(), dbname='RosenBatch', dbformat='ram', sim_timeout=10)
+        self.assertIsNone(sampler.simulation_batch)
+
+    def test_batch_size(self):
+        setup = spot_setup()
+        sizes = []
+
+        def simulation_batch(matrix):
+            sizes.append(len(matrix))
+            return setup.simulation_batch(matrix)
+        sampler = spotpy.algorithms.mc(setup, dbname='RosenBatch', dbformat='ram', batch_size=64)
+        sampler.simulation_batch = simulation_batch
+        jobs = ((rep, sampler.parameter()['random']) for rep in range(150))
+        results = sampler.repeat_population(jobs)
+        # The batches are simulated, when their results are needed
+        self.assertEqual(next(results)[0], 0)
+        self.assertEqual(sizes, [64])
+        self.assertEqual(len(list(results)), 149)
+        self.assertEqual(sizes, [64, 64, 22])
+
+    def test_failing_batch(self):
+        def simulation_batch(matrix):
+            raise ValueError('Model failed')
+        sampler = spotpy.algorithms.mc(spot_setup(), dbname='RosenBatch', dbformat='ram')
+        sampler.simulation_batch = simulation_batch
+        results = list(sampler.repeat_population((rep, [0.0, 0.0, 0.0]) for rep in range(3)))
+        self.assertEqual([sim for rep, par, sim in results], [None, None, None])
+
+    def test_short_batch(self):
+        sampler = spotpy.algorithms.mc(spot_setup(), dbname='RosenBatch', dbformat='ram')
+        sampler.simulation_batch = lambda matrix: [[0.0]] * (len(matrix) - 1)
+        with self.assertRaises(ValueError):
+            list(sampler.repeat_population((rep, [0.0, 0.0, 0.0]) for rep in range(3)))
+
+
+class TestSimulate(unittest.TestCase):
+    """
+    Tests the direct model call and the timeout handling of _algorithm.simulate
+    """
+    class slow_setup(object):
+        x = spotpy.parameter.Uniform(-10, 10)
+        y = spotpy.parameter.Uniform(-10, 10)
+        z = spotpy.parameter.Uniform(-10, 10)
+
+        def simulation(self, vector):
+            if vector[0] > 5.0:
+                import time
+                time.sleep(1.0)
+            elif vector[0] < -5.0:
+                raise ValueError('Model failed')
+            return spot_setup().simulation(vector)
+
+        def evaluation(self):
+            return [0]
+
+        def objectivefunction(self, simulation, evaluation):
+            return spotpy.objectivefunctions.rmse(evaluation, simulation)
+
+    def test_direct_call(self):
+        sampler = spotpy.algorithms.mc(self.slow_setup(), dbname='RosenSimulate', dbformat='ram')
+        self.assertEqual(sampler.simulate((0, [1.0, 1.0, 1.0])), (0, [1.0, 1.0, 1.0], [0.0]))
+        # Failing model runs give no simulation
+        self.assertIsNone(sampler.simulate((1, [-6.0, 1.0, 1.0]))[2])
+        self.assertIsNone(sampler._timeout_runner.thread)
+
+    def test_timeout(self):
+        import threading
+        thread_count = threading.active_count()
+        sampler = spotpy.algorithms.mc(self.slow_setup(), dbname='RosenSimulate', dbformat='ram',
+                                       sim_timeout=0.2)
+        self.assertEqual(sampler.simulate((0, [1.0, 1.0, 1.0]))[2], [0.0])
+        thread = sampler._timeout_runner.thread
+        self.assertEqual(sampler.simulate((1, [2.0, 1.0, 1.0]))[2], [901.0])
+        # The watchdog thread is reused
+        self.assertIs(thread, sampler._timeout_runner.thread)
+        self.assertIsNone(sampler.simulate((2, [6.0, 1.0, 1.0]))[2])
+        self.assertIsNone(sampler.simulate((3, [-6.0, 1.0, 1.0]))[2])
+        # After the timeout, a new thread runs the model
+        self.assertEqual(sampler.simulate((4, [1.0, 1.0, 1.0]))[2], [0.0])
+        self.assertIsNot(thread, sampler._timeout_runner.thread)
+        # Only the new thread and the thread with the timed out run are running
+        self.assertLessEqual(threading.active_count(), thread_count + 2)
+
+
+class TestObjectivefunctionParams(unittest.TestCase):
+    """
+    The parameters are only given to objectivefunctions taking a params argument
+    """
+    class params_setup(object):
+        x = spotpy.parameter.Uniform(-10, 10)
+        y = spotpy.parameter.Uniform(-10, 10)
+        z = spotpy.parameter.Uniform(-10, 10)
+
+        def simulation(self, vector):
+            return spot_setup().simulation(vector)
+
+        def evaluation(self):
+            return [0]
+
+        def objectivefunction(self, simulation, evaluation, params=None):
+            values, names = params
+            self.names = names
+            return spotpy.objectivefunctions.rmse(evaluation, simulation)
+
+    class failing_setup(params_setup):
+        def objectivefunction(self, simulation, evaluation):
+            raise TypeError('Failing objectivefunction')
+
+    def test_params(self):
+        setup = self.params_setup()
+        sampler = spotpy.algorithms.mc(setup, dbname='RosenParams', dbformat='ram')
+        self.assertTrue(sampler.objectivefunction_params)
+        self.assertEqual(sampler.getfitness([1.0], [1.0, 2.0, 3.0]), 1.0)
+        # The objectivefunction gets the parameter names of the sampler
+        self.assertIs(setup.names, sampler.parnames)
+        self.assertEqual(list(setup.names), ['x', 'y', 'z'])
+
+    def test_no_params(self):
+        sampler = spotpy.algorithms.mc(TestSimulate.slow_setup(), dbname='RosenParams', dbformat='ram')
+        self.assertIs(sampler.objectivefunction_params, False)
+        self.assertEqual(sampler.getfitness([1.0], [1.0, 2.0, 3.0]), 1.0)
+
+    def test_evaluation(self):
+        # The objectivefunction of the setup gets the evaluation as it is
+        class evaluation_setup(self.params_setup):
+            def objectivefunction(self, simulation, evaluation):
+                self.evaluation_type = type(evaluation)
+                evaluation[0] = 1
+                return spotpy.objectivefunctions.rmse(evaluation, simulation)
+        setup = evaluation_setup()
+        sampler = spotpy.algorithms.mc(setup, dbname='RosenParams', dbformat='ram')
+        self.assertEqual(sampler.getfitness([3.0], [1.0, 2.0, 3.0]), 2.0)
+        self.assertIs(setup.evaluation_type, list)
+        self.assertEqual(sampler.evaluation, [1])
+        # The functions of spotpy.objectivefunctions get an EvaluationContext
+        sampler = spotpy.algorithms.mc(setup, dbname='RosenParams', dbformat='ram', alt_objfun='rmse')
+        self.assertIsInstance(sampler.evaluation_context, spotpy.objectivefunctions.EvaluationContext)
+        self.assertEqual(sampler.getfitness([3.0], [1.0, 2.0, 3.0]), 3.0)
+
+    def test_type_error(self):
+        sampler = spotpy.algorithms.mc(self.failing_setup(), dbname='RosenParams', dbformat='ram')
+        with self.assertRaises(TypeError):
+            sampler.getfitness([1.0], [1.0, 2.0, 3.0])
+
+
 if __name__ == '__main__':
     unittest.main(exit=False)
@@ -499,5 +499,123 @@ class TestAnalyser(unittest.TestCase):
 
 
 
+class TestVectorized(unittest.TestCase):
+    """
+    get_percentiles and calc_like work on all runs at once and must give the
+    results of the field by field and run by run computation
+    """
+    def setUp(self):
+        names = ['like1', 'parx'] + ['simulation_%i' % i for i in range(20)] + ['chain']
+        values = np.random.RandomState(3).uniform(size=(50, len(names))).astype(np.float32)
+        self.results = values.view([(name, np.float32) for name in names]).reshape(50)
+        self.evaluation = np.random.RandomState(4).uniform(size=20)
+
+    def test_get_percentiles(self):
+        percentiles = spotpy.analyser.get_percentiles(self.results)
+        fields = spotpy.analyser.get_simulation_fields(self.results)
+        for q, p in zip([5, 25, 50, 75, 95], percentiles):
+            self.assertEqual(p, [np.percentile(list(self.results[field]), q) for field in fields])
+
+    def test_calc_like(self):
+        likes = spotpy.analyser.calc_like(self.results, self.evaluation, spotpy.objectivefunctions.nashsutcliffe)
+        self.assertEqual(likes, [spotpy.objectivefunctions.nashsutcliffe(list(s), self.evaluation)
+                                 for s in spotpy.analyser.get_modelruns(self.results)])
+
+    def test_calc_like_own_function(self):
+        # Objectivefunctions, that are not part of spotpy, get every run as a list
+        def length(simulation, evaluation):
+            self.assertIsInstance(simulation, list)
+            return len(simulation + list(evaluation))
+        likes = spotpy.analyser.calc_like(self.results, self.evaluation, length)
+        self.assertEqual(likes, [40] * 50)
+        stream = spotpy.analyser.ResultStream(self.results, chunksize=20)
+        self.assertEqual(spotpy.analyser.calc_like(stream, self.evaluation, length), likes)
+
+
+class TestResultStream(unittest.TestCase):
+    """
+    The analyses of a ResultStream must match the analyses of the loaded results
+    """
+    @classmethod
+    def setUpClass(cls):
+        from spotpy.examples.spot_setup_rosenbrock import spot_setup
+        cls.evaluation = spot_setup().evaluation()
+        for dbformat in ('csv', 'npy', 'sql', 'parquet'):
+            sampler = spotpy.algorithms.mc(spot_setup(), dbname='StreamTest', dbformat=dbformat,
+                                           db_precision=np.float64, random_state=42)
+            sampler.sample(300)
+        cls.results = sampler.getdata()
+
+    @classmethod
+    def tearDownClass(cls):
+        for ending in ('.csv', '.npy', '.json', '.db', '.parquet'):
+            if os.path.isfile('StreamTest' + ending):
+                os.remove('StreamTest' + ending)
+
+    def streams(self):
+        for dbformat in ('csv', 'npy', 'sql', 'parquet'):
+            yield spotpy.analyser.ResultStream('StreamTest', dbformat, chunksize=70)
+        yield spotpy.analyser.ResultStream(self.results, chunksize=70)
+
+    def test_chunks(self):
+        for stream in self.streams():
+            chunks = list(stream)
+            self.assertEqual([len(chunk) for chunk in chunks], [70, 70, 70, 70, 20])
+            self.assertTrue(np.array_equal(np.concatenate(chunks)['like1'], self.results['like1']))
+            modelruns = np.concatenate(list(spotpy.analyser.get_modelruns(stream)))
+            self.assertEqual(modelruns.dtype.names, spotpy.analyser.get_modelruns(self.results).dtype.names)
+
+    def test_detect_dbformat(self):
+        self.assertEqual(spotpy.analyser.ResultStream('StreamTest').dbformat, 'csv')
+        self.assertRaises(ValueError, spotpy.analyser.ResultStream, 'NoStreamTest')
+
+    def test_calc_like(self):
+        expected = spotpy.analyser.calc_like(self.results, self.evaluation, spotpy.objectivefunctions.rmse)
+        for stream in self.streams():
+            likes = spotpy.analyser.calc_like(stream, self.evaluation, spotpy.objectivefunctions.rmse)
+            self.assertTrue(np.allclose(likes, expected))
+
+    def test_posterior(self):
+        for maximize in (True, False):
+            expected = spotpy.analyser.get_posterior(self.results, percentage=10, maximize=maximize)
+            for stream in self.streams():
+                posterior = spotpy.analyser.get_posterior(stream, percentage=10, maximize=maximize)
+                self.assertTrue(np.array_equal(posterior['like1'], expected['like1']))
+                self.assertTrue(np.array_equal(posterior['parx'], expected['parx']))
+        # The selection of get_posterior is not changed by reading the results in chunks
+        like = self.results['like1']
+        for maximize in (True, False):
+            posterior = spotpy.analyser.get_posterior(self.results, percentage=10, maximize=maximize)
+            self.assertTrue(np.array_equal(posterior, self.results[like >= np.percentile(like, 90.0)]))
+
+    def test_posterior_ties(self):
+        results = np.copy(self.results)
+        # Only 10 different likes, every cut-off is tied
+        results['like1'] = np.arange(len(results)) % 10
+        for maximize in (True, False):
+            expected = spotpy.analyser.get_posterior(results, percentage=15, maximize=maximize)
+            posterior = spotpy.analyser.get_posterior(spotpy.analyser.ResultStream(results, chunksize=70),
+                                                      percentage=15, maximize=maximize)
+            self.assertTrue(np.array_equal(posterior, expected))
+            # All runs with the tied like at the cut-off are kept
+            self.assertEqual(len(expected), 60)
+
+    def test_percentiles(self):
+        expected = spotpy.analyser.get_percentiles(self.results)
+        for stream in self.streams():
+            self.assertTrue(np.allclose(spotpy.analyser.get_percentiles(stream), expected))
+
+    def test_quantile_sketch(self):
+        values = np.random.RandomState(1).normal(size=(20000, 3))
+        sketch = spotpy.analyser.QuantileSketch(size=256)
+        for start in range(0, len(values), 1000):
+            sketch.update(values[start:start + 1000])
+        self.assertLess(sum(len(level) for level in sketch.levels), 256 * 10)
+        for q in (5, 50, 95):
+            # The rank of the estimate is close to the rank of the percentile
+            ranks = (values < sketch.percentile(q)).mean(axis=0)
+            self.assertTrue(np.all(np.abs(ranks - q / 100.0) < 0.02))
+
+
 if __name__ == '__main__':
     unittest.main(exit=False)
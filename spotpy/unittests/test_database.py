@@ -127,6 +127,129 @@ class TestDatabase(unittest.TestCase):
         self.assertEqual(len(csvdata), 2)
         self.assertEqual(len(csv.header), 7)
 
+    def test_csv_buffered_same_as_single_runs(self):
+        from spotpy.database.csv import csv as csv_class
+        buffer_size = csv_class.buffer_size
+        csv_class.buffer_size = 3 * 12
+        try:
+            for precision in (np.float16, np.float32, np.float64):
+                runs = [(self.objf(), self.randompar, np.random.uniform(-1e5, 1e5, 5), i % 2) for i in range(10)]
+                # A run with a simulation of another length is written run by run
+                runs[4] = (self.like, self.randompar, [1.0, 2.0], 1)
+                csv = db.get_datawriter('csv', "UnitTest_tmp", self.parnames, self.like, self.randompar,
+                                        simulations=self.simulations, chains=1, save_sim=True,
+                                        db_precision=precision)
+                for run in runs:
+                    csv.save(*run)
+                csv.finalize()
+                expected = ','.join(csv.header) + '\n' + ''.join(csv._format_run(*run) for run in runs)
+                with open('UnitTest_tmp.csv') as f:
+                    self.assertEqual(f.read(), expected)
+        finally:
+            csv_class.buffer_size = buffer_size
+
+    def test_csv_getdata_while_sampling(self):
+        csv = db.get_datawriter('csv', "UnitTest_tmp", self.parnames, self.like, self.randompar,
+                                simulations=self.simulations, chains=1, save_sim=True)
+        for i in range(3):
+            csv.save(self.like, self.randompar, self.simulations)
+        # The collected runs are written before the file is read
+        self.assertEqual(len(csv.getdata()), 3)
+        csv.save(self.like, self.randompar, self.simulations)
+        csv.finalize()
+        self.assertEqual(len(csv.getdata()), 4)
+
+    def test_csv_load_chunks(self):
+        csv = db.get_datawriter('csv', "UnitTest_tmp", self.parnames, self.like, self.randompar,
+                                simulations=self.simulations, chains=1, save_sim=True,
+                                db_precision=np.float64)
+        for i in range(7):
+            csv.save(i, self.randompar, self.simulations)
+        csv.finalize()
+        expected = np.genfromtxt("UnitTest_tmp.csv", delimiter=',', names=True)
+        self.assertTrue(np.array_equal(spotpy.analyser.load_csv_results("UnitTest_tmp", chunksize=3), expected))
+        chunks = list(spotpy.analyser.iter_csv_results("UnitTest_tmp", usecols=['like*', 'simulation*'],
+                                                       chunksize=3))
+        self.assertEqual([len(chunk) for chunk in chunks], [3, 3, 1])
+        self.assertEqual(chunks[0].dtype.names, ('like1',) + tuple(csv.header[6:11]))
+        self.assertEqual(list(np.concatenate(chunks)['like1']), list(range(7)))
+        # An incomplete last line is left out
+        with open("UnitTest_tmp.csv", 'a') as f:
+            f.write('7,1.0,2.0')
+        pardata = spotpy.analyser.load_csv_results("UnitTest_tmp", usecols=['par*'],
+                                                   mmap_file="UnitTest_tmp.npy", chunksize=4)
+        self.assertEqual(len(pardata), 7)
+        self.assertIsInstance(pardata, np.memmap)
+        self.assertTrue(np.array_equal(pardata, expected[list(pardata.dtype.names)]))
+        self.assertEqual(len(spotpy.analyser.load_csv_parameter_results("UnitTest_tmp")), 7)
+        del pardata
+
+    def test_csv_load_broken_rows(self):
+        csv = db.get_datawriter('csv', "UnitTest_tmp", self.parnames, self.like, self.randompar,
+                                simulations=self.simulations, chains=1, save_sim=True,
+                                db_precision=np.float64)
+        for i in range(4):
+            csv.save(i, self.randompar, self.simulations)
+        csv.finalize()
+        # Runs with empty, non numeric, nan and inf fields, like failed runs may write them
+        with open("UnitTest_tmp.csv") as f:
+            lines = f.readlines()
+        for line, values in ((2, {1: '', 2: 'abc', -1: 'inf'}), (3, {3: 'nan'})):
+            fields = lines[line].rstrip('\n').split(',')
+            for i, value in values.items():
+                fields[i] = value
+            lines[line] = ','.join(fields) + '\n'
+        with open("UnitTest_tmp.csv", 'w') as f:
+            f.writelines(lines)
+        expected = np.genfromtxt("UnitTest_tmp.csv", delimiter=',', names=True, invalid_raise=False)
+        for chunksize in (1, 4):
+            data = spotpy.analyser.load_csv_results("UnitTest_tmp", chunksize=chunksize)
+            self.assertEqual(len(data), 4)
+            np.testing.assert_array_equal(data.view((float, len(data.dtype))),
+                                          expected.view((float, len(expected.dtype))))
+        self.assertTrue(np.isnan(data[1][1]) and np.isnan(data[1][2]) and np.isinf(data[1][-1]))
+
+    def test_npy_multiline(self):
+        npy = db.get_datawriter('npy', "UnitTest_tmp", self.parnames, self.like, self.randompar,
+                                simulations=self.simulations_multi, chains=1, save_sim=True,
+                                db_precision=np.float64)
+        npy.save(self.like, self.randompar, self.simulations_multi)
+        npy.save(self.like, self.randompar, self.simulations_multi, chains=2)
+        npy.finalize()
+        npydata = npy.getdata()
+        self.assertEqual(len(npydata), 2)
+        self.assertEqual(list(npydata.dtype.names), npy.header)
+        self.assertEqual(len(npy.header), 32)
+        self.assertEqual(npydata['simulation2_3'][0], self.simulations_multi[1][2])
+        self.assertEqual(list(npydata['chain']), [1.0, 2.0])
+        # The data is a view of the file
+        self.assertIsInstance(npydata, np.memmap)
+
+    def test_npy_single_false(self):
+        npy = db.get_datawriter('npy', "UnitTest_tmp", self.parnames, self.like, self.randompar,
+                                simulations=self.simulations, chains=1, save_sim=False)
+        npy.save(self.like, self.randompar, self.simulations)
+        npy.save(self.like, self.randompar, self.simulations)
+        # The runs are available while sampling
+        self.assertEqual(len(npy.getdata()), 2)
+        npy.finalize()
+        npydata = spotpy.analyser.load_npy_results("UnitTest_tmp")
+        self.assertEqual(len(npydata[0]), 7)
+        self.assertEqual(len(npydata), 2)
+        self.assertTrue(np.allclose(spotpy.analyser.get_parameters(npydata)[0].tolist(),
+                                    self.randompar, rtol=1e-3))
+
+    def test_npy_append(self):
+        for dbappend in (False, True):
+            npy = db.get_datawriter('npy', "UnitTest_tmp", self.parnames, self.like, self.randompar,
+                                    simulations=self.simulations, chains=1, save_sim=True,
+                                    dbappend=dbappend)
+            npy.save(self.like, self.randompar, self.simulations)
+            npy.save(self.like, self.randompar, self.simulations)
+            npy.finalize()
+        self.assertEqual(len(npy.getdata()), 4)
+        self.assertEqual(np.load("UnitTest_tmp.npy").shape, (4, 12))
+
     def test_hdf5_multiline(self):
         hdf5 = db.get_datawriter('hdf5', "UnitTest_tmp", self.parnames, self.like, self.randompar, simulations=self.simulations_multi, chains=1, save_sim=True)
 
@@ -211,6 +334,22 @@ class TestDatabase(unittest.TestCase):
         self.assertEqual(len(hdf5.header), 7)
 
 
+    def test_hdf5_compressed(self):
+        hdf5 = db.get_datawriter('hdf5', "UnitTest_tmp", self.parnames, self.like, self.randompar,
+                                 simulations=self.simulations, chains=1, save_sim=True,
+                                 repetitions=100000)
+        self.assertGreater(hdf5.table.filters.complevel, 0)
+        for i in range(3):
+            hdf5.save(self.like, self.randompar, self.simulations, chains=i)
+        # The runs are available while sampling
+        hdf5data = hdf5.getdata()
+        self.assertEqual(len(hdf5data), 3)
+        self.assertEqual(list(hdf5data['chains']), [0, 1, 2])
+        self.assertTrue(np.allclose(hdf5data['simulation'][1], self.simulations))
+        hdf5.save(self.like, self.randompar, self.simulations)
+        hdf5.finalize()
+        self.assertEqual(len(hdf5.getdata()), 4)
+
     def test_sql_multiline(self):
         sql = db.get_datawriter('sql', "UnitTest_tmp", self.parnames, self.like, self.randompar, simulations=self.simulations_multi, chains=1, save_sim=True)
         sql.save(self.like, self.randompar, self.simulations_multi)
@@ -255,6 +394,80 @@ class TestDatabase(unittest.TestCase):
         self.assertEqual(len(sqldata), 1)
         self.assertEqual(len(sql.header), 7)
 
+    def test_sql_append(self):
+        for dbappend in (False, True):
+            sql = db.get_datawriter('sql', "UnitTest_tmp", self.parnames, self.like, self.randompar,
+                                    simulations=self.simulations, chains=1, save_sim=True,
+                                    dbappend=dbappend)
+            sql.save(self.like, self.randompar, self.simulations)
+            sql.save(self.like, self.randompar, self.simulations)
+            sql.finalize()
+        self.assertEqual(len(sql.getdata()), 4)
+
+    def test_sql_select(self):
+        sql = db.get_datawriter('sql', "UnitTest_tmp", self.parnames, self.like, self.randompar,
+                                simulations=self.simulations, chains=1, save_sim=True,
+                                db_precision=np.float64)
+        likes = np.linspace(0, 1, 11)
+        for like in likes:
+            sql.save(like, self.randompar, self.simulations)
+        # The runs are available while sampling
+        sqldata = sql.getdata(columns=['like1', 'par*'], threshold=0.75)
+        self.assertEqual(sqldata.dtype.names, ('like1', 'parx1', 'parx2', 'parx3', 'parx4', 'parx5'))
+        self.assertTrue(np.array_equal(sqldata['like1'], likes[likes > 0.75]))
+        self.assertEqual(sqldata['parx2'][0], self.randompar[1])
+        sql.finalize()
+        self.assertEqual(len(sql.getdata()), 11)
+        self.assertEqual(len(sql.getdata(columns=['simulation*'])[0]), 5)
+
+    def test_parquet_multiline(self):
+        parquet = db.get_datawriter('parquet', "UnitTest_tmp", self.parnames, self.like, self.randompar,
+                                    simulations=self.simulations_multi, chains=1, save_sim=True,
+                                    db_precision=np.float64)
+        parquet.save(self.like, self.randompar, self.simulations_multi)
+        parquet.save(self.like, self.randompar, self.simulations_multi, chains=2)
+        parquet.finalize()
+        parquetdata = parquet.getdata()
+        self.assertEqual(len(parquetdata), 2)
+        self.assertEqual(list(parquetdata.dtype.names), parquet.header)
+        self.assertEqual(parquetdata['simulation2_3'][0], self.simulations_multi[1][2])
+        self.assertEqual(list(parquetdata['chain']), [1.0, 2.0])
+        # The simulation is stored in a single column
+        import pyarrow.parquet as pq
+        self.assertEqual(pq.read_schema("UnitTest_tmp.parquet").names,
+                         ['like1', 'parx1', 'parx2', 'parx3', 'parx4', 'parx5', 'simulation', 'chain'])
+
+    def test_parquet_columns(self):
+        parquet = db.get_datawriter('parquet', "UnitTest_tmp", self.parnames, self.like, self.randompar,
+                                    simulations=self.simulations, chains=1, save_sim=True)
+        parquet.buffer_size = 24
+        for i in range(5):
+            parquet.save(self.like, self.randompar, self.simulations)
+        # The file is complete after the sampling
+        self.assertRaises(ValueError, parquet.getdata)
+        parquet.finalize()
+        pardata = spotpy.analyser.load_parquet_results("UnitTest_tmp", columns=['par*'])
+        self.assertEqual(list(pardata.dtype.names), ['parx1', 'parx2', 'parx3', 'parx4', 'parx5'])
+        self.assertEqual(len(pardata), 5)
+        self.assertTrue(np.allclose(spotpy.analyser.get_parameters(pardata)[4].tolist(),
+                                    self.randompar, rtol=1e-3))
+        simdata = parquet.getdata(columns=['like1', 'simulation*'])
+        self.assertEqual(len(simdata.dtype.names), 6)
+        self.assertTrue(np.allclose(spotpy.analyser.get_modelruns(simdata)[2].tolist(),
+                                    self.simulations, rtol=1e-3))
+
+    def test_parquet_append(self):
+        for dbappend in (False, True):
+            parquet = db.get_datawriter('parquet', "UnitTest_tmp", self.parnames, self.like, self.randompar,
+                                        simulations=self.simulations, chains=1, save_sim=False,
+                                        dbappend=dbappend)
+            parquet.save(self.like, self.randompar, self.simulations)
+            parquet.save(self.like, self.randompar, self.simulations)
+            parquet.finalize()
+        parquetdata = parquet.getdata()
+        self.assertEqual(len(parquetdata), 4)
+        self.assertEqual(len(parquetdata.dtype.names), 7)
+
     def test_ram_multiline(self):
         ram = db.get_datawriter('ram', "UnitTest_tmp", self.parnames, self.like, self.randompar, simulations=self.simulations_multi, chains=1, save_sim=True)
         ram.save(self.like, self.randompar, self.simulations_multi)
@@ -292,6 +505,50 @@ class TestDatabase(unittest.TestCase):
         self.assertEqual(len(ramdata.dtype), len(ram.header))
         self.assertEqual(len(ram.header), 12)
 
+    def test_ram_growing(self):
+        ram = db.get_datawriter('ram', "UnitTest_tmp", self.parnames, self.like, self.randompar, simulations=self.simulations,
+                     chains=1, save_sim=True, repetitions=2)
+        for i in range(5):
+            ram.save(self.like, self.randompar, self.simulations, chains=i)
+            # The runs are available while sampling
+            self.assertEqual(len(ram.getdata()), i + 1)
+        self.assertEqual(len(ram.ram), 8)
+        ram.finalize()
+        ramdata = ram.getdata()
+        self.assertEqual(len(ram.ram), 5)
+        self.assertEqual(list(ramdata['chain']), [0, 1, 2, 3, 4])
+        self.assertEqual(list(ramdata.dtype.names), ram.header)
+        self.assertTrue(np.allclose(spotpy.analyser.get_modelruns(ramdata)[4].tolist(), self.simulations))
+
+    def test_background(self):
+        csv = db.get_datawriter('csv', "UnitTest_tmp", self.parnames, self.like, self.randompar,
+                                simulations=self.simulations, chains=1, save_sim=True, background=True)
+        self.assertIsInstance(csv, db.base.background)
+        self.assertEqual(len(csv.header), 12)
+        randompar = np.array(self.randompar)
+        for i in range(5):
+            randompar[0] = i
+            csv.save(self.like, randompar, self.simulations, chains=i)
+        # The queued runs are written before the data is read
+        csvdata = csv.getdata()
+        self.assertEqual(len(csvdata), 5)
+        # The runs are copied, before the sampler changes the parameters again
+        self.assertEqual(list(csvdata['parx1']), [0, 1, 2, 3, 4])
+        csv.finalize()
+        self.assertFalse(csv.thread.is_alive())
+        self.assertEqual(len(csv.getdata()), 5)
+
+    def test_background_error(self):
+        ram = db.get_datawriter('ram', "UnitTest_tmp", self.parnames, self.like, self.randompar,
+                                simulations=self.simulations, chains=1, save_sim=True, background=True)
+        ram.save(self.like, self.randompar, self.simulations)
+        ram.save(self.like, self.randompar, self.simulations[:3])
+        # The error of the datawriter thread is raised in the sampler
+        self.assertRaises(ValueError, ram.getdata)
+        ram.save(self.like, self.randompar, self.simulations)
+        ram.finalize()
+        self.assertEqual(len(ram.getdata()), 2)
+
     def test_ram_single_false(self):
         ram = db.get_datawriter('ram', "UnitTest_tmp", self.parnames, self.like, self.randompar, simulations=self.simulations,
                      chains=1, save_sim=False)
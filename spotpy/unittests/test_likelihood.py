@@ -370,6 +370,117 @@ class TestLikelihood(unittest.TestCase):
         if self.do_print:
             print("sumOfAbsoluteErrorResiduals: " + str(l_binom))
 
+    def test_evaluation_context(self):
+        data = np.abs(self.normal_data)
+        context = spotpy.objectivefunctions.EvaluationContext(data)
+        phi = ([0.5], ['likelihood_phi'])
+        student = ([5, 1.5, 0.5], ['likelihood_nu', 'likelihood_kappa', 'likelihood_phi'])
+        for likelihood, params in [(spotpy.likelihoods.logLikelihood, None),
+                                   (spotpy.likelihoods.gaussianLikelihoodHomoHeteroDataError, None),
+                                   (spotpy.likelihoods.LaplacianLikelihood, None),
+                                   (spotpy.likelihoods.LikelihoodAR1WithC, phi),
+                                   (spotpy.likelihoods.LikelihoodAR1NoC, phi),
+                                   (spotpy.likelihoods.SkewedStudentLikelihoodHeteroscedastic, student),
+                                   (spotpy.likelihoods.NashSutcliffeEfficiencyShapingFactor, None),
+                                   (spotpy.likelihoods.LimitsOfAcceptability, None)]:
+            kwargs = {} if params is None else {'params': params}
+            # The second call uses the cached quantities of the context
+            for i in range(2):
+                self.assertEqual(likelihood(context, self.normal_comparedata, **kwargs),
+                                 likelihood(data, self.normal_comparedata, **kwargs), likelihood.__name__)
+
+    def test_parameter_names(self):
+        names = ['likelihood_nu', 'likelihood_kappa', 'likelihood_phi']
+        for likelihood in [spotpy.likelihoods.LikelihoodAR1WithC,
+                           spotpy.likelihoods.LikelihoodAR1NoC,
+                           spotpy.likelihoods.SkewedStudentLikelihoodHeteroscedastic]:
+            # The positions of the names are resolved once, for lists and arrays of names
+            for i in range(2):
+                np.testing.assert_equal(
+                    likelihood(self.normal_data, self.normal_comparedata, params=([5, 1.5, 0.5], np.array(names))),
+                    likelihood(self.normal_data, self.normal_comparedata, params=([5, 1.5, 0.5], names)),
+                    likelihood.__name__)
+        positions = getattr(spotpy.likelihoods, '__positions')
+        self.assertIs(positions(np.array(names)), positions(names))
+        self.assertEqual(positions(['a', 'b', 'a']), {'a': 0, 'b': 1})
+        with self.assertRaises(LikelihoodError):
+            spotpy.likelihoods.LikelihoodAR1NoC(self.normal_data, self.normal_comparedata,
+                                                params=([5, 1.5], names[:2]))
+
+
+class TestLikelihoodKernels(unittest.TestCase):
+    """
+    Compares the numba kernels and the NumPy implementation of the likelihoods with loops
+    """
+    generalized_names = ["likelihood_beta", "likelihood_xi", "likelihood_sigma0", "likelihood_sigma1",
+                         "likelihood_phi1", "likelihood_muh"]
+    student_names = ["likelihood_nu", "likelihood_kappa", "likelihood_phi"]
+
+    def setUp(self):
+        np.random.seed(12)
+        self.data, self.comparedata = np.random.uniform(0.5, 2, 50), np.random.uniform(0.5, 2, 50)
+
+    def tearDown(self):
+        spotpy.likelihoods.use_numba = True
+
+    def likelihoods(self, likelihood, params):
+        """
+        :return: The likelihood with the NumPy implementation and with the kernel
+        """
+        results = []
+        for use_numba in (False, True):
+            spotpy.likelihoods.use_numba = use_numba
+            results.append(likelihood(self.data, self.comparedata, params=params))
+        return results
+
+    def test_reference_values(self):
+        # Values of the implementation with python loops
+        for values, expected in [([0.5, 5, 0.5, 0.5, 0.5, 50], -18653.80670845339),
+                                 ([-0.5, 0.5, 0.1, 0.9, 0.2, 3], -53245.27559655903)]:
+            for res in self.likelihoods(spotpy.likelihoods.generalizedLikelihoodFunction,
+                                        (values, self.generalized_names)):
+                self.assertAlmostEqual(res, expected, 8)
+        for phi, with_c, no_c in [(0.5, 4631.399977731298, 1951.5890296466853),
+                                  (-0.3, 10462.319965810275, 972.9915964571167)]:
+            for res in self.likelihoods(spotpy.likelihoods.LikelihoodAR1WithC, ([phi], ['likelihood_phi'])):
+                self.assertAlmostEqual(res, with_c, 8)
+            for res in self.likelihoods(spotpy.likelihoods.LikelihoodAR1NoC, ([phi], ['likelihood_phi'])):
+                self.assertAlmostEqual(res, no_c, 8)
+
+    def test_random_parameters(self):
+        # The kernels give the same numbers as the NumPy implementation
+        for i in range(20):
+            values = [np.random.uniform(-0.9, 1), np.random.uniform(0.2, 9), np.random.uniform(0, 1),
+                      np.random.uniform(0, 1), np.random.uniform(0, 0.99), np.random.uniform(0, 100)]
+            numpy_res, kernel_res = self.likelihoods(spotpy.likelihoods.generalizedLikelihoodFunction,
+                                                     (values, self.generalized_names))
+            self.assertEqual(kernel_res, numpy_res)
+            phi = ([np.random.uniform(-0.99, 0.99)], ['likelihood_phi'])
+            for likelihood in (spotpy.likelihoods.LikelihoodAR1WithC, spotpy.likelihoods.LikelihoodAR1NoC):
+                numpy_res, kernel_res = self.likelihoods(likelihood, phi)
+                self.assertEqual(kernel_res, numpy_res)
+            student = ([np.random.uniform(2.1, 50), np.random.uniform(0.1, 5), np.random.uniform(-0.9, 0.9)],
+                       self.student_names)
+            for likelihood in (spotpy.likelihoods.SkewedStudentLikelihoodHeteroscedastic,
+                               spotpy.likelihoods.SkewedStudentLikelihoodHeteroscedasticAdvancedARModel):
+                np.testing.assert_equal(*self.likelihoods(likelihood, student))
+
+    def test_long_series(self):
+        # Sums of more values than the buffer of NumPy's pairwise summation
+        self.data, self.comparedata = np.random.uniform(0.5, 2, 20000), np.random.uniform(0.5, 2, 20000)
+        for likelihood in (spotpy.likelihoods.LikelihoodAR1WithC, spotpy.likelihoods.LikelihoodAR1NoC):
+            numpy_res, kernel_res = self.likelihoods(likelihood, ([0.3], ['likelihood_phi']))
+            self.assertEqual(kernel_res, numpy_res)
+
+    def test_skewed_student_densities(self):
+        density_prod = getattr(spotpy.likelihoods, '__skewed_student_density_prod')
+        eta_all, measerror = np.random.normal(0, 0.3, 365), np.random.uniform(0.5, 1.5, 366)
+        results = []
+        for use_numba in (False, True):
+            spotpy.likelihoods.use_numba = use_numba
+            results.append(density_prod(eta_all, measerror, 0.1, 0.9, 1.5, 5.0, 0.5))
+        self.assertNotEqual(results[0], 0)
+        self.assertEqual(results[0], results[1])
 
 if __name__ == '__main__':
     unittest.main()
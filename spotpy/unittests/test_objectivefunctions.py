@@ -210,5 +210,99 @@ class TestObjectiveFunctions(unittest.TestCase):
             self.assertTrue(np.isnan(res), "Expected np.nan in length mismatch, Got {}".format(res))
 
 
+    def test_batch(self):
+        # Positive values, since log is invalid for negative numbers
+        simulations = np.random.uniform(0.5, 2, (20, 10))
+        evaluation = self.evaluation + 3
+        for func in of._batch_functions:
+            res = func(evaluation, simulations)
+            self.assertEqual(res.shape, (20,))
+            for i, simulation in enumerate(simulations):
+                self.assertAlmostEqual(res[i], func(evaluation, simulation), 12, func.__name__)
+            # Runs marked as such may also be given as the evaluation
+            res = func(simulations.view(of._Runs), evaluation)
+            for i, simulation in enumerate(simulations):
+                self.assertAlmostEqual(res[i], func(simulation, evaluation), 12, func.__name__)
+
+    def test_2d_evaluation_is_not_a_batch(self):
+        # Several sites are compared as a whole, when evaluation and simulation are both 2D
+        evaluation = np.array([[1, 2, 3], [2, 3, 4]])
+        simulation = np.array([[1.1, 2.2, 2.9], [2.5, 3.1, 4.4]])
+        self.assertEqual(of.rmse(evaluation, simulation), 0.2828427124746191)
+        self.assertEqual(of.nashsutcliffe(evaluation, simulation), 0.9127272727272726)
+        self.assertEqual(of.bias(evaluation, simulation), -0.6000000000000003)
+        self.assertEqual(of.agreementindex(evaluation, simulation), 0.979020979020979)
+        self.assertEqual(of.kge(evaluation, simulation), 0.9108987602928712)
+        self.assertEqual(of.mse(evaluation, simulation), 0.08000000000000007)
+
+    def test_batch_return_all(self):
+        simulations = np.random.uniform(0.5, 2, (5, 10))
+        for func in (of.kge, of.kge_non_parametric):
+            res = func(self.evaluation, simulations, return_all=True)
+            for i, simulation in enumerate(simulations):
+                for actual, exp in zip(res, func(self.evaluation, simulation, return_all=True)):
+                    self.assertAlmostEqual(actual[i], exp, 12)
+
+    def test_batch_length_mismatch(self):
+        for func in of._batch_functions:
+            self.assertRaises(ValueError, func, self.evaluation, np.ones((3, 11)))
+
+    def test_calculate_all_functions(self):
+        evaluation = self.evaluation + 3
+        simulations = np.random.uniform(0.5, 2, (5, 10))
+        context = of.EvaluationContext(evaluation)
+        batch = dict(of.calculate_all_functions(context, simulations))
+        for i, simulation in enumerate(simulations):
+            res = of.calculate_all_functions(evaluation, simulation)
+            self.assertEqual([name for name, value in res], [f.__name__ for f in of._all_functions])
+            for func, (name, value) in zip(of._all_functions, res):
+                self.assertEqual(value, func(evaluation, simulation), name)
+                self.assertAlmostEqual(batch[name][i], value, 12, name)
+            self.assertEqual(of.calculate_all_functions(context, simulation), res)
+
+    def test_calculate_all_functions_nan(self):
+        simulation = self.simulation.copy()
+        simulation[3] = np.nan
+        for name, value in of.calculate_all_functions(self.evaluation, simulation):
+            self.assertTrue(np.isnan(value) or value == getattr(of, name)(self.evaluation, simulation), name)
+        for name, value in of.calculate_all_functions([0], [0, 1]):
+            self.assertTrue(np.isnan(value), name)
+
+    def test_calculate_all_functions_failing(self):
+        # Functions, that fail for the data, give nan
+        for simulation in ([1, None, 3], [[1, 2], [3]], np.array([1, None, 3], dtype=object)):
+            for name, value in of.calculate_all_functions([1, 2, 3], simulation):
+                self.assertTrue(np.isnan(value), name)
+        for name, value in of.calculate_all_functions(self.evaluation, np.ones((3, 11))):
+            self.assertTrue(np.isnan(value), name)
+        # Several sites are compared as a whole, lognashsutcliffe fails for them
+        evaluation = np.array([[1, 2, 3], [2, 3, 4]])
+        simulation = np.array([[1.1, 2.2, 2.9], [2.5, 3.1, 4.4]])
+        res = dict(of.calculate_all_functions(evaluation, simulation))
+        self.assertEqual(res['mse'], 0.08000000000000007)
+        self.assertTrue(np.isnan(res['lognashsutcliffe']))
+
+    def test_evaluation_context(self):
+        evaluation = self.evaluation + 3
+        context = of.EvaluationContext(evaluation)
+        self.assertRaises(TypeError, of.EvaluationContext, [None, 'a'])
+        # Calculations with the context give plain arrays
+        self.assertIs(type(context - self.simulation), np.ndarray)
+        for simulation in np.random.uniform(0.5, 2, (3, 10)):
+            for func in of._batch_functions:
+                # The context gives exactly the same values
+                self.assertEqual(func(context, simulation), func(evaluation, simulation), func.__name__)
+                self.assertEqual(func(context, list(simulation)), func(evaluation, simulation), func.__name__)
+        self.assertTrue(np.isnan(of.rmse(context, [1, 2])))
+        # Changes in place, like masking by an objectivefunction, give new quantities
+        before = of.nashsutcliffe(context, self.simulation)
+        context[context < 2.5] = 2.5
+        evaluation[evaluation < 2.5] = 2.5
+        self.assertNotAlmostEqual(of.nashsutcliffe(context, self.simulation), before)
+        for func in of._batch_functions:
+            np.testing.assert_allclose(func(context, self.simulation), func(evaluation, self.simulation),
+                                       rtol=1e-12, err_msg=func.__name__)
+
+
 if __name__ == '__main__':
     unittest.main()
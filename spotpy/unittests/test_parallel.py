@@ -0,0 +1,590 @@
+# -*- coding: utf-8 -*-
+'''
+Copyright (c) 2018 by Tobias Houska
+This file is part of Statistical Parameter Optimization Tool for Python(SPOTPY).
+:author: Tobias Houska
+
+Tests for the parallel repeaters in spotpy.parallel
+'''
+
+import random
+import sys
+import unittest
+from collections import deque
+try:
+    import spotpy
+except ImportError:
+    import sys
+    sys.path.append(".")
+    import spotpy
+import numpy as np
+from spotpy.examples.spot_setup_rosenbrock import spot_setup
+from spotpy.parallel.chunks import JobChunk, ResultChunk, chunked, unchunked
+if sys.version_info >= (3, 5):
+    # The async setup is in its own module, since python 2 can not parse it
+    from aio_setup import async_setup
+
+
+class RosenbrockCheck(object):
+    """
+    Mixin for the tests, that sample the rosenbrock setup with a parallel backend
+    """
+    def check_rosenbrock(self, results, count=None):
+        """
+        Checks, that the saved simulations belong to the saved parameters
+        """
+        if count is not None:
+            self.assertEqual(len(results), count)
+        x, y, z = results['parx'], results['pary'], results['parz']
+        sim = 100. * (y - x**2)**2 + (1. - x)**2 + 100. * (z - y**2)**2 + (1. - y)**2
+        self.assertTrue(np.allclose(results['simulation_0'], sim))
+
+    def sample_rosenbrock(self, parallel, algorithm=spotpy.algorithms.mc, rep=100, setup=None):
+        """
+        Samples the rosenbrock setup (or setup) with the parallel backend and checks the results
+        :return: The results of the sampler
+        """
+        sampler = algorithm(setup or spot_setup(), parallel=parallel, dbname='test_parallel',
+                            dbformat='ram')
+        sampler.sample(rep)
+        results = sampler.getdata()
+        self.check_rosenbrock(results)
+        return results
+
+
+class TestChunks(unittest.TestCase):
+
+    def test_job_chunk_packs_parameters(self):
+        jobs = [(i, [float(i), 2.0 * i]) for i in range(5)]
+        chunk = JobChunk(jobs)
+        self.assertEqual(len(chunk), 5)
+        self.assertEqual(chunk.params.shape, (5, 2))
+        self.assertEqual(chunk.ids, list(range(5)))
+        for (id, params), (id_orig, params_orig) in zip(chunk, jobs):
+            self.assertEqual(id, id_orig)
+            self.assertEqual(list(params), params_orig)
+
+    def test_job_chunk_other_jobs(self):
+        jobs = [(i, 'a', 'b') for i in range(3)]
+        chunk = JobChunk(jobs)
+        self.assertIsNone(chunk.params)
+        self.assertEqual(list(chunk), jobs)
+
+    def test_result_chunk(self):
+        chunk = JobChunk([(i, [float(i), 1.0]) for i in range(3)])
+        results = chunk.run(lambda job: (job[0], job[1], [job[1].sum()]))
+        self.assertIsInstance(results, ResultChunk)
+        self.assertEqual(results.params.shape, (3, 2))
+        self.assertEqual([r[2] for r in results], [[1.0], [2.0], [3.0]])
+
+    def test_chunked_unchunked(self):
+        jobs = [(i, [float(i)]) for i in range(10)]
+        chunks = list(chunked(jobs, 4))
+        self.assertEqual([len(c) for c in chunks], [4, 4, 2])
+        results = [c.run(lambda job: (job[0], job[1], None)) for c in chunks]
+        self.assertEqual([r[0] for r in unchunked(results)], list(range(10)))
+
+
+class TestMessages(unittest.TestCase):
+    """
+    The float64 buffers of the mpi repeater give the sent jobs and results back
+    """
+    def send_job(self, job):
+        from spotpy.parallel import messages
+        packed = messages.pack_job(job)
+        self.assertIsNotNone(packed)
+        jobtag, values = packed
+        self.assertEqual(values.dtype, np.float64)
+        return messages.unpack_job(jobtag, values.copy())
+
+    def send_answer(self, res):
+        from spotpy.parallel import messages
+        packed = messages.pack_answer(res)
+        self.assertIsNotNone(packed)
+        header, values = packed
+        self.assertEqual(values.dtype, np.float64)
+        return messages.unpack_answer(header, values.copy())
+
+    def test_job(self):
+        params = np.array([0.1, -2.5, 1e300])
+        id, restored = self.send_job((7, params))
+        self.assertEqual(id, 7)
+        self.assertTrue(np.array_equal(restored, params))
+
+    def test_job_chunk(self):
+        jobs = [(i, np.array([i / 3.0, -1.0])) for i in range(5)]
+        chunk = self.send_job(JobChunk(jobs))
+        self.assertIsInstance(chunk, JobChunk)
+        self.assertEqual(chunk.ids, list(range(5)))
+        self.assertTrue(np.array_equal(chunk.params, np.array([p for i, p in jobs])))
+
+    def test_answer(self):
+        params, simulation = np.array([0.1, 0.2]), np.array([1.5, np.nan, -3.0])
+        id, p, sim = self.send_answer((3, params, simulation))
+        self.assertEqual(id, 3)
+        self.assertTrue(np.array_equal(p, params))
+        np.testing.assert_array_equal(sim, simulation)
+        # Lists are restored as lists
+        self.assertEqual(self.send_answer((3, [0.1, 0.2], [1.5, -3.0])), (3, [0.1, 0.2], [1.5, -3.0]))
+
+    def test_result_chunk(self):
+        chunk = JobChunk([(i, np.array([float(i), 1.0])) for i in range(3)])
+        results = self.send_answer(chunk.run(lambda job: (job[0], job[1], [job[1].sum(), 0.5])))
+        self.assertIsInstance(results, ResultChunk)
+        self.assertEqual(list(results.ids), [0, 1, 2])
+        self.assertEqual([r[2] for r in results], [[1.0, 0.5], [2.0, 0.5], [3.0, 0.5]])
+
+    def test_pickled(self):
+        from spotpy.parallel import messages
+        # Everything, that is not a float vector, is pickled by the repeater
+        for job in [(1, [0.1, 0.2]), (1, np.array([1, 2])), ('a', np.array([0.1])), (1, 2, 3),
+                    JobChunk([(i, 'a', 'b') for i in range(3)])]:
+            self.assertIsNone(messages.pack_job(job), job)
+        for res in [(1, np.array([0.1]), None), (1, np.array([0.1]), [[1.0, 2.0], [3.0]]),
+                    (1, np.array([0.1]), ['a', 'b']), (1, np.array([0.1]), np.array([1, 2])),
+                    (1, np.array([0.1]), np.ones((2, 2))), ('a', [0.1], [0.1])]:
+            self.assertIsNone(messages.pack_answer(res), res)
+        # Ragged or missing simulations in a block of results
+        for simulations in ([[1.0, 2.0], [3.0]], [[1.0], None]):
+            chunk = ResultChunk([(i, np.array([0.1]), sim) for i, sim in enumerate(simulations)])
+            self.assertIsNone(messages.pack_answer(chunk))
+
+
+class FakeCommunicator(object):
+    """
+    A communicator for the Scheduler, whose workers answer in random order
+    """
+    def __init__(self, workers, process, seed=1):
+        self.random = random.Random(seed)
+        self.process = process
+        # The jobs each worker has received, but not answered yet
+        self.inbox = [deque() for i in range(workers)]
+        self.answers = {}
+        self.received = []
+        self.max_jobs = 0
+
+    def send(self, worker, job):
+        self.inbox[worker].append(job)
+        self.max_jobs = max(self.max_jobs, len(self.inbox[worker]))
+
+    def wait(self):
+        busy = [i for i, jobs in enumerate(self.inbox) if jobs and i not in self.answers]
+        if not busy:
+            raise AssertionError('Waiting for workers without jobs')
+        workers = self.random.sample(busy, self.random.randint(1, len(busy)))
+        for i in workers:
+            self.answers[i] = self.process(self.inbox[i].popleft())
+        return workers
+
+    def receive(self, worker):
+        answer = self.answers.pop(worker)
+        self.received.append(answer)
+        return answer
+
+
+class TestScheduler(unittest.TestCase):
+
+    @staticmethod
+    def process(job):
+        if isinstance(job, JobChunk):
+            return job.run(TestScheduler.process)
+        id, params = job
+        return id, params, [params.sum()]
+
+    def schedule(self, count, workers=4, pipeline=2, chunksize=1):
+        from spotpy.parallel.scheduler import Scheduler
+        comm = FakeCommunicator(workers, self.process)
+        scheduler = Scheduler(comm, workers, pipeline)
+        jobs = [(i, np.array([float(i), 2.0])) for i in range(count)]
+        return comm, scheduler, scheduler(jobs, chunksize)
+
+    def check(self, results, count):
+        self.assertEqual(sorted(id for id, params, simulation in results), list(range(count)))
+        for id, params, simulation in results:
+            self.assertEqual(simulation, [id + 2.0])
+
+    def test_out_of_order(self):
+        comm, scheduler, results = self.schedule(100)
+        results = list(results)
+        self.check(results, 100)
+        # The results are yielded in the order of their arrival
+        self.assertEqual(results, comm.received)
+        self.assertNotEqual([r[0] for r in results], list(range(100)))
+        self.assertTrue(scheduler.is_idle())
+        # No worker holds more jobs than the pipeline allows
+        self.assertEqual(comm.max_jobs, 2)
+
+    def test_chunks(self):
+        comm, scheduler, results = self.schedule(100, pipeline=3, chunksize=7)
+        self.check(list(results), 100)
+        self.assertTrue(all(isinstance(answer, ResultChunk) for answer in comm.received))
+        self.assertEqual(comm.max_jobs, 3)
+
+    def test_less_jobs_than_workers(self):
+        for count in (0, 1, 3):
+            comm, scheduler, results = self.schedule(count, workers=8)
+            self.check(list(results), count)
+
+    def test_early_stop(self):
+        comm, scheduler, results = self.schedule(100)
+        for i, result in enumerate(results):
+            if i == 10:
+                break
+        results.close()
+        # The pending answers are collected and no job is left on the workers
+        self.assertTrue(scheduler.is_idle())
+        self.assertFalse(any(comm.inbox))
+        self.assertLess(len(comm.received), 100)
+
+
+class TestParallelChunks(RosenbrockCheck, unittest.TestCase):
+
+    def setUp(self):
+        self.rep = 100
+
+    def sample_mc(self, parallel, module):
+        chunksize = module.chunksize
+        module.chunksize = 7
+        try:
+            return self.sample_rosenbrock(parallel, rep=self.rep)
+        finally:
+            module.chunksize = chunksize
+
+    def test_mpc_chunksize(self):
+        from spotpy.parallel import mproc
+        self.check_rosenbrock(self.sample_mc('mpc', mproc), self.rep)
+
+    def test_umpc_chunksize(self):
+        from spotpy.parallel import umproc
+        self.check_rosenbrock(self.sample_mc('umpc', umproc), self.rep)
+
+
+class hanging_setup(object):
+    """
+    A setup, whose model hangs for x > 0.8
+    """
+    x = spotpy.parameter.Uniform(0, 1)
+
+    def simulation(self, vector):
+        import time
+        if vector[0] > 0.8:
+            time.sleep(60)
+        return [vector[0]]
+
+    def evaluation(self):
+        return [0.5]
+
+    def objectivefunction(self, simulation, evaluation):
+        return -spotpy.objectivefunctions.rmse(evaluation, simulation)
+
+
+class TestPool(RosenbrockCheck, unittest.TestCase):
+
+    def setUp(self):
+        from spotpy.parallel.pool import Pool
+        self.pool = Pool(processes=2)
+        self.rep = 100
+
+    def tearDown(self):
+        self.pool.close()
+
+    def test_samplers_share_pool(self):
+        setup = spot_setup()
+        pids = [w.pid for w in self.pool.workers]
+        for algorithm in (spotpy.algorithms.mc, spotpy.algorithms.sceua, spotpy.algorithms.dds):
+            results = self.sample_rosenbrock(self.pool, algorithm, self.rep, setup)
+            self.assertEqual(len(results), self.rep)
+        # The workers are still the same processes
+        self.assertEqual(pids, [w.pid for w in self.pool.workers])
+        # The setup has been sent only once
+        self.assertEqual(len(self.pool._shared_objects), 1)
+
+    def test_ordered_chunks(self):
+        self.pool.chunksize = 3
+        repeat = self.pool.foreach(lambda job: (job[0], job[1], [job[1].sum()]))
+        results = list(repeat((i, [float(i), 1.0]) for i in range(10)))
+        self.assertEqual([r[0] for r in results], list(range(10)))
+        self.assertEqual([r[2][0] for r in results], [i + 1.0 for i in range(10)])
+
+    def test_unordered(self):
+        self.pool.ordered = False
+        repeat = self.pool.foreach(lambda job: job * 2)
+        self.assertEqual(sorted(repeat(range(10))), [i * 2 for i in range(10)])
+
+    def test_early_stop(self):
+        repeat = self.pool.foreach(lambda job: job)
+        for i in repeat(range(10)):
+            break
+        # Pending answers of the first call must not show up in the second call
+        self.assertEqual(list(repeat(range(20, 25))), list(range(20, 25)))
+
+    def test_worker_error(self):
+        from spotpy.parallel.pool import WorkerError
+        repeat = self.pool.foreach(lambda job: 1.0 / job)
+        with self.assertRaises(WorkerError):
+            list(repeat(range(-3, 3)))
+        # The pool is still usable
+        self.assertEqual(list(repeat([1, 2])), [1., 0.5])
+
+    def test_timeout(self):
+        import time
+        self.pool.timeout = 0.5
+        pids = [w.pid for w in self.pool.workers]
+
+        def hanging(job):
+            if job[0] == 3:
+                time.sleep(60)
+            return job[0], job[1], [job[1], job[1]]
+
+        repeat = self.pool.foreach(hanging)
+        start = time.time()
+        results = list(repeat((i, float(i)) for i in range(6)))
+        self.assertLess(time.time() - start, 10)
+        self.assertEqual([r[0] for r in results], list(range(6)))
+        # The killed run has no simulation, like a timed out sequential run
+        self.assertEqual(results[3], (3, 3.0, None))
+        self.assertEqual(results[4][2], [4.0, 4.0])
+        # The hanging worker has been replaced, the new worker knows the repeater
+        self.assertNotEqual(pids, [w.pid for w in self.pool.workers])
+        self.assertEqual(list(repeat([(7, 7.0)])), [(7, 7.0, [7.0, 7.0])])
+
+    def test_restart_restores_state(self):
+        import os
+        import time
+        self.pool.timeout = 0.5
+        pids = [w.pid for w in self.pool.workers]
+        shared = {'factor': 3.0}
+        self.pool.share(shared)
+
+        def process(job):
+            id, x = job
+            if x < 0:
+                time.sleep(60)
+            return id, x, [os.getpid(), x * shared['factor']]
+
+        repeat = self.pool.foreach(process)
+        results = list(repeat([(0, -1.0), (1, 1.0), (2, 2.0)]))
+        self.assertEqual(results[0], (0, -1.0, None))
+        # Only the hanging worker has been replaced
+        new_pids = [w.pid for w in self.pool.workers]
+        self.assertEqual(len(set(new_pids) - set(pids)), 1)
+        # Every worker, also the new one, has the shared object and the installed repeater
+        results = list(repeat((i, float(i)) for i in range(10)))
+        self.assertEqual(set(r[2][0] for r in results), set(new_pids))
+        self.assertEqual([r[2][1] for r in results], [3.0 * i for i in range(10)])
+
+    def test_sim_timeout(self):
+        import time
+        setup = hanging_setup()
+        sampler = spotpy.algorithms.mc(setup, parallel=self.pool, dbname='test_pool',
+                                       dbformat='ram', sim_timeout=0.5, random_state=1)
+        likes = []
+        postprocessing = sampler.postprocessing
+
+        def record(rep, params, simulation, *args, **kwargs):
+            like = postprocessing(rep, params, simulation, *args, **kwargs)
+            likes.append((params[0], simulation, like))
+            return like
+        sampler.postprocessing = record
+        start = time.time()
+        sampler.sample(20)
+        self.assertLess(time.time() - start, 30)
+        # The killed runs reach the sampler without simulation and get a NaN like
+        killed = [(x, simulation, like) for x, simulation, like in likes if x > 0.8]
+        self.assertEqual(len(likes), 20)
+        self.assertTrue(killed)
+        for x, simulation, like in killed:
+            self.assertIsNone(simulation)
+            self.assertTrue(np.isnan(like))
+        # Only the finished runs are saved
+        results = sampler.getdata()
+        self.assertEqual(len(results), 20 - len(killed))
+        self.assertTrue(np.all(results['parx'] <= 0.8))
+
+
+@unittest.skipIf(sys.version_info < (3, 2), 'threads need concurrent.futures')
+class TestThreads(RosenbrockCheck, unittest.TestCase):
+
+    class stateful_setup(object):
+        """
+        A setup, that keeps the last parameters and the threads it has been used by
+        """
+        x = spotpy.parameter.Uniform(0, 1)
+
+        def __init__(self):
+            self.last = None
+            self.threads = set()
+
+        def simulation(self, vector):
+            import threading
+            import time
+            from spotpy.parallel.thread import worker_index
+            self.threads.add(worker_index())
+            self.last = vector[0]
+            # Sleeping releases the GIL, another thread may use the setup now
+            time.sleep(0.001)
+            return [self.last, float(threading.current_thread() is not threading.main_thread())]
+
+        def evaluation(self):
+            return [0.5, 1.0]
+
+        def objectivefunction(self, simulation, evaluation):
+            return -spotpy.objectivefunctions.rmse(evaluation, simulation)
+
+    def sample(self, setup, parallel='thread'):
+        from spotpy.parallel import thread
+        thread_count = thread.thread_count
+        thread.thread_count = 4
+        try:
+            sampler = spotpy.algorithms.mc(setup, parallel=parallel, dbname='test_thread',
+                                           dbformat='ram', db_precision=np.float64)
+            sampler.sample(200)
+        finally:
+            thread.thread_count = thread_count
+        return sampler.getdata()
+
+    def test_ordered(self):
+        self.check_rosenbrock(self.sample(spot_setup()), 200)
+
+    def test_unordered(self):
+        self.check_rosenbrock(self.sample(spot_setup(), 'uthread'), 200)
+
+    def test_setup_copied_per_thread(self):
+        setup = self.stateful_setup()
+        results = self.sample(setup)
+        # Every thread had its own setup, the simulation belongs to the parameters
+        self.assertTrue(np.array_equal(results['simulation_0'], results['parx']))
+        self.assertTrue(np.all(results['simulation_1'] == 1.0))
+        self.assertIsNone(setup.last)
+
+    def test_thread_safe_setup_shared(self):
+        setup = self.stateful_setup()
+        setup.thread_safe = True
+        self.sample(setup)
+        self.assertIsNotNone(setup.last)
+        self.assertGreater(len(setup.threads), 1)
+        self.assertLessEqual(setup.threads, set(range(4)))
+
+    def test_worker_index_unique(self):
+        import threading
+        import time
+        from spotpy.parallel import thread
+
+        def process(job):
+            time.sleep(0.002)
+            return threading.current_thread().ident, thread.worker_index()
+
+        thread_count = thread.thread_count
+        thread.thread_count = 4
+        try:
+            repeat = thread.ForEach(process)
+        finally:
+            thread.thread_count = thread_count
+        try:
+            results = set(repeat(range(100)))
+        finally:
+            repeat.terminate()
+        indices = dict(results)
+        # Every thread keeps its index and no two threads share an index
+        self.assertEqual(len(indices), len(results))
+        self.assertEqual(len(set(indices.values())), len(indices))
+        self.assertGreater(len(indices), 1)
+        self.assertLessEqual(set(indices.values()), set(range(4)))
+        self.assertIsNone(thread.worker_index())
+
+    def test_early_stop(self):
+        from spotpy.parallel.thread import ForEach
+        repeat = ForEach(lambda job: job)
+        for i in repeat(range(100)):
+            break
+        self.assertEqual(list(repeat(range(20, 25))), list(range(20, 25)))
+        repeat.terminate()
+
+
+@unittest.skipIf(sys.version_info < (3, 5), 'async def needs python >= 3.5')
+class TestAsync(RosenbrockCheck, unittest.TestCase):
+
+    def test_samplers(self):
+        import time
+        for algorithm in (spotpy.algorithms.mc, spotpy.algorithms.lhs, spotpy.algorithms.rope):
+            start = time.time()
+            results = self.sample_rosenbrock('async', algorithm, 200, async_setup())
+            # The runs wait at the same time, one after the other would take 10 s
+            self.assertLess(time.time() - start, 5)
+            self.assertEqual(len(results), 200)
+
+    def test_sequential(self):
+        self.check_rosenbrock(self.sample_rosenbrock('seq', rep=20, setup=async_setup(0.0)), 20)
+
+    def test_timeout(self):
+        import time
+        sampler = spotpy.algorithms.mc(async_setup(hang=True), parallel='async', dbname='test_async',
+                                       dbformat='ram', sim_timeout=0.5)
+        start = time.time()
+        sampler.sample(300)
+        self.assertLess(time.time() - start, 10)
+        # The timed out runs have a NaN like and are not saved
+        results = sampler.getdata()
+        self.assertTrue(np.all(results['parx'] <= 9.0))
+        # Like in sequential runs, a timed out run has no simulation
+        jobs = [(0, [9.5, 0.0, 0.0]), (1, [0.0, 0.0, 0.0])]
+        self.assertEqual(sorted(list(sampler.repeat(jobs)))[0][2], None)
+
+    def test_early_stop(self):
+        sampler = spotpy.algorithms.mc(async_setup(0.01), parallel='async', dbname='test_async',
+                                       dbformat='ram')
+        jobs = [(i, sampler.parameter()['random']) for i in range(50)]
+        for result in sampler.repeat(jobs):
+            break
+        self.assertEqual(len(list(sampler.repeat(jobs[:10]))), 10)
+        sampler.repeat.terminate()
+
+
+@unittest.skipIf(sys.version_info < (3, 8), 'shared memory needs python >= 3.8')
+class TestSharedMemoryPool(RosenbrockCheck, unittest.TestCase):
+
+    def setUp(self):
+        from spotpy.parallel.shm import SharedMemoryPool
+        self.pool = SharedMemoryPool(processes=2, chunksize=2)
+
+    def tearDown(self):
+        self.pool.close()
+
+    def test_simulations_in_buffer(self):
+        repeat = self.pool.foreach(lambda job: (job[0], job[1], np.arange(100.) * job[1]))
+        results = []
+        for id, params, simulation in repeat((i, float(i)) for i in range(20)):
+            self.assertTrue(np.allclose(simulation, np.arange(100.) * id))
+            results.append(id)
+        # The last simulations are read-only views into the ring buffer
+        self.assertFalse(simulation.flags.writeable)
+        self.assertEqual(results, list(range(20)))
+        # The buffer has been used and all slots are free again
+        buffer = self.pool.buffers[repeat.key]
+        self.assertEqual(sorted(buffer.free), list(range(buffer.shape[0])))
+        self.assertFalse(self.pool.job_slots)
+
+    def test_views_reused(self):
+        repeat = self.pool.foreach(lambda job: (job[0], job[1], np.arange(100.) * job[1]))
+        views = []
+        for id, params, simulation in repeat((i, float(i)) for i in range(40)):
+            self.assertTrue(np.allclose(simulation, np.arange(100.) * id))
+            if not simulation.flags.writeable:
+                views.append((id, simulation))
+        self.assertTrue(views)
+        # The loop has moved on, the slots of the older views hold later simulations now
+        buffer = self.pool.buffers[repeat.key]
+        unchanged = [id for id, view in views if np.allclose(view, np.arange(100.) * id)]
+        self.assertLess(len(unchanged), len(views))
+        self.assertLessEqual(len(unchanged), buffer.shape[0])
+
+    def test_samplers(self):
+        setup = spot_setup()
+        for algorithm in (spotpy.algorithms.lhs, spotpy.algorithms.dream):
+            self.sample_rosenbrock(self.pool, algorithm, 200, setup)
+        # The buffers are released with the samplers
+        self.assertFalse(self.pool.buffers)
+
+
+if __name__ == '__main__':
+    unittest.main()